@@ -1,14 +1,16 @@
 import os
 import json
 import logging
+import math
 import uuid
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta, timezone
+import click
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
 from werkzeug.utils import secure_filename
-from PIL import Image
-
-# Setup logging
-logging.basicConfig(level=logging.DEBUG)
+from sqlalchemy import func, tuple_, case, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, load_only, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -34,6 +36,35 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB max upload size
 
+# Keyset pagination for pet listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+TIMELINE_PAGE_SIZE = 20
+
+# Changes per /api/sync page
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 2000
+
+# Queued offline writes accepted per /api/ingest request
+MAX_INGEST_ITEMS = 500
+
+# Facets for filtering pet listings; age bands are keyed by the values used in ?age=
+AGE_BANDS = (
+    ('young', 'Young (0-2 yrs)'),
+    ('adult', 'Adult (3-7 yrs)'),
+    ('senior', 'Senior (8+ yrs)'),
+    ('unknown', 'Age unknown'),
+)
+FACET_NAMES = ('species', 'emergency', 'age', 'gender')
+
+# Fields of the pet JSON, and the short set used by listings and search results
+PET_JSON_FIELDS = ('id', 'name', 'species', 'breed', 'age', 'gender', 'description', 'feeding_instructions',
+                   'medical_notes', 'image_url', 'is_emergency', 'updates', 'checklists')
+PET_SUMMARY_FIELDS = ('id', 'name', 'species', 'breed', 'age', 'gender', 'image_url', 'is_emergency')
+PET_HISTORY_FIELDS = ('updates', 'checklists')
+# Pet fields sent by /api/sync, which sends the history as changes of its own
+PET_SYNC_FIELDS = tuple(field for field in PET_JSON_FIELDS if field not in PET_HISTORY_FIELDS)
+
 # Configure database
 database_url = os.environ.get("DATABASE_URL", "sqlite:///pawpass.db")
 app.config["SQLALCHEMY_DATABASE_URI"] = database_url
@@ -42,32 +73,76 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-logging.info(f"Using database: {database_url}")
+# A named logger: logging.info() on the root logger would install a default handler at import
+logging.getLogger(__name__).info(f"Using database: {database_url}")
 
 # Initialize database
-from models import db, Pet, PetUpdate, Checklist, ChecklistItem, ChecklistCompletion, WeightRecord, EnhancedChecklistItem
+from models import db, Pet, PetUpdate, Checklist, ChecklistItem, ChecklistCompletion, WeightRecord, EnhancedChecklistItem, SearchDocument, PetActivity, SyncChange, IngestKey, SequenceCounter
+from models import MOMENT_ATTRIBUTES, SHELTER_TIMEZONE, shelter_moment
 db.init_app(app)
 
-# Create all tables
-with app.app_context():
-    db.create_all()
-    
-    # Add default checklist items if none exist
-    if ChecklistItem.query.count() == 0:
-        default_items = [
-            ChecklistItem(description="Fed the pet", is_default=True),
-            ChecklistItem(description="Gave medication", is_default=True),
-            ChecklistItem(description="Refreshed water", is_default=True),
-            ChecklistItem(description="Provided playtime/exercise", is_default=True),
-            ChecklistItem(description="Cleaned litter box/living area", is_default=True)
-        ]
-        for item in default_items:
-            db.session.add(item)
-        db.session.commit()
-    
-    # Import and add enhanced checklist items
-    from app_utils import create_default_enhanced_checklist_items
-    create_default_enhanced_checklist_items(db, EnhancedChecklistItem)
+# Per-request SQL counts and timings: X-SQL-* headers in debug mode, and a
+# warning for requests over these thresholds or repeating a query in a loop
+from pawpass.monitoring import SQLInstrumentation
+app.config["SQL_SLOW_REQUEST_QUERIES"] = int(os.environ.get("SQL_SLOW_REQUEST_QUERIES", 30))
+app.config["SQL_SLOW_REQUEST_MS"] = float(os.environ.get("SQL_SLOW_REQUEST_MS", 250))
+app.config["SQL_REPEATED_STATEMENT_THRESHOLD"] = int(os.environ.get("SQL_REPEATED_STATEMENT_THRESHOLD", 10))
+sql_instrumentation = SQLInstrumentation(app, db)
+
+# Prometheus-style /metrics: request latency per endpoint, in-flight requests,
+# connection pool usage, plus the AI and image metrics recorded where they happen
+from pawpass.monitoring import RequestMetrics, metrics
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+request_metrics = RequestMetrics(app, db)
+image_processing_seconds = metrics.histogram('pawpass_image_processing_seconds',
+                                             'Time to resize an uploaded pet image', ['operation'])
+image_processing_errors = metrics.counter('pawpass_image_processing_errors_total',
+                                          'Uploaded pet images that could not be resized', ['operation'])
+
+# On-demand profiling of single requests for admins holding a signed token
+# (see `flask profile-token`); disabled unless PROFILING_SECRET is set
+from pawpass.monitoring import RequestProfiler, sign_profile_token
+app.config["PROFILING_SECRET"] = os.environ.get("PROFILING_SECRET")
+request_profiler = RequestProfiler(app)
+
+# Full-text search over pet profiles and updates, kept in sync on every write
+from pawpass.search import FullTextIndex, PetNameAutocomplete
+from pawpass.importer import PetImporter, SyntheticShelter
+pet_search = FullTextIndex(db, SearchDocument)
+pet_search.watch(Pet, PetUpdate)
+
+# Per-pet history counts and latest entries, kept in sync on every write
+from pawpass.activity import ActivityCounters
+pet_activity = ActivityCounters(db, PetActivity, SequenceCounter)
+pet_activity.watch(Pet, {'update': PetUpdate, 'checklist': Checklist, 'weight': WeightRecord},
+                   latest_values={'latest_weight': WeightRecord.weight})
+
+# Log of the latest change to every pet and history record, read by /api/sync. Created after
+# pet_activity, so every commit locks the version counter before the sequence number counter
+from pawpass.sync import ChangeLog
+change_log = ChangeLog(db, SyncChange, SequenceCounter)
+change_log.watch(Pet, {'update': PetUpdate, 'checklist': Checklist, 'weight': WeightRecord})
+app.config["SYNC_TOMBSTONE_DAYS"] = int(os.environ.get("SYNC_TOMBSTONE_DAYS", 90))
+
+# Idempotency keys of applied client writes, so a retried offline write is not recorded twice
+from pawpass.sync import IdempotencyKeys
+app.config["INGEST_KEY_DAYS"] = int(os.environ.get("INGEST_KEY_DAYS", 30))
+ingest_keys = IdempotencyKeys(db, IngestKey)
+ingest_items_total = metrics.counter('pawpass_ingest_items_total',
+                                     'Queued offline writes received by /api/ingest', ['status'])
+
+# Rendered pet profiles and pet lists, served from memory until a write
+# changes the version of the pets they show
+from pawpass.cache import PageCache, conditional_response
+app.config["PAGE_CACHE_ENABLED"] = os.environ.get("PAGE_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+app.config["PAGE_CACHE_MAX_BYTES"] = int(os.environ.get("PAGE_CACHE_MAX_MB", 32)) * 1024 * 1024
+page_cache = PageCache(app)
+
+# In-memory name/breed autocomplete, built on first use and updated by the pet routes
+pet_autocomplete = PetNameAutocomplete(
+    loader=lambda: db.session.query(Pet.id, Pet.name, Pet.breed, Pet.species).all(),
+    version=lambda: db.session.query(func.count(Pet.id), func.max(Pet.id), func.max(Pet.updated_at)).one()
+)
 
 # Data storage path (for migration/fallback)
 PETS_DATA_FILE = os.path.join(os.path.dirname(__file__), 'static', 'data', 'pets.json')
@@ -81,76 +156,202 @@ def migrate_data_to_db():
     # Only migrate if the database is empty and JSON file exists
     if Pet.query.count() == 0 and os.path.exists(PETS_DATA_FILE):
         try:
-            # Load JSON data
-            with open(PETS_DATA_FILE, 'r') as f:
-                pets_data = json.load(f)
-            
-            # Create Pet objects from JSON data
-            for pet_data in pets_data:
-                # Create pet
-                pet = Pet(
-                    name=pet_data['name'],
-                    species=pet_data['species'],
-                    description=pet_data.get('behavior_notes', ''),
-                    image_url=pet_data.get('image', ''),
-                    is_emergency=False
-                )
-                db.session.add(pet)
-                db.session.flush()  # To get the pet ID
-                
-                # Add updates
-                for update in pet_data.get('updates', []):
-                    update_date = datetime.strptime(update['date'], '%Y-%m-%d').date()
-                    update_time = datetime.strptime(update['time'], '%H:%M').time()
-                    pet_update = PetUpdate(
-                        pet_id=pet.id,
-                        update_text=update['note'],
-                        update_date=update_date,
-                        update_time=update_time
-                    )
-                    db.session.add(pet_update)
-                
-                # Add checklists
-                for checklist_data in pet_data.get('checklists', []):
-                    check_date = datetime.strptime(checklist_data['date'], '%Y-%m-%d').date()
-                    check_time = datetime.strptime(checklist_data['time'], '%H:%M').time()
-                    
-                    checklist = Checklist(
-                        pet_id=pet.id,
-                        completion_date=check_date,
-                        completion_time=check_time,
-                        notes=checklist_data.get('notes', '')
-                    )
-                    db.session.add(checklist)
-                    db.session.flush()  # To get the checklist ID
-                    
-                    # Add checklist items
-                    checklist_items = ChecklistItem.query.filter_by(is_default=True).all()
-                    for item in checklist_items:
-                        is_completed = False
-                        if 'fed' in item.description.lower() and checklist_data.get('fed'):
-                            is_completed = True
-                        elif 'medication' in item.description.lower() and checklist_data.get('meds'):
-                            is_completed = True
-                        elif 'water' in item.description.lower() and checklist_data.get('water'):
-                            is_completed = True
-                        elif 'play' in item.description.lower() and checklist_data.get('playtime'):
-                            is_completed = True
-                        
-                        completion = ChecklistCompletion(
-                            checklist_id=checklist.id,
-                            checklist_item_id=item.id,
-                            completed=is_completed
-                        )
-                        db.session.add(completion)
-            
-            db.session.commit()
-            logging.info("Successfully migrated JSON data to database")
-            
+            importer = PetImporter(db, search_index=pet_search, activity=pet_activity, changes=change_log,
+                                   shelter_timezone=SHELTER_TIMEZONE)
+            stats = importer.run(PETS_DATA_FILE, restart=True)
+            logging.info(f"Successfully migrated JSON data to database: {stats}")
         except Exception as e:
-            db.session.rollback()
             logging.error(f"Error migrating data to database: {e}")
 
+# Indexes on the old (pet_id, date, time, id) columns, replaced by the occurred_at indexes
+SUPERSEDED_INDEXES = ('ix_pet_updates_pet_moment', 'ix_checklists_pet_moment', 'ix_weight_records_pet_moment')
+
+def backfill_occurred_at(batch_size=1000):
+    """Add occurred_at to history tables created before it existed and fill it from the date and time columns"""
+    inspector = db.inspect(db.engine)
+    for model, (date_attribute, time_attribute) in MOMENT_ATTRIBUTES.items():
+        table = model.__table__
+        if 'occurred_at' not in {column['name'] for column in inspector.get_columns(table.name)}:
+            column_type = table.c.occurred_at.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN occurred_at {column_type}"))
+            logging.info(f"Added occurred_at to {table.name}")
+        
+        date_column, time_column = getattr(model, date_attribute), getattr(model, time_attribute)
+        filled = 0
+        while True:
+            rows = db.session.query(model.id, date_column, time_column)\
+                .filter(model.occurred_at.is_(None)).limit(batch_size).all()
+            if not rows:
+                break
+            # Bulk UPDATE by primary key, one statement per batch
+            db.session.execute(db.update(model), [
+                {"id": row_id, "occurred_at": shelter_moment(row_date, row_time)}
+                for row_id, row_date, row_time in rows
+            ])
+            db.session.commit()
+            filled += len(rows)
+        if filled:
+            logging.info(f"Backfilled occurred_at for {filled} rows of {table.name}")
+    
+    with db.engine.begin() as connection:
+        for index_name in SUPERSEDED_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+def init_database():
+    """Create tables, indexes and default data, and migrate pets.json; safe to run repeatedly"""
+    with app.app_context():
+        db.create_all()
+        backfill_occurred_at()
+        pet_activity.create_schema()
+        
+        # create_all() only adds indexes along with new tables, so create any
+        # indexes that are missing from existing tables
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        
+        pet_search.create_schema()
+        change_log.create_schema()
+        pet_activity.backfill()
+        change_log.backfill()
+        
+        # Add default checklist items if none exist
+        if ChecklistItem.query.count() == 0:
+            default_items = [
+                ChecklistItem(description="Fed the pet", is_default=True),
+                ChecklistItem(description="Gave medication", is_default=True),
+                ChecklistItem(description="Refreshed water", is_default=True),
+                ChecklistItem(description="Provided playtime/exercise", is_default=True),
+                ChecklistItem(description="Cleaned litter box/living area", is_default=True)
+            ]
+            for item in default_items:
+                db.session.add(item)
+            db.session.commit()
+        
+        # Import and add enhanced checklist items
+        from app_utils import create_default_enhanced_checklist_items
+        create_default_enhanced_checklist_items(db, EnhancedChecklistItem)
+        
+        # Try to migrate data from JSON to database if needed
+        migrate_data_to_db()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the schema and seed default data (run once per deploy, before starting workers)"""
+    init_database()
+    click.echo("Initialized the database")
+
+from pawpass.monitoring import configure_logging
+
+def prepare_app(init_db=None):
+    """
+    Prepare the application to serve requests in this process
+    
+    This is not an application factory: app.py builds its one Flask app
+    when it is imported, with its routes, CLI commands and request
+    instrumentation, and every call returns that same app. This adds the
+    process-wide setup a server needs: logging, and optionally the
+    schema. Calling it again reconfigures logging. Importing does
+    not touch the database, so workers start without running schema
+    checks. Run `flask init-db` once per deploy, or pass init_db (or set
+    PAWPASS_INIT_DB=1) to initialize on startup.
+    
+    Args:
+        init_db: Initialize the database before returning the app
+    
+    Returns:
+        Flask: The module's application
+    """
+    # Logging is set up here rather than on import, so scripts, tests and tools that
+    # import the app keep their own: records are queued and written as JSON lines by
+    # a background thread, with per-logger levels such as
+    # LOG_LEVELS="root=INFO,pawpass.ai=DEBUG" and high-frequency INFO/DEBUG lines
+    # sampled. Set LOG_FORMAT=text for plain lines.
+    configure_logging(levels=os.environ.get("LOG_LEVELS", "root=INFO"),
+                      json_output=os.environ.get("LOG_FORMAT", "json").lower() == "json",
+                      sampling=os.environ.get("LOG_SAMPLING", "1").lower() not in ("0", "false", "no"))
+    if init_db is None:
+        init_db = os.environ.get("PAWPASS_INIT_DB", "").lower() in ("1", "true", "yes")
+    if init_db:
+        init_database()
+    return app
+
+@app.cli.command('import-pets')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=500, show_default=True, help='Pets inserted and committed per chunk')
+@click.option('--restart', is_flag=True, help='Ignore saved progress and import from the first record')
+def import_pets_command(path, chunk_size, restart):
+    """Stream a pets.json-style export into the database, resuming an interrupted import"""
+    try:
+        stats = PetImporter(db, search_index=pet_search, activity=pet_activity, changes=change_log,
+                            chunk_size=chunk_size, shelter_timezone=SHELTER_TIMEZONE).run(path, restart=restart)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    
+    click.echo(f"Imported {stats['pets']} pets, {stats['updates']} updates and {stats['checklists']} checklists "
+               f"in {stats['seconds']:.1f}s ({stats['pets'] / max(stats['seconds'], 0.001):.0f} pets/s)")
+    if stats['skipped']:
+        click.echo(f"Skipped {stats['skipped']} pets imported by an earlier run")
+
+@app.cli.command('generate-shelter')
+@click.option('--pets', 'pet_count', default=1000, show_default=True, help='Number of pets to create')
+@click.option('--seed', default=42, show_default=True, help='Random seed; the same seed gives the same data')
+@click.option('--chunk-size', default=1000, show_default=True, help='Pets inserted and committed per chunk')
+def generate_shelter_command(pet_count, seed, chunk_size):
+    """Fill the database with a synthetic shelter's pets and care history, for benchmarks and local testing"""
+    stats = SyntheticShelter(db, seed=seed, search_index=pet_search, activity=pet_activity, changes=change_log,
+                             chunk_size=chunk_size, shelter_timezone=SHELTER_TIMEZONE).generate(pet_count)
+    click.echo(f"Generated {stats['pets']} pets, {stats['updates']} updates, {stats['checklists']} checklists "
+               f"and {stats['weights']} weight records in {stats['seconds']:.1f}s")
+
+@app.cli.command('profile-token')
+@click.argument('path')
+@click.option('--minutes', default=10, show_default=True, help='How long the token stays valid')
+def profile_token_command(path, minutes):
+    """Print a token that profiles requests to PATH, e.g. /pet/12 (send it as the X-Profile header)"""
+    secret = app.config['PROFILING_SECRET']
+    if not secret:
+        raise click.ClickException("Set PROFILING_SECRET to enable request profiling")
+    click.echo(sign_profile_token(secret, path, expires_in=minutes * 60))
+
+@app.cli.command('repair-activity')
+@click.option('--check', is_flag=True, help='Only report pets whose counters are wrong')
+@click.option('--rebuild', is_flag=True, help='Recompute every pet instead of only the stale ones')
+def repair_activity_command(check, rebuild):
+    """Find per-pet activity counters that drifted from the history tables and recompute them"""
+    if rebuild:
+        pet_activity.rebuild()
+        click.echo("Rebuilt the activity counters for every pet")
+        return
+    
+    stale = pet_activity.stale_pet_ids()
+    if check:
+        click.echo(f"{len(stale)} pets have stale activity counters" + (f": {stale[:20]}" if stale else ""))
+        if stale:
+            raise SystemExit(1)
+        return
+    
+    pet_activity.refresh_pets(stale)
+    orphans = pet_activity.remove_orphans()
+    db.session.commit()
+    click.echo(f"Recomputed the activity counters of {len(stale)} pets and removed {orphans} orphaned rows")
+
+@app.cli.command('prune-ingest-keys')
+@click.option('--days', type=int, default=None, help='Keep keys this many days [default: INGEST_KEY_DAYS, 30]')
+def prune_ingest_keys_command(days):
+    """Forget the idempotency keys of old writes; a retry older than this is applied again"""
+    deleted = ingest_keys.prune(days if days is not None else app.config["INGEST_KEY_DAYS"])
+    click.echo(f"Deleted {deleted} idempotency keys")
+
+@app.cli.command('prune-sync-tombstones')
+@click.option('--days', type=int, default=None,
+              help='Keep tombstones this many days [default: SYNC_TOMBSTONE_DAYS, 90]')
+def prune_sync_tombstones_command(days):
+    """Forget old deletions in the sync change log; clients that last synced before them start over"""
+    deleted = change_log.prune(days if days is not None else app.config["SYNC_TOMBSTONE_DAYS"])
+    click.echo(f"Deleted {deleted} sync tombstones")
+
 def load_pets():
     """Load all pets from the database"""
     try:
@@ -169,6 +370,291 @@ def get_pet_by_id(pet_id):
         logging.error(f"Error getting pet by ID: {e}")
         return None
 
+def get_page_args():
+    """Read the keyset pagination parameters (limit, after) from the request"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = request.args.get('after', type=int)
+    return limit, after
+
+def pet_columns(fields=PET_SUMMARY_FIELDS):
+    """Loader option that loads only the Pet columns behind the given JSON fields"""
+    columns = [getattr(Pet, field) for field in fields if field not in PET_HISTORY_FIELDS]
+    return load_only(Pet.id, *columns)
+
+def get_fields_arg():
+    """Read the ?fields= sparse fieldset from the request
+
+    Returns None when every field is wanted, and raises ValueError for
+    fields the pet JSON does not have.
+    """
+    if request.args.get('view') == 'summary':
+        return PET_SUMMARY_FIELDS
+    if not request.args.get('fields'):
+        return None
+    
+    fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+    unknown = [field for field in fields if field not in PET_JSON_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(fields)
+
+def paginate_pets(query, limit, after=None):
+    """Fetch one page of pets ordered by ID, returning the page and the cursor for the next one"""
+    if after is not None:
+        query = query.filter(Pet.id > after)
+    
+    # Fetch one extra row to find out whether another page follows
+    pets = query.order_by(Pet.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(pets) > limit:
+        pets = pets[:limit]
+        next_cursor = pets[-1].id
+    return pets, next_cursor
+
+def search_pets(search_query, limit, after=None, conditions=(), options=()):
+    """Fetch one page of full-text search results, returning the pets and the cursor for the next page
+
+    Results are ranked rather than ordered by ID, so the cursor is the
+    number of results already shown.
+    """
+    offset = after or 0
+    restrict_to = db.select(Pet.id).where(*conditions) if conditions else None
+    pet_ids = pet_search.search(search_query, limit + 1, offset, restrict_to=restrict_to)
+    next_cursor = offset + limit if len(pet_ids) > limit else None
+    pet_ids = pet_ids[:limit]
+    
+    query = Pet.query.options(pet_columns(), *options)
+    pets_by_id = {pet.id: pet for pet in query.filter(Pet.id.in_(pet_ids)).all()} if pet_ids else {}
+    return [pets_by_id[pet_id] for pet_id in pet_ids if pet_id in pets_by_id], next_cursor
+
+def pet_age_band():
+    """SQL expression mapping a pet's age to one of the AGE_BANDS keys"""
+    return case(
+        (Pet.age.is_(None), 'unknown'),
+        (Pet.age <= 2, 'young'),
+        (Pet.age <= 7, 'adult'),
+        else_='senior'
+    )
+
+def pet_gender():
+    """SQL expression for a pet's gender, with blanks counted as Unknown"""
+    return func.coalesce(func.nullif(Pet.gender, ''), 'Unknown')
+
+def get_facet_args():
+    """Read the facet filters (species, emergency, age, gender) from the request"""
+    age = request.args.get('age')
+    return {
+        'species': request.args.get('species') or None,
+        'emergency': request.args.get('emergency', '').lower() in ('1', 'true', 'yes', 'on'),
+        'age': age if age in dict(AGE_BANDS) else None,
+        'gender': request.args.get('gender') or None
+    }
+
+def facet_conditions(facets):
+    """SQL conditions for the active facet filters"""
+    conditions = []
+    if facets['species']:
+        conditions.append(Pet.species == facets['species'])
+    if facets['emergency']:
+        conditions.append(Pet.is_emergency.is_(True))
+    if facets['age']:
+        conditions.append(pet_age_band() == facets['age'])
+    if facets['gender']:
+        conditions.append(pet_gender() == facets['gender'])
+    return conditions
+
+def facet_url_args(facets):
+    """Turn the active facet filters back into URL arguments"""
+    return {
+        'species': facets['species'],
+        'emergency': 1 if facets['emergency'] else None,
+        'age': facets['age'],
+        'gender': facets['gender']
+    }
+
+def get_facet_counts(facets, search_query=''):
+    """Count pets for every facet value with one grouped aggregate query
+
+    Each facet's counts apply the other active filters but not its own, so
+    they show how many pets choosing that value would list.
+    """
+    counts = {name: {} for name in FACET_NAMES}
+    age_band = pet_age_band().label('age_band')
+    gender = pet_gender().label('gender')
+    query = db.session.query(Pet.species, Pet.is_emergency, age_band, gender, func.count(Pet.id))
+    if search_query:
+        matching_pet_ids = pet_search.matching_pet_ids(search_query)
+        if matching_pet_ids is None:
+            return counts
+        query = query.filter(Pet.id.in_(matching_pet_ids))
+    
+    for species, is_emergency, band, gender_value, count in query.group_by(Pet.species, Pet.is_emergency, age_band, gender).all():
+        values = {'species': species, 'emergency': bool(is_emergency), 'age': band, 'gender': gender_value}
+        for name in FACET_NAMES:
+            if all(not facets[other] or values[other] == facets[other] for other in FACET_NAMES if other != name):
+                counts[name][values[name]] = counts[name].get(values[name], 0) + count
+    return counts
+
+# Event sources merged into a pet's care timeline: (type, model).
+# Events sharing the same moment are ordered by their position in this tuple.
+TIMELINE_SOURCES = (
+    ('update', PetUpdate),
+    ('checklist', Checklist),
+    ('weight', WeightRecord),
+)
+
+# Timeline cursors count microseconds since the epoch, so they stay exact and URL-safe
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+def encode_timeline_cursor(event_type, event):
+    """Build the opaque cursor that points just past a timeline event"""
+    return f"{(event.occurred_at - EPOCH) // MICROSECOND}_{event_type}_{event.id}"
+
+def decode_timeline_cursor(cursor):
+    """Parse a timeline cursor into (occurred_at, rank, id), or None if it is malformed"""
+    try:
+        micros, event_type, event_id = cursor.split('_')
+        rank = [s[0] for s in TIMELINE_SOURCES].index(event_type)
+        return EPOCH + int(micros) * MICROSECOND, rank, int(event_id)
+    except (ValueError, OverflowError):
+        return None
+
+def get_pet_timeline(pet_id, limit, before=None):
+    """Get one page of a pet's updates, checklists and weight records, newest first
+
+    Each source is read with a keyset seek on its (pet_id, occurred_at, id)
+    index, so any page costs the same as the first. Returns a list of
+    (type, record) pairs and the cursor for the next page.
+    """
+    events = []
+    for rank, (event_type, model) in enumerate(TIMELINE_SOURCES):
+        query = model.query.filter(model.pet_id == pet_id)
+        if model is Checklist:
+            query = query.options(selectinload(Checklist.completed_items).joinedload(ChecklistCompletion.checklist_item))
+        
+        if before:
+            before_moment, before_rank, before_id = before
+            if rank == before_rank:
+                query = query.filter(tuple_(model.occurred_at, model.id) < (before_moment, before_id))
+            elif rank < before_rank:
+                query = query.filter(model.occurred_at <= before_moment)
+            else:
+                query = query.filter(model.occurred_at < before_moment)
+        
+        records = query.order_by(model.occurred_at.desc(), model.id.desc()).limit(limit + 1).all()
+        for record in records:
+            events.append(((record.occurred_at, rank, record.id), event_type, record))
+    
+    events.sort(key=lambda event: event[0], reverse=True)
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_timeline_cursor(events[-1][1], events[-1][2])
+    return [(event_type, record) for _, event_type, record in events], next_cursor
+
+def recent_history_ids(model, per_pet=3):
+    """Select the IDs of every pet's newest per_pet records of a history model"""
+    position = func.row_number().over(partition_by=model.pet_id,
+                                      order_by=(model.occurred_at.desc(), model.id.desc()))
+    ranked = db.select(model.id, position.label('position')).subquery()
+    return db.select(ranked.c.id).where(ranked.c.position <= per_pet)
+
+def get_recent_history(model, per_pet=3):
+    """Get every pet's newest per_pet records of a history model in one query
+
+    Returns:
+        dict: Pet ID to that pet's records, newest first
+    """
+    records = (model.query.filter(model.id.in_(recent_history_ids(model, per_pet)))
+               .order_by(model.pet_id, model.occurred_at.desc(), model.id.desc()).all())
+    history = {}
+    for record in records:
+        history.setdefault(record.pet_id, []).append(record)
+    return history
+
+def get_completed_item_descriptions(checklist_ids):
+    """Get the descriptions of the ticked items of each checklist, in completion order
+
+    Args:
+        checklist_ids: Checklist IDs, as a list or a select of IDs
+    """
+    rows = db.session.execute(
+        db.select(ChecklistCompletion.checklist_id, ChecklistItem.description)
+        .join(ChecklistItem, ChecklistItem.id == ChecklistCompletion.checklist_item_id)
+        .where(ChecklistCompletion.checklist_id.in_(checklist_ids), ChecklistCompletion.completed.is_(True))
+        .order_by(ChecklistCompletion.id)
+    )
+    descriptions = {}
+    for checklist_id, description in rows:
+        descriptions.setdefault(checklist_id, []).append(description)
+    return descriptions
+
+def timeline_event_to_json(event_type, record):
+    """Convert a timeline (type, record) pair to a JSON-serializable dictionary"""
+    if event_type == 'update':
+        return {
+            "type": event_type,
+            "id": record.id,
+            "occurred_at": record.occurred_at.isoformat(),
+            "date": record.update_date.strftime('%Y-%m-%d'),
+            "time": record.update_time.strftime('%H:%M'),
+            "note": record.update_text,
+            "volunteer": record.volunteer_name
+        }
+    if event_type == 'checklist':
+        return {
+            "type": event_type,
+            "id": record.id,
+            "occurred_at": record.occurred_at.isoformat(),
+            "date": record.completion_date.strftime('%Y-%m-%d'),
+            "time": record.completion_time.strftime('%H:%M'),
+            "notes": record.notes,
+            "volunteer": record.volunteer_name,
+            "completed_items": [{
+                "id": completion.checklist_item.id,
+                "description": completion.checklist_item.description
+            } for completion in record.completed_items if completion.completed]
+        }
+    return {
+        "type": event_type,
+        "id": record.id,
+        "occurred_at": record.occurred_at.isoformat(),
+        "date": record.record_date.strftime('%Y-%m-%d'),
+        "time": record.record_time.strftime('%H:%M'),
+        "weight": record.weight,
+        "notes": record.notes,
+        "volunteer": record.volunteer_name
+    }
+
+def delete_pet_records(pet_id):
+    """
+    Delete a pet and everything recorded about it with a fixed number of set-based DELETEs
+    
+    Bulk deletes skip the ORM cascades and mapper events, so no history rows are
+    loaded into memory and the write lock is held only for these statements.
+    The caller commits.
+    
+    Returns:
+        dict: Number of rows deleted per table
+    """
+    checklist_ids = db.select(Checklist.id).where(Checklist.pet_id == pet_id)
+    deleted = {
+        'checklist_completions': ChecklistCompletion.query
+            .filter(ChecklistCompletion.checklist_id.in_(checklist_ids))
+            .delete(synchronize_session=False),
+        'checklists': Checklist.query.filter_by(pet_id=pet_id).delete(synchronize_session=False),
+        'pet_updates': PetUpdate.query.filter_by(pet_id=pet_id).delete(synchronize_session=False),
+        'weight_records': WeightRecord.query.filter_by(pet_id=pet_id).delete(synchronize_session=False),
+        'search_documents': SearchDocument.query.filter_by(pet_id=pet_id).delete(synchronize_session=False),
+        'pet_activity': PetActivity.query.filter_by(pet_id=pet_id).delete(synchronize_session=False),
+        'pets': Pet.query.filter_by(id=pet_id).delete(synchronize_session=False),
+    }
+    pet_activity.record_pets_deleted([pet_id])
+    change_log.record_pets_deleted([pet_id])
+    return deleted
+
 # Helper function to check if file extension is allowed
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -196,12 +682,15 @@ def save_pet_image(file):
             
             # Create a thumbnail version (optional for performance)
             try:
-                with Image.open(file_path) as img:
+                # Pillow is only loaded by workers that handle uploads
+                from PIL import Image
+                with image_processing_seconds.time(operation='thumbnail'), Image.open(file_path) as img:
                     # Keep aspect ratio, max dimension 800px
                     img.thumbnail((800, 800))
                     img.save(file_path)
                     logging.info(f"Created thumbnail for {file_path}")
             except Exception as e:
+                image_processing_errors.inc(operation='thumbnail')
                 logging.error(f"Error creating thumbnail: {e}")
             
             # Return the relative path for storage in the database WITH leading slash
@@ -213,10 +702,6 @@ def save_pet_image(file):
             
     return None
 
-# Try to migrate data from JSON to database if needed
-with app.app_context():
-    migrate_data_to_db()
-
 # Routes
 @app.route('/')
 def home():
@@ -225,33 +710,39 @@ def home():
 
 @app.route('/pets')
 def pet_center():
-    """Pet Care Center - displays list of all pets"""
+    """Pet Care Center - displays a page of pets, cached until any pet changes"""
+    with app.app_context():
+        version = pet_activity.collection_version()
+    return page_cache.get_or_render(('pets', request.query_string), version, render_pet_center)
+
+def render_pet_center():
+    """Render the Pet Care Center page for the current request's search, facets and page"""
     search_query = request.args.get('search', '').strip()
+    limit, after = get_page_args()
+    facets = get_facet_args()
     logging.info(f"Search query: '{search_query}'")
     
+    # Each card's latest update comes from the pet's activity row, joined
+    # into the same query as the pets
+    card_options = (joinedload(Pet.activity).joinedload(PetActivity.last_update),)
+    
     with app.app_context():
+        conditions = facet_conditions(facets)
         if search_query:
-            # Search for pets by name (case-insensitive)
-            pets = Pet.query.filter(Pet.name.ilike(f'%{search_query}%')).all()
-            logging.info(f"Found {len(pets)} pets matching search: '{search_query}'")
-            for pet in pets:
-                logging.info(f"  - Pet match: {pet.id}, {pet.name}")
+            # Full-text search over names, breeds, notes and updates, best match first
+            pets, next_cursor = search_pets(search_query, limit, after, conditions, card_options)
+            logging.info(f"Found {len(pets)} pets on this page matching search: '{search_query}'")
         else:
-            # Get all pets
-            pets = Pet.query.all()
-            logging.info(f"No search query, showing all {len(pets)} pets")
-        
-        # Get the latest update for each pet
-        pet_last_updates = {}
-        for pet in pets:
-            latest_update = PetUpdate.query.filter_by(pet_id=pet.id)\
-                .order_by(PetUpdate.update_date.desc(), PetUpdate.update_time.desc())\
-                .first()
-            
-            if latest_update:
-                pet_last_updates[pet.id] = latest_update
+            pets, next_cursor = paginate_pets(Pet.query.options(pet_columns(), *card_options).filter(*conditions),
+                                              limit, after)
+            logging.info(f"No search query, showing {len(pets)} pets")
+        
+        facet_counts = get_facet_counts(facets, search_query)
     
-    return render_template('index.html', pets=pets, search_query=search_query, pet_last_updates=pet_last_updates)
+    return render_template('index.html', pets=pets, search_query=search_query,
+                           limit=limit, after=after, next_cursor=next_cursor,
+                           facets=facets, facet_args=facet_url_args(facets), facet_counts=facet_counts,
+                           age_bands=AGE_BANDS)
 
 # Legacy route for backward compatibility
 @app.route('/index')
@@ -261,28 +752,24 @@ def index():
 
 @app.route('/pet/<int:pet_id>')
 def pet_profile(pet_id):
-    """Pet profile page"""
+    """Pet profile page, cached until the pet or its history changes"""
+    with app.app_context():
+        version = pet_activity.pet_version(pet_id)
+    if version is None:
+        # No activity row: a missing pet, or one written without the counters
+        return render_pet_profile(pet_id)
+    return page_cache.get_or_render(('pet', pet_id), version, lambda: render_pet_profile(pet_id))
+
+def render_pet_profile(pet_id):
+    """Render a pet's profile page, or redirect to the pet list if it does not exist"""
     pet = get_pet_by_id(pet_id)
     if pet:
-        # Get the pet's updates, sorted by date and time (most recent first)
+        # Get the first page of the pet's care timeline; older history is
+        # loaded from the timeline API as the volunteer scrolls
         with app.app_context():
-            pet_updates = PetUpdate.query.filter_by(pet_id=pet.id)\
-                .order_by(PetUpdate.update_date.desc(), PetUpdate.update_time.desc()).all()
-            
-            # Get pet's checklists, sorted by date and time (most recent first)
-            pet_checklists = Checklist.query.filter_by(pet_id=pet.id)\
-                .order_by(Checklist.completion_date.desc(), Checklist.completion_time.desc()).all()
-            
-            # Get completed items for each checklist
-            for checklist in pet_checklists:
-                checklist.completed_items = []
-                completions = ChecklistCompletion.query.filter_by(checklist_id=checklist.id, completed=True).all()
-                for completion in completions:
-                    item = ChecklistItem.query.get(completion.checklist_item_id)
-                    if item:
-                        checklist.completed_items.append(item)
-        
-        return render_template('pet.html', pet=pet, updates=pet_updates, checklists=pet_checklists)
+            timeline, next_cursor = get_pet_timeline(pet.id, TIMELINE_PAGE_SIZE)
+        
+        return render_template('pet.html', pet=pet, timeline=timeline, next_cursor=next_cursor)
     else:
         flash('Pet not found', 'error')
         return redirect(url_for('index'))
@@ -361,6 +848,7 @@ def edit_pet(pet_id):
                 pet.updated_at = datetime.utcnow()
                 
                 db.session.commit()
+                pet_autocomplete.update(pet)
                 
                 # Success message with emoji
                 flash(f'Pet {name} has been updated successfully 🐾✨', 'success')
@@ -380,36 +868,20 @@ def delete_pet(pet_id):
     logging.info(f"Deleting pet with ID: {pet_id}")
     
     with app.app_context():
-        # Get the pet by ID directly
-        pet = Pet.query.get(pet_id)
+        # Only the name is needed for the messages
+        pet_name = db.session.query(Pet.name).filter_by(id=pet_id).scalar()
         
-        if not pet:
+        if pet_name is None:
             flash('Pet not found ❌', 'error')
             return redirect(url_for('index'))
         
-        pet_name = pet.name
         logging.info(f"Found pet: {pet_name} (ID: {pet_id})")
         
         try:
-            # Delete pet updates
-            update_count = PetUpdate.query.filter_by(pet_id=pet.id).delete()
-            logging.info(f"Deleted {update_count} updates for pet {pet_name}")
-            
-            # Get all checklists for this pet
-            checklists = Checklist.query.filter_by(pet_id=pet.id).all()
-            
-            # Delete checklist completions for each checklist
-            for checklist in checklists:
-                completion_count = ChecklistCompletion.query.filter_by(checklist_id=checklist.id).delete()
-                logging.info(f"Deleted {completion_count} checklist completions for checklist {checklist.id}")
-            
-            # Delete checklists
-            checklist_count = Checklist.query.filter_by(pet_id=pet.id).delete()
-            logging.info(f"Deleted {checklist_count} checklists for pet {pet_name}")
-            
-            # Delete the pet
-            db.session.delete(pet)
+            deleted = delete_pet_records(pet_id)
             db.session.commit()
+            logging.info(f"Deleted pet {pet_name} and its history: {deleted}")
+            pet_autocomplete.remove(pet_id)
             
             # Success message with emoji
             flash(f'Pet {pet_name} has been deleted successfully 🐾✨', 'success')
@@ -444,8 +916,7 @@ def add_update(pet_id):
                 new_update = PetUpdate(
                     pet_id=pet.id,
                     update_text=update_text,
-                    update_date=now_pacific.date(),
-                    update_time=now_pacific.time(),
+                    occurred_at=now_pacific,
                     volunteer_name=request.form.get('volunteer_name', '')
                 )
                 
@@ -523,6 +994,7 @@ def add_pet():
                 
                 db.session.add(pet)
                 db.session.commit()
+                pet_autocomplete.add(pet)
                 
                 # Success message with emoji
                 flash(f'Pet {name} added successfully 🐾✨', 'success')
@@ -571,8 +1043,7 @@ def complete_checklist(pet_id):
             checklist = Checklist(
                 pet_id=pet.id,
                 volunteer_name=volunteer_name,
-                completion_date=now_pacific.date(),
-                completion_time=now_pacific.time(),
+                occurred_at=now_pacific,
                 notes=notes
             )
             
@@ -658,90 +1129,278 @@ def complete_checklist(pet_id):
     
     return render_template('checklist.html', pet=pet, checklist_items=checklist_items)
 
-# Helper function to serialize a Pet object to JSON
-def pet_to_json(pet):
+# Helper functions to serialize Pet objects to JSON
+def pet_summary_to_json(pet):
+    """Convert a Pet object to a short dictionary for listings and search results"""
+    return {field: getattr(pet, field) for field in PET_SUMMARY_FIELDS}
+
+def pet_to_json(pet, fields=None):
     """Convert a Pet object to a JSON-serializable dictionary"""
+    return pets_to_json([pet], fields)[0]
+
+def pets_to_json(pets, fields=None):
+    """Convert Pet objects to JSON-serializable dictionaries using a fixed number of queries
+
+    Only the given fields are included, and the update and checklist queries
+    are skipped when those fields are not requested.
+    """
+    fields = fields or PET_JSON_FIELDS
+    pet_ids = [pet.id for pet in pets]
+    if not pet_ids:
+        return []
+    
+    if not any(field in PET_HISTORY_FIELDS for field in fields):
+        return [{field: getattr(pet, field) for field in fields} for pet in pets]
+    
     with app.app_context():
-        # Get pet updates
-        updates = []
-        for update in PetUpdate.query.filter_by(pet_id=pet.id).order_by(PetUpdate.created_at.desc()).all():
-            updates.append({
-                "id": update.id,
-                "date": update.update_date.strftime('%Y-%m-%d'),
-                "time": update.update_time.strftime('%H:%M'),
-                "note": update.update_text,
-                "volunteer": update.volunteer_name
-            })
+        # Get the updates for every pet at once
+        updates_by_pet = {pet_id: [] for pet_id in pet_ids}
+        if 'updates' in fields:
+            for update in PetUpdate.query.filter(PetUpdate.pet_id.in_(pet_ids)).order_by(PetUpdate.occurred_at.desc(), PetUpdate.id.desc()).all():
+                updates_by_pet[update.pet_id].append({
+                    "id": update.id,
+                    "occurred_at": update.occurred_at.isoformat(),
+                    "date": update.update_date.strftime('%Y-%m-%d'),
+                    "time": update.update_time.strftime('%H:%M'),
+                    "note": update.update_text,
+                    "volunteer": update.volunteer_name
+                })
         
-        # Get pet checklists with completed items
-        checklists = []
-        for checklist in Checklist.query.filter_by(pet_id=pet.id).order_by(Checklist.created_at.desc()).all():
-            # Get the completed items for this checklist
-            completed_items = []
-            for completion in ChecklistCompletion.query.filter_by(checklist_id=checklist.id).all():
-                if completion.completed:
-                    item = ChecklistItem.query.get(completion.checklist_item_id)
-                    completed_items.append({
-                        "id": item.id,
-                        "description": item.description
-                    })
+        checklists_by_pet = {pet_id: [] for pet_id in pet_ids}
+        if 'checklists' in fields:
+            # Get the completed items for every checklist of these pets, joined with their descriptions
+            completed_by_checklist = {}
+            completed_rows = db.session.query(ChecklistCompletion.checklist_id, ChecklistItem.id, ChecklistItem.description)\
+                .join(ChecklistItem, ChecklistItem.id == ChecklistCompletion.checklist_item_id)\
+                .join(Checklist, Checklist.id == ChecklistCompletion.checklist_id)\
+                .filter(Checklist.pet_id.in_(pet_ids), ChecklistCompletion.completed.is_(True))\
+                .order_by(ChecklistCompletion.id).all()
+            for checklist_id, item_id, description in completed_rows:
+                completed_by_checklist.setdefault(checklist_id, []).append({
+                    "id": item_id,
+                    "description": description
+                })
             
-            checklists.append({
-                "id": checklist.id,
-                "date": checklist.completion_date.strftime('%Y-%m-%d'),
-                "time": checklist.completion_time.strftime('%H:%M'),
-                "notes": checklist.notes,
-                "volunteer": checklist.volunteer_name,
-                "completed_items": completed_items
-            })
+            # Get the checklists for every pet at once
+            for checklist in Checklist.query.filter(Checklist.pet_id.in_(pet_ids)).order_by(Checklist.occurred_at.desc(), Checklist.id.desc()).all():
+                checklists_by_pet[checklist.pet_id].append({
+                    "id": checklist.id,
+                    "occurred_at": checklist.occurred_at.isoformat(),
+                    "date": checklist.completion_date.strftime('%Y-%m-%d'),
+                    "time": checklist.completion_time.strftime('%H:%M'),
+                    "notes": checklist.notes,
+                    "volunteer": checklist.volunteer_name,
+                    "completed_items": completed_by_checklist.get(checklist.id, [])
+                })
         
-        return {
-            "id": pet.id,
-            "name": pet.name,
-            "species": pet.species,
-            "breed": pet.breed,
-            "age": pet.age,
-            "gender": pet.gender,
-            "description": pet.description,
-            "feeding_instructions": pet.feeding_instructions,
-            "medical_notes": pet.medical_notes,
-            "image_url": pet.image_url,
-            "is_emergency": pet.is_emergency,
-            "updates": updates,
-            "checklists": checklists
-        }
+        history = {'updates': updates_by_pet, 'checklists': checklists_by_pet}
+        return [{
+            field: history[field][pet.id] if field in history else getattr(pet, field)
+            for field in fields
+        } for pet in pets]
 
 # API Endpoints
 @app.route('/api/pets', methods=['GET'])
 def api_get_pets():
-    """API endpoint to get all pets"""
+    """API endpoint to get a page of pets, following the Link header for the next page
+
+    Tagged with an ETag from the collection version; unchanged polls get a 304.
+    """
+    limit, after = get_page_args()
+    facets = get_facet_args()
+    try:
+        fields = get_fields_arg()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def build():
+        query = Pet.query.options(pet_columns(fields or PET_JSON_FIELDS)).filter(*facet_conditions(facets))
+        pets, next_cursor = paginate_pets(query, limit, after)
+        
+        response = jsonify(pets_to_json(pets, fields))
+        if next_cursor is not None:
+            next_url = url_for('api_get_pets', limit=limit, after=next_cursor,
+                               fields=request.args.get('fields'), view=request.args.get('view'),
+                               **facet_url_args(facets))
+            response.headers['Link'] = f'<{next_url}>; rel="next"'
+        return response
+    
+    with app.app_context():
+        return conditional_response(pet_activity.collection_version(), build)
+
+@app.route('/api/pets/facets', methods=['GET'])
+def api_get_pet_facets():
+    """API endpoint to count pets per species, emergency status, age band and gender"""
+    facets = get_facet_args()
+    search_query = request.args.get('search', '').strip()
     with app.app_context():
-        pets = []
-        for pet in Pet.query.all():
-            pets.append(pet_to_json(pet))
-        return jsonify(pets)
+        counts = get_facet_counts(facets, search_query)
+        return jsonify({
+            "species": counts['species'],
+            "emergency": counts['emergency'].get(True, 0),
+            "age": {band: counts['age'].get(band, 0) for band, _ in AGE_BANDS},
+            "gender": counts['gender']
+        })
+
+@app.route('/api/search', methods=['GET'])
+def api_search_pets():
+    """API endpoint to search pets by name, breed, notes and update text"""
+    search_query = request.args.get('q', '').strip()
+    if not search_query:
+        return jsonify({"error": "Missing search query"}), 400
+    
+    limit, after = get_page_args()
+    with app.app_context():
+        pets, next_cursor = search_pets(search_query, limit, after)
+        return jsonify({
+            "results": [pet_summary_to_json(pet) for pet in pets],
+            "next_cursor": next_cursor
+        })
+
+@app.route('/api/pets/autocomplete', methods=['GET'])
+def api_autocomplete_pets():
+    """API endpoint to suggest pets for a partially typed, possibly misspelled name or breed"""
+    search_query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    with app.app_context():
+        return jsonify(pet_autocomplete.suggest(search_query, limit))
 
 @app.route('/api/pets/<int:pet_id>', methods=['GET'])
 def api_get_pet(pet_id):
-    """API endpoint to get a specific pet"""
-    with app.app_context():
-        pet = Pet.query.get(pet_id)
+    """API endpoint to get a specific pet, tagged with an ETag from the pet's version"""
+    try:
+        fields = get_fields_arg()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def build():
+        pet = Pet.query.options(pet_columns(fields or PET_JSON_FIELDS)).filter_by(id=pet_id).first()
         if pet:
-            return jsonify(pet_to_json(pet))
-        else:
+            return jsonify(pet_to_json(pet, fields))
+        return jsonify({"error": "Pet not found"}), 404
+    
+    with app.app_context():
+        version = pet_activity.pet_version(pet_id)
+        if version is None:
+            # No activity row: a missing pet, or one written without the counters
+            return build()
+        return conditional_response(version, build)
+
+@app.route('/api/pets/<int:pet_id>/timeline', methods=['GET'])
+def api_get_pet_timeline(pet_id):
+    """API endpoint to get a page of a pet's care timeline, newest first"""
+    limit = max(1, min(request.args.get('limit', TIMELINE_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    before = None
+    if request.args.get('before'):
+        before = decode_timeline_cursor(request.args['before'])
+        if before is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+    
+    with app.app_context():
+        if not db.session.query(Pet.query.filter_by(id=pet_id).exists()).scalar():
             return jsonify({"error": "Pet not found"}), 404
+        
+        timeline, next_cursor = get_pet_timeline(pet_id, limit, before)
+        return jsonify({
+            "events": [timeline_event_to_json(event_type, record) for event_type, record in timeline],
+            "next_cursor": next_cursor
+        })
+
+@app.route('/api/sync', methods=['GET'])
+def api_sync():
+    """API endpoint returning the pets and history changed after a sync cursor, with tombstones for deletions"""
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({"error": "Invalid cursor"}), 400
+    limit = max(1, min(request.args.get('limit', SYNC_PAGE_SIZE, type=int), MAX_SYNC_PAGE_SIZE))
+    
+    with app.app_context():
+        changes, cursor, has_more = change_log.changes_since(since, limit)
+        # A cursor from the future (e.g. issued by a database since restored) starts the client
+        # over, as does one from before pruned tombstones, whose deletions it may have missed
+        reset = since > 0 and change_log.expired(since)
+        if reset:
+            changes, cursor, has_more = change_log.changes_since(0, limit)
+        
+        changed = {kind: [] for kind in ('pet',) + tuple(kind for kind, _ in TIMELINE_SOURCES)}
+        deleted = {kind: [] for kind in changed}
+        for change in changes:
+            (deleted if change.deleted else changed)[change.kind].append(change.ref_id)
+        
+        pets = Pet.query.options(pet_columns(PET_SYNC_FIELDS)).filter(Pet.id.in_(changed['pet'])).order_by(Pet.id)\
+            .all() if changed['pet'] else []
+        records = {}
+        for kind, model in TIMELINE_SOURCES:
+            query = model.query.filter(model.id.in_(changed[kind])).order_by(model.id)
+            if model is Checklist:
+                query = query.options(selectinload(Checklist.completed_items)
+                                      .joinedload(ChecklistCompletion.checklist_item))
+            records[kind] = [dict(timeline_event_to_json(kind, record), pet_id=record.pet_id)
+                             for record in (query.all() if changed[kind] else [])]
+        
+        return jsonify({
+            "cursor": cursor,
+            "has_more": has_more,
+            "reset": reset,
+            "pets": pets_to_json(pets, PET_SYNC_FIELDS),
+            "updates": records['update'],
+            "checklists": records['checklist'],
+            "weights": records['weight'],
+            "deleted": {
+                "pets": deleted['pet'],
+                "updates": deleted['update'],
+                "checklists": deleted['checklist'],
+                "weights": deleted['weight']
+            }
+        })
+
+def idempotency_key_header():
+    """
+    Read the optional Idempotency-Key header of a write request
+    
+    Returns:
+        tuple: (key or None, error response or None)
+    """
+    key = request.headers.get('Idempotency-Key')
+    if key is not None and not IdempotencyKeys.valid(key):
+        return None, (jsonify({"error": "Invalid Idempotency-Key"}), 400)
+    return key, None
+
+def replay_idempotent_write(applied, kind, pet_id):
+    """
+    Answer a request whose Idempotency-Key was already applied
+    
+    Args:
+        applied: The write stored under the key, from IdempotencyKeys.lookup()
+        kind: Type of write the request makes, 'update' or 'checklist'
+        pet_id: Pet the request writes to
+    
+    Returns:
+        tuple: The first write's response marked as a duplicate, or 422 if the key named another write
+    """
+    if applied['type'] != kind or applied['pet_id'] != pet_id:
+        return jsonify({"error": "Idempotency-Key was already used for a different write"}), 422
+    return jsonify({"success": True, "duplicate": True, kind: applied['record']}), 200
 
 @app.route('/api/pets/<int:pet_id>/update', methods=['POST'])
 def api_add_update(pet_id):
-    """API endpoint to add an update to a pet"""
+    """API endpoint to add an update to a pet; a repeated Idempotency-Key returns the first update"""
     data = request.get_json()
     if not data or 'update' not in data:
         return jsonify({"error": "Missing update data"}), 400
+    idempotency_key, error = idempotency_key_header()
+    if error:
+        return error
     
     update_text = data['update']
     volunteer_name = data.get('volunteer_name', '')
     
     with app.app_context():
+        if idempotency_key:
+            applied = ingest_keys.lookup([idempotency_key]).get(idempotency_key)
+            if applied:
+                return replay_idempotent_write(applied, 'update', pet_id)
+        
         pet = Pet.query.get(pet_id)
         if not pet:
             return jsonify({"error": "Pet not found"}), 404
@@ -756,44 +1415,64 @@ def api_add_update(pet_id):
             new_update = PetUpdate(
                 pet_id=pet.id,
                 update_text=update_text,
-                update_date=now_pacific.date(),
-                update_time=now_pacific.time(),
+                occurred_at=now_pacific,
                 volunteer_name=volunteer_name
             )
             
             db.session.add(new_update)
+            db.session.flush()
+            
+            update = {
+                "id": new_update.id,
+                "occurred_at": new_update.occurred_at.isoformat(),
+                "date": new_update.update_date.strftime('%Y-%m-%d'),
+                "time": new_update.update_time.strftime('%H:%M'),
+                "note": new_update.update_text,
+                "volunteer": new_update.volunteer_name
+            }
+            if idempotency_key:
+                ingest_keys.remember([(idempotency_key, 'update', new_update.id, pet.id, update)])
             db.session.commit()
             
-            return jsonify({
-                "success": True, 
-                "update": {
-                    "id": new_update.id,
-                    "date": new_update.update_date.strftime('%Y-%m-%d'),
-                    "time": new_update.update_time.strftime('%H:%M'),
-                    "note": new_update.update_text,
-                    "volunteer": new_update.volunteer_name
-                }
-            })
+            return jsonify({"success": True, "update": update})
+        except IntegrityError:
+            db.session.rollback()
+            # A concurrent request with the same Idempotency-Key committed first
+            applied = ingest_keys.lookup([idempotency_key]).get(idempotency_key) if idempotency_key else None
+            if applied:
+                return replay_idempotent_write(applied, 'update', pet_id)
+            logging.exception("Error adding update via API")
+            return jsonify({"error": "Could not save the update"}), 500
         except Exception as e:
             db.session.rollback()
             logging.error(f"Error adding update via API: {e}")
-            return jsonify({"error": str(e)}), 500
+            return jsonify({"error": "Could not save the update"}), 500
 
 @app.route('/api/pets/<int:pet_id>/checklist', methods=['POST'])
 def api_complete_checklist(pet_id):
-    """API endpoint to complete a checklist for a pet"""
+    """API endpoint to complete a checklist for a pet; a repeated Idempotency-Key returns the first checklist"""
     data = request.get_json()
     if not data:
         return jsonify({"error": "Missing checklist data"}), 400
+    idempotency_key, error = idempotency_key_header()
+    if error:
+        return error
     
     with app.app_context():
+        if idempotency_key:
+            applied = ingest_keys.lookup([idempotency_key]).get(idempotency_key)
+            if applied:
+                return replay_idempotent_write(applied, 'checklist', pet_id)
+        
         pet = Pet.query.get(pet_id)
         if not pet:
             return jsonify({"error": "Pet not found"}), 404
         
         notes = data.get('notes', '')
         volunteer_name = data.get('volunteer_name', '')
-        completed_items = data.get('completed_items', [])
+        completed_items = data.get('completed_items') or []
+        if not isinstance(completed_items, list):
+            return jsonify({"error": "completed_items must be a list"}), 400
         
         try:
             # Get Pacific Time
@@ -805,53 +1484,307 @@ def api_complete_checklist(pet_id):
             checklist = Checklist(
                 pet_id=pet.id,
                 volunteer_name=volunteer_name,
-                completion_date=now_pacific.date(),
-                completion_time=now_pacific.time(),
+                occurred_at=now_pacific,
                 notes=notes
             )
             
             db.session.add(checklist)
             db.session.flush()  # Get the checklist ID
             
-            # Add checklist completions
-            for item_id in completed_items:
-                # Verify item exists
-                item = ChecklistItem.query.get(item_id)
-                if item:
-                    completion = ChecklistCompletion(
-                        checklist_id=checklist.id,
-                        checklist_item_id=item.id,
-                        completed=True
-                    )
-                    db.session.add(completion)
-            
-            db.session.commit()
-            
-            # Return the created checklist data
+            # Verify the submitted items exist with one query, then add their completions;
+            # IDs that are not numbers are skipped like IDs of items that do not exist
+            item_ids = [item_id for item_id in map(as_id, completed_items) if item_id is not None]
+            items_by_id = {item.id: item for item in ChecklistItem.query.filter(ChecklistItem.id.in_(item_ids)).all()} \
+                if item_ids else {}
             items = []
-            for completion in ChecklistCompletion.query.filter_by(checklist_id=checklist.id).all():
-                if completion.completed:
-                    item = ChecklistItem.query.get(completion.checklist_item_id)
+            completion_rows = []
+            for item_id in item_ids:
+                item = items_by_id.get(item_id)
+                if item:
+                    completion_rows.append({
+                        "checklist_id": checklist.id,
+                        "checklist_item_id": item.id,
+                        "completed": True
+                    })
                     items.append({
                         "id": item.id,
                         "description": item.description
                     })
+            # One executemany INSERT; the completion IDs are not needed
+            if completion_rows:
+                db.session.execute(db.insert(ChecklistCompletion), completion_rows)
             
-            return jsonify({
-                "success": True, 
-                "checklist": {
-                    "id": checklist.id,
-                    "date": checklist.completion_date.strftime('%Y-%m-%d'),
-                    "time": checklist.completion_time.strftime('%H:%M'),
-                    "notes": checklist.notes,
-                    "volunteer": checklist.volunteer_name,
-                    "completed_items": items
-                }
-            })
+            # Return the created checklist data
+            checklist_json = {
+                "id": checklist.id,
+                "occurred_at": checklist.occurred_at.isoformat(),
+                "date": checklist.completion_date.strftime('%Y-%m-%d'),
+                "time": checklist.completion_time.strftime('%H:%M'),
+                "notes": checklist.notes,
+                "volunteer": checklist.volunteer_name,
+                "completed_items": items
+            }
+            if idempotency_key:
+                ingest_keys.remember([(idempotency_key, 'checklist', checklist.id, pet.id, checklist_json)])
+            db.session.commit()
+            
+            return jsonify({"success": True, "checklist": checklist_json})
+        except IntegrityError:
+            db.session.rollback()
+            # A concurrent request with the same Idempotency-Key committed first
+            applied = ingest_keys.lookup([idempotency_key]).get(idempotency_key) if idempotency_key else None
+            if applied:
+                return replay_idempotent_write(applied, 'checklist', pet_id)
+            logging.exception("Error adding checklist via API")
+            return jsonify({"error": "Could not save the checklist"}), 500
         except Exception as e:
             db.session.rollback()
             logging.error(f"Error adding checklist via API: {e}")
-            return jsonify({"error": str(e)}), 500
+            return jsonify({"error": "Could not save the checklist"}), 500
+
+# Record types accepted by /api/ingest, as timeline types
+INGEST_TYPES = ('update', 'checklist', 'weight')
+
+# Longest volunteer name the history tables store
+VOLUNTEER_NAME_LENGTH = PetUpdate.__table__.c.volunteer_name.type.length
+
+def as_id(value):
+    """Parse a record ID sent by a client (an integer or a string of digits), or None if it is not one"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        return int(value)
+    return None
+
+def ingest_text(item, field, max_length=None):
+    """
+    Read an optional text field of a queued write
+    
+    Returns:
+        str: The text, or '' when the field is missing or null
+    
+    Raises:
+        ValueError: The field is not a string, or is longer than max_length
+    """
+    value = item.get(field)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f"{field} must be at most {max_length} characters")
+    return value
+
+def parse_client_moment(value, now):
+    """
+    Parse the time a client recorded a write at
+    
+    Args:
+        value: ISO 8601 string, or None for now; times without an offset are shelter wall-clock
+        now: Current time, aware
+    
+    Returns:
+        datetime: The moment, aware
+    
+    Raises:
+        ValueError: The value is not an ISO 8601 time, or is in the future
+    """
+    if value is None:
+        return now
+    if not isinstance(value, str):
+        raise ValueError("Invalid occurred_at")
+    try:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = SHELTER_TIMEZONE.localize(moment)
+        # Stored in UTC, which years at the ends of the range cannot be converted to
+        moment.astimezone(timezone.utc)
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid occurred_at")
+    # Allow for tablet clocks running a little fast
+    if moment > now + timedelta(minutes=5):
+        raise ValueError("occurred_at is in the future")
+    return moment
+
+def build_ingested_record(item, pet_ids, checklist_items, now):
+    """
+    Validate one queued write and build the record it creates
+    
+    Args:
+        item: The queued write sent by the client
+        pet_ids: IDs of the batch's pets that exist
+        checklist_items: ChecklistItem by ID, for the items named in the batch
+        now: Time of writes that do not carry their own occurred_at
+    
+    Returns:
+        tuple: (the new PetUpdate, Checklist or WeightRecord, not yet added to the session;
+            the ChecklistItems a checklist completes)
+    
+    Raises:
+        ValueError: The write is invalid; the message is sent back to the client
+    """
+    kind = item.get('type')
+    if kind not in INGEST_TYPES:
+        raise ValueError(f"Unknown type, expected one of {', '.join(INGEST_TYPES)}")
+    pet_id = as_id(item.get('pet_id'))
+    if pet_id not in pet_ids:
+        raise ValueError("Pet not found")
+    occurred_at = parse_client_moment(item.get('occurred_at'), now)
+    volunteer_name = ingest_text(item, 'volunteer_name', VOLUNTEER_NAME_LENGTH)
+    
+    if kind == 'update':
+        update_text = ingest_text(item, 'update')
+        if not update_text:
+            raise ValueError("Missing update data")
+        return PetUpdate(pet_id=pet_id, update_text=update_text, occurred_at=occurred_at,
+                         volunteer_name=volunteer_name), []
+    
+    notes = ingest_text(item, 'notes')
+    if kind == 'checklist':
+        checklist = Checklist(pet_id=pet_id, volunteer_name=volunteer_name, occurred_at=occurred_at, notes=notes)
+        item_ids = item.get('completed_items') or []
+        if not isinstance(item_ids, list):
+            raise ValueError("completed_items must be a list")
+        # Items that no longer exist are skipped, as by /api/pets/<id>/checklist
+        completed = [checklist_items[item_id] for item_id in map(as_id, item_ids) if item_id in checklist_items]
+        return checklist, completed
+    
+    weight = item.get('weight')
+    if isinstance(weight, bool) or not isinstance(weight, (int, float, str)):
+        raise ValueError("Invalid weight")
+    try:
+        weight = float(weight)
+    except ValueError:
+        raise ValueError("Invalid weight")
+    # float() also accepts 'nan' and 'inf', which no scale reads
+    if not math.isfinite(weight) or weight <= 0:
+        raise ValueError("Weight must be a number greater than zero")
+    return WeightRecord(pet_id=pet_id, weight=weight, occurred_at=occurred_at, volunteer_name=volunteer_name,
+                        notes=notes), []
+
+def ingest_items(items):
+    """
+    Apply a batch of queued writes and their idempotency keys in one transaction, then commit
+    
+    The batch's keys, pets and checklist items are each looked up with one
+    query. Writes whose key was already applied, by an earlier batch or
+    earlier in this one, are not applied again, and a key reused for a write
+    of another type or pet is an error. Invalid writes are reported without
+    failing the rest of the batch.
+    
+    Args:
+        items: Queued writes, each a dict with a key, a type and a pet_id
+    
+    Returns:
+        list: One result per item, in order, each with the key and a status of
+            'created', 'duplicate' or 'error'
+    """
+    items = [item if isinstance(item, dict) else {} for item in items]
+    applied = ingest_keys.lookup(item.get('key') for item in items if IdempotencyKeys.valid(item.get('key')))
+    
+    # A retried batch is answered from the keys alone
+    pending = [item for item in items if IdempotencyKeys.valid(item.get('key')) and item['key'] not in applied]
+    pet_ids = {as_id(item.get('pet_id')) for item in pending} - {None}
+    pet_ids = set(db.session.execute(db.select(Pet.id).where(Pet.id.in_(pet_ids))).scalars()) if pet_ids else set()
+    item_ids = {as_id(item_id) for item in pending if isinstance(item.get('completed_items'), list)
+                for item_id in item['completed_items']} - {None}
+    checklist_items = {checklist_item.id: checklist_item for checklist_item
+                       in ChecklistItem.query.filter(ChecklistItem.id.in_(item_ids))} if item_ids else {}
+    
+    now = datetime.now(SHELTER_TIMEZONE)
+    results = [None] * len(items)
+    first_index = {}  # key -> index of its first write in the batch
+    created = []  # (index, type, record)
+    repeats = []  # (index, index of the earlier write with the same key)
+    for index, item in enumerate(items):
+        key = item.get('key')
+        if not IdempotencyKeys.valid(key):
+            results[index] = {"key": key, "status": "error", "error": "Missing or invalid key"}
+        elif key in applied:
+            if applied[key]['type'] != item.get('type') or applied[key]['pet_id'] != as_id(item.get('pet_id')):
+                results[index] = {"key": key, "status": "error", "error": "Key was already used for a different write"}
+            else:
+                results[index] = dict(applied[key], key=key, status="duplicate")
+        elif key in first_index:
+            repeats.append((index, first_index[key]))
+        else:
+            first_index[key] = index
+            try:
+                record, completed = build_ingested_record(item, pet_ids, checklist_items, now)
+            except ValueError as e:
+                results[index] = {"key": key, "status": "error", "error": str(e)}
+                continue
+            db.session.add(record)
+            created.append((index, item['type'], record, completed))
+    
+    try:
+        db.session.flush()  # Get the record IDs
+        # One executemany INSERT for the completions of every checklist in the batch
+        completion_rows = [{"checklist_id": record.id, "checklist_item_id": checklist_item.id, "completed": True}
+                           for _, _, record, completed in created for checklist_item in completed]
+        if completion_rows:
+            db.session.execute(db.insert(ChecklistCompletion), completion_rows)
+        
+        entries = []
+        for index, kind, record, completed in created:
+            key = items[index]['key']
+            if kind == 'checklist':
+                # The completions bypassed the ORM; describe them without loading the collection
+                set_committed_value(record, 'completed_items', [])
+            record_json = dict(timeline_event_to_json(kind, record), pet_id=record.pet_id)
+            if kind == 'checklist':
+                record_json['completed_items'] = [{"id": checklist_item.id, "description": checklist_item.description}
+                                                  for checklist_item in completed]
+            results[index] = {"key": key, "status": "created", "type": kind, "id": record.id,
+                              "pet_id": record.pet_id, "record": record_json}
+            entries.append((key, kind, record.id, record.pet_id, record_json))
+        ingest_keys.remember(entries)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # A concurrent retry stored some of these keys first, and its writes are
+        # committed: apply the batch again, so they are reported as duplicates.
+        # Each pass needs a newly applied key, so this ends.
+        if not ingest_keys.lookup(first_index):
+            raise
+        return ingest_items(items)
+    
+    for index, earlier in repeats:
+        first, item = results[earlier], items[index]
+        if item.get('type') != first.get('type') or as_id(item.get('pet_id')) != first.get('pet_id'):
+            results[index] = {"key": item['key'], "status": "error", "error": "Key was already used for a different write"}
+        else:
+            results[index] = dict(first, status="duplicate") if first["status"] == "created" else dict(first)
+    return results
+
+@app.route('/api/ingest', methods=['POST'])
+def api_ingest():
+    """API endpoint applying a batch of queued offline writes in one transaction, each at most once per key"""
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return jsonify({"error": "Missing items"}), 400
+    if len(items) > MAX_INGEST_ITEMS:
+        return jsonify({"error": f"At most {MAX_INGEST_ITEMS} items per request"}), 413
+    
+    with app.app_context():
+        try:
+            results = ingest_items(items)
+        except Exception:
+            # Invalid writes are reported per item, so this is a server fault; keep its details in the log
+            db.session.rollback()
+            logging.exception(f"Error ingesting {len(items)} queued writes")
+            return jsonify({"error": "Could not store the queued writes"}), 500
+    
+    counts = {status: sum(result["status"] == status for result in results)
+              for status in ('created', 'duplicate', 'error')}
+    for status, count in counts.items():
+        if count:
+            ingest_items_total.inc(count, status=status)
+    logging.info(f"Ingested {len(items)} queued writes: {counts['created']} created, "
+                 f"{counts['duplicate']} duplicates, {counts['error']} errors")
+    return jsonify({"results": results, "created": counts['created'], "duplicates": counts['duplicate'],
+                    "errors": counts['error']})
 
 # Chatbot routes
 @app.route('/chatbot-page')
@@ -874,15 +1807,23 @@ def chatbot():
     
     try:
         # Process with AI
-        from pawpass.ai.pet_ai import AIService
-        ai_service = AIService()
+        from pawpass.ai import get_ai_service
+        ai_service = get_ai_service()
         
         # Check if the message is asking about specific pets
         pet_info = ""
         with app.app_context():
-            # Get a list of all pets in the database for context
-            pets = Pet.query.all()
+            # Get a list of all pets in the database for context, loading only
+            # the columns the prompt uses
+            pets = Pet.query.options(load_only(Pet.id, Pet.name, Pet.species, Pet.breed, Pet.age,
+                                               Pet.feeding_instructions, Pet.medical_notes),
+                                     joinedload(Pet.activity)).all()
             if pets:
+                # Every pet's three newest updates and checklists, and the
+                # checklists' ticked items, in three queries for the whole shelter
+                updates_by_pet = get_recent_history(PetUpdate)
+                checklists_by_pet = get_recent_history(Checklist)
+                completed_by_checklist = get_completed_item_descriptions(recent_history_ids(Checklist))
                 pet_info = "Here is information about our current pets and their recent care:\n"
                 for pet in pets:
                     pet_info += f"- {pet.name}: {pet.species}"
@@ -894,10 +1835,13 @@ def chatbot():
                         pet_info += f". Feeding: {pet.feeding_instructions[:50]}..." if len(pet.feeding_instructions) > 50 else f". Feeding: {pet.feeding_instructions}"
                     if pet.medical_notes:
                         pet_info += f". Medical notes: {pet.medical_notes[:50]}..." if len(pet.medical_notes) > 50 else f". Medical notes: {pet.medical_notes}"
+                    activity = pet.activity
+                    if activity and activity.latest_weight is not None:
+                        pet_info += f". Latest weight: {activity.latest_weight} kg"
                     pet_info += "\n"
                     
                     # Add recent updates with volunteer names
-                    recent_updates = PetUpdate.query.filter_by(pet_id=pet.id).order_by(PetUpdate.created_at.desc()).limit(3).all()
+                    recent_updates = updates_by_pet.get(pet.id, [])
                     if recent_updates:
                         pet_info += f"  Recent updates for {pet.name}:\n"
                         for update in recent_updates:
@@ -907,7 +1851,7 @@ def chatbot():
                             pet_info += f"  * {update_date} at {update_time} - {volunteer}: {update.update_text[:100]}...\n" if len(update.update_text) > 100 else f"  * {update_date} at {update_time} - {volunteer}: {update.update_text}\n"
                     
                     # Add recent checklists with volunteer names
-                    recent_checklists = Checklist.query.filter_by(pet_id=pet.id).order_by(Checklist.completion_date.desc(), Checklist.completion_time.desc()).limit(3).all()
+                    recent_checklists = checklists_by_pet.get(pet.id, [])
                     if recent_checklists:
                         pet_info += f"  Recent checklists for {pet.name}:\n"
                         for checklist in recent_checklists:
@@ -916,11 +1860,7 @@ def chatbot():
                             volunteer = checklist.volunteer_name if checklist.volunteer_name else "Unknown volunteer"
                             
                             # Get the completed items
-                            completed_items = []
-                            for completion in ChecklistCompletion.query.filter_by(checklist_id=checklist.id, completed=True).all():
-                                item = ChecklistItem.query.get(completion.checklist_item_id)
-                                if item:
-                                    completed_items.append(item.description)
+                            completed_items = completed_by_checklist.get(checklist.id, [])
                             
                             # Format the completed items
                             completed_str = ", ".join(completed_items[:3])
@@ -940,7 +1880,7 @@ def chatbot():
         )
         
         # Log the prompt for debugging
-        logging.info(f"Sending prompt to AI service: {prompt[:100]}...")
+        logging.debug("Sending prompt to AI service: %.100s...", prompt)
         
         # Get the response
         result = ai_service.process_text(prompt)
@@ -971,8 +1911,6 @@ def page_not_found(e):
 def server_error(e):
     return render_template('base.html', error="500 - Server Error"), 500
 
-# Initialize the data file if it doesn't exist
-load_pets()
-
 if __name__ == "__main__":
+    init_database()
     app.run(host='0.0.0.0', port=5000, debug=True)
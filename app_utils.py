@@ -5,9 +5,8 @@ import os
 import logging
 import json
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from werkzeug.utils import secure_filename
-from PIL import Image
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -145,16 +144,16 @@ def generate_ai_summary(pet, days=7):
     """Generate an AI summary of recent pet updates"""
     try:
         from models import PetUpdate
-        from pawpass.ai.pet_ai import AIService
+        from pawpass.ai import get_ai_service
         
-        ai_service = AIService()
+        ai_service = get_ai_service()
         
-        # Get recent updates
-        cutoff_date = datetime.now().date() - timedelta(days=days)
+        # Get recent updates with one range seek on (pet_id, occurred_at)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
         updates = PetUpdate.query.filter(
             PetUpdate.pet_id == pet.id,
-            PetUpdate.update_date >= cutoff_date
-        ).order_by(PetUpdate.update_date.desc(), PetUpdate.update_time.desc()).all()
+            PetUpdate.occurred_at >= cutoff
+        ).order_by(PetUpdate.occurred_at.desc(), PetUpdate.id.desc()).all()
         
         if not updates:
             return {"error": "No recent updates found for AI summary"}
@@ -185,14 +184,14 @@ def analyze_weight_trend(pet):
     """Analyze weight trend for a pet"""
     try:
         from models import WeightRecord
-        from pawpass.ai.pet_ai import AIService
+        from pawpass.ai import get_ai_service
         
-        ai_service = AIService()
+        ai_service = get_ai_service()
         
         # Get weight records
         weight_records = WeightRecord.query.filter(
             WeightRecord.pet_id == pet.id
-        ).order_by(WeightRecord.record_date.desc(), WeightRecord.record_time.desc()).all()
+        ).order_by(WeightRecord.occurred_at.desc(), WeightRecord.id.desc()).all()
         
         if not weight_records or len(weight_records) < 2:
             return {"error": "Not enough weight records for analysis"}
@@ -223,9 +222,9 @@ def analyze_weight_trend(pet):
 def get_pet_care_instructions(species, care_type):
     """Get AI-generated care instructions for a pet"""
     try:
-        from pawpass.ai.pet_ai import AIService
+        from pawpass.ai import get_ai_service
         
-        ai_service = AIService()
+        ai_service = get_ai_service()
         return ai_service.get_care_instructions(species, care_type)
         
     except Exception as e:
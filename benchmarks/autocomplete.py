@@ -0,0 +1,62 @@
+"""
+Benchmark: per-keystroke latency of the pet name autocomplete index
+
+Usage:
+    python benchmarks/autocomplete.py [pet count]
+
+Runs entirely in memory with generated names, no database needed.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pawpass.search.autocomplete import PetNameAutocomplete
+
+NAME_PARTS = ['Bel', 'Lu', 'Ma', 'Ro', 'Co', 'Da', 'Sa', 'Mi', 'Ch', 'Ju', 'Pe', 'Ri', 'Oz', 'Ti', 'Ka']
+NAME_ENDINGS = ['la', 'na', 'x', 'cky', 'oper', 'isy', 'die', 'lo', 'ester', 'niper', 'pper', 'ley', 'zy', 'gger']
+BREEDS = ['Golden Retriever', 'Labrador', 'Beagle', 'German Shepherd', 'Siamese', 'Maine Coon',
+          'Tabby', 'Border Collie', 'Dachshund', 'Persian', 'Pit Bull Terrier', 'Domestic Shorthair']
+
+
+def generate_pets(count, seed=42):
+    rng = random.Random(seed)
+    return [
+        (pet_id, rng.choice(NAME_PARTS) + rng.choice(NAME_ENDINGS) + str(rng.randint(0, 99) or ''),
+         rng.choice(BREEDS), rng.choice(['Dog', 'Cat']))
+        for pet_id in range(1, count + 1)
+    ]
+
+
+def main(count):
+    pets = generate_pets(count)
+    index = PetNameAutocomplete(loader=lambda: pets)
+
+    started = time.perf_counter()
+    index.rebuild()
+    print(f"Indexed {count} pets in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # Type each query one keystroke at a time, including misspellings; keep
+    # the best of a few runs per keystroke to filter out scheduler noise
+    queries = ['bella', 'bela', 'cooper', 'cooepr', 'golden r', 'labradr', 'juniper', 'siames', 'xyz']
+    timings = []
+    for query in queries:
+        for end in range(1, len(query) + 1):
+            runs = []
+            for _ in range(5):
+                started = time.perf_counter()
+                index.suggest(query[:end])
+                runs.append(time.perf_counter() - started)
+            timings.append(min(runs))
+
+    timings.sort()
+    print(f"{len(timings)} keystrokes: "
+          f"median {timings[len(timings) // 2] * 1e6:.0f} us, "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1e6:.0f} us, "
+          f"max {timings[-1] * 1e6:.0f} us")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,185 @@
+"""
+Check: cached pages, ETags and sync cursors stay correct across deletes,
+and retried or malformed client writes are applied at most once
+
+Usage:
+    python benchmarks/consistency.py
+
+Replays the write sequences that once served stale data against a
+throwaway SQLite database, through the routes clients use (pages, JSON
+API conditional GETs and /api/sync), and exits with status 1 if any check
+fails. Deleting the newest pet and creating another
+(which SQLite gives the same ID) must not bring back a version a page was
+cached or tagged with. Malformed queued writes must fail on their own
+rather than the whole batch, and an idempotency key must not replay a
+write to another pet.
+"""
+import os
+import sys
+import tempfile
+
+# Point the app at a scratch database before it is imported
+_db_dir = tempfile.mkdtemp(prefix='pawpass-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+
+from app import app, init_database, change_log
+from models import db, Pet
+
+logging.disable(logging.CRITICAL)
+init_database()
+client = app.test_client()
+
+
+def add_pet(name):
+    """Create a pet through the ORM, as the add pet form does, and return its ID"""
+    with app.app_context():
+        pet = Pet(name=name, species='Dog', breed='Mixed')
+        db.session.add(pet)
+        db.session.commit()
+        return pet.id
+
+
+def delete_pet(pet_id):
+    """Delete a pet through the delete button, following the redirect so its flash message is shown and gone"""
+    response = client.post(f'/pet/{pet_id}/delete', follow_redirects=True)
+    assert response.status_code < 400, response.status_code
+
+
+def check_cached_pages_after_delete_and_create():
+    """The pet list and a profile cached before a delete must not be served for a pet created after it"""
+    old_id = add_pet('Stalecache')
+    client.get('/pets')
+    client.get(f'/pet/{old_id}')
+    delete_pet(old_id)
+    new_id = add_pet('Freshcache')
+
+    failures = []
+    if new_id != old_id:
+        failures.append(f"expected SQLite to reuse pet ID {old_id}, got {new_id}")
+    pets = client.get('/pets').get_data(as_text=True)
+    if 'Stalecache' in pets or 'Freshcache' not in pets:
+        failures.append("/pets served the list cached before the delete")
+    profile = client.get(f'/pet/{new_id}').get_data(as_text=True)
+    if 'Stalecache' in profile or 'Freshcache' not in profile:
+        failures.append(f"/pet/{new_id} served the deleted pet's cached profile")
+    return failures
+
+
+def check_etags_after_delete_and_create():
+    """An ETag taken before a delete must not get a 304 for the pets created after it"""
+    old_id = add_pet('Staletag')
+    list_etag = client.get('/api/pets').headers['ETag']
+    pet_etag = client.get(f'/api/pets/{old_id}').headers['ETag']
+    delete_pet(old_id)
+    new_id = add_pet('Freshtag')
+
+    failures = []
+    response = client.get('/api/pets', headers={'If-None-Match': list_etag})
+    if response.status_code != 200 or 'Freshtag' not in response.get_data(as_text=True):
+        failures.append(f"/api/pets answered the pre-delete ETag with {response.status_code}")
+    response = client.get(f'/api/pets/{new_id}', headers={'If-None-Match': pet_etag})
+    if response.status_code != 200 or 'Freshtag' not in response.get_data(as_text=True):
+        failures.append(f"/api/pets/{new_id} answered the deleted pet's ETag with {response.status_code}")
+    return failures
+
+
+def check_sync_tombstone_of_newest_change():
+    """Deleting the pet whose history holds the newest change must still reach clients synced up to it"""
+    pet_id = add_pet('Tombstone')
+    other_id = add_pet('Bystander')
+    client.post(f'/api/pets/{pet_id}/update', json={'update': 'Newest change in the log'})
+    with app.app_context():
+        cursor = change_log.latest()
+    delete_pet(pet_id)
+    client.post(f'/api/pets/{other_id}/update', json={'update': 'Change after the delete'})
+
+    failures = []
+    body = client.get(f'/api/sync?since={cursor}').get_json()
+    if body['reset'] or pet_id not in body['deleted']['pets']:
+        failures.append(f"/api/sync?since={cursor} left out the tombstone of pet {pet_id} (reset: {body['reset']})")
+    if not any(update['pet_id'] == other_id for update in body['updates']):
+        failures.append(f"/api/sync?since={cursor} left out the update made after the delete")
+    return failures
+
+
+def check_ingest_reports_bad_fields_per_item():
+    """Fields of the wrong type or out of range must be item errors, not fail the batch"""
+    pet_id = add_pet('Ingestfields')
+    bad_items = [
+        {'type': 'update', 'update': {'text': 'not a string'}},
+        {'type': 'update', 'update': 'Fine', 'volunteer_name': ['not', 'a', 'string']},
+        {'type': 'update', 'update': 'Fine', 'volunteer_name': 'x' * 101},
+        {'type': 'update', 'update': 'Fine', 'occurred_at': '0001-01-01T00:00:00+05:00'},
+        {'type': 'checklist', 'notes': 12},
+        {'type': 'weight', 'weight': 'nan'},
+        {'type': 'weight', 'weight': 'inf'},
+        {'type': 'weight', 'weight': True},
+        {'type': 'weight', 'weight': [12]},
+    ]
+    items = [dict(item, key=f'bad-field-{index}', pet_id=pet_id) for index, item in enumerate(bad_items)]
+    items.append({'key': 'bad-field-pet', 'type': 'update', 'update': 'Fine', 'pet_id': True})
+    items.append({'key': 'good-field', 'type': 'weight', 'weight': '12.5', 'pet_id': pet_id})
+
+    response = client.post('/api/ingest', json={'items': items})
+    if response.status_code != 200:
+        return [f"/api/ingest answered {response.status_code} for a batch with malformed items"]
+    failures = [f"{item['key']} was {result['status']}, not an error"
+                for item, result in zip(items, response.get_json()['results'][:-1]) if result['status'] != 'error']
+    if response.get_json()['results'][-1]['status'] != 'created':
+        failures.append("the valid write in the batch was not created")
+    return failures
+
+
+def check_idempotency_key_reused_for_another_write():
+    """A key already applied must not answer for a write of another type or pet"""
+    pet_id = add_pet('Keyowner')
+    other_id = add_pet('Keyborrower')
+    headers = {'Idempotency-Key': 'reused-key'}
+    first = client.post(f'/api/pets/{pet_id}/update', json={'update': 'First write'}, headers=headers)
+
+    failures = []
+    replay = client.post(f'/api/pets/{pet_id}/update', json={'update': 'First write'}, headers=headers)
+    if replay.status_code != 200 or replay.get_json()['update'] != first.get_json()['update']:
+        failures.append(f"the retried update was answered with {replay.status_code}")
+    for path in (f'/api/pets/{other_id}/update', f'/api/pets/{pet_id}/checklist'):
+        response = client.post(path, json={'update': 'Other write', 'completed_items': []}, headers=headers)
+        if response.status_code != 422:
+            failures.append(f"{path} answered the reused key with {response.status_code}")
+    results = client.post('/api/ingest', json={'items': [
+        {'key': 'reused-key', 'type': 'update', 'update': 'Other write', 'pet_id': other_id},
+        {'key': 'batch-key', 'type': 'update', 'update': 'Batch write', 'pet_id': pet_id},
+        {'key': 'batch-key', 'type': 'update', 'update': 'Batch write', 'pet_id': other_id},
+    ]}).get_json()['results']
+    statuses = [result['status'] for result in results]
+    if statuses != ['error', 'created', 'error']:
+        failures.append(f"/api/ingest reported reused keys as {statuses}")
+    return failures
+
+
+CHECKS = (
+    check_cached_pages_after_delete_and_create,
+    check_etags_after_delete_and_create,
+    check_sync_tombstone_of_newest_change,
+    check_ingest_reports_bad_fields_per_item,
+    check_idempotency_key_reused_for_another_write,
+)
+
+
+def main():
+    failures = 0
+    for check in CHECKS:
+        problems = check()
+        failures += bool(problems)
+        print(f"{check.__name__:>60} {'FAIL' if problems else 'ok'}")
+        for problem in problems:
+            print(f"{'':>8}{problem}")
+
+    print(f"\n{failures} checks failed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Report: what importing the app costs a web worker at boot
+
+Usage:
+    python benchmarks/import_profile.py [top N]
+
+Imports main (as gunicorn does) under `python -X importtime`, prints the
+total, the most expensive top-level packages and the slowest single
+modules, and exits with status 1 if any module that should load lazily
+(the AI client, Pillow, numpy, cryptography) was imported at boot.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only loaded when a request needs them; importing any of these at boot is a regression
+LAZY_MODULES = (
+    'PIL',
+    'google.generativeai',
+    'numpy',
+    'cryptography',
+    'pawpass.encryption.crypto',
+    'pawpass.quantum.learning',
+)
+
+
+def profile_imports():
+    """Return (module, self µs, cumulative µs, depth) for every module main imports"""
+    db_dir = tempfile.mkdtemp(prefix='pawpass-bench-')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'bench.db')}")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def main(top):
+    modules = profile_imports()
+    total_ms = sum(self_us for _, self_us, _, _ in modules) / 1000
+    print(f"Importing main: {total_ms:.0f} ms across {len(modules)} modules\n")
+
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        by_package[name.split('.')[0]] += self_us
+    print(f"{'package':>30} {'ms':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:>30} {self_us / 1000:>8.1f}")
+
+    print(f"\n{'slowest modules':>30} {'self ms':>8} {'cum ms':>8}")
+    for name, self_us, cumulative_us, _ in sorted(modules, key=lambda module: -module[1])[:top]:
+        print(f"{name:>30} {self_us / 1000:>8.1f} {cumulative_us / 1000:>8.1f}")
+
+    names = {name for name, _, _, _ in modules}
+    eager = [lazy for lazy in LAZY_MODULES
+             if any(name == lazy or name.startswith(lazy + '.') for name in names)]
+    print()
+    if eager:
+        print(f"Loaded at boot but should be lazy: {', '.join(eager)}")
+        return 1
+    print("No lazily loaded modules were imported at boot")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 15))
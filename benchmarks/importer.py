@@ -0,0 +1,76 @@
+"""
+Benchmark: throughput and memory of the streaming pet importer
+
+Usage:
+    python benchmarks/importer.py [pet count] [chunk sizes...]
+
+Writes a synthetic shelter export with a few updates and checklists per pet,
+then imports it into a throwaway SQLite database once per chunk size.
+"""
+import json
+import os
+import resource
+import sys
+import tempfile
+
+# Point the app at a scratch database before it is imported
+_db_dir = tempfile.mkdtemp(prefix='pawpass-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+
+from app import app, init_database, pet_search, pet_activity, change_log
+from models import db
+from pawpass.importer import PetImporter
+
+logging.disable(logging.CRITICAL)
+init_database()
+
+
+def write_export(path, pet_count, updates_per_pet=5, checklists_per_pet=2):
+    """Write a pets.json-style export one pet at a time"""
+    with open(path, 'w') as f:
+        f.write('[\n')
+        for i in range(pet_count):
+            pet = {
+                "name": f"Bench Pet {i}",
+                "species": "Dog" if i % 2 else "Cat",
+                "feeding_instructions": "Feed twice a day.",
+                "medical_notes": "No current medications.",
+                "behavior_notes": "Friendly once comfortable.",
+                "updates": [
+                    {"date": f"2025-01-{j + 1:02d}", "time": "09:00", "note": f"Routine check {j}"}
+                    for j in range(updates_per_pet)
+                ],
+                "checklists": [
+                    {"date": f"2025-01-{j + 1:02d}", "time": "18:00", "fed": True, "water": j % 2 == 0}
+                    for j in range(checklists_per_pet)
+                ],
+            }
+            f.write(('' if i == 0 else ',\n') + json.dumps(pet))
+        f.write('\n]\n')
+
+
+def main(pet_count, chunk_sizes):
+    export_path = os.path.join(_db_dir, 'export.json')
+    write_export(export_path, pet_count)
+    print(f"Export: {pet_count} pets, {os.path.getsize(export_path) / 1e6:.1f} MB")
+
+    print(f"{'chunk':>8} {'seconds':>10} {'pets/s':>10} {'rows/s':>10} {'peak RSS MB':>12}")
+    with app.app_context():
+        for chunk_size in chunk_sizes:
+            importer = PetImporter(db, search_index=pet_search, activity=pet_activity, changes=change_log,
+                                   chunk_size=chunk_size)
+            stats = importer.run(export_path, restart=True)
+            rows = stats['pets'] + stats['updates'] + stats['checklists'] + stats['completions']
+            # ru_maxrss is in kilobytes on Linux
+            peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"{chunk_size:>8} {stats['seconds']:>10.2f} {stats['pets'] / stats['seconds']:>10.0f} "
+                  f"{rows / stats['seconds']:>10.0f} {peak_mb:>12.1f}")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sizes = [int(arg) for arg in sys.argv[2:]] or [100, 500, 2000]
+    main(count, sizes)
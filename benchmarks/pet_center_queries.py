@@ -0,0 +1,69 @@
+"""
+Benchmark: SQL query count for the pet center listing as the shelter grows
+
+Usage:
+    python benchmarks/pet_center_queries.py [pet counts...]
+
+Each run uses a throwaway SQLite database, so it never touches pawpass.db.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dt_time
+
+# Point the app at a scratch database before it is imported
+_db_dir = tempfile.mkdtemp(prefix='pawpass-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+from sqlalchemy import event
+
+from app import app, init_database
+from models import db, Pet, PetUpdate
+
+logging.disable(logging.CRITICAL)
+init_database()
+
+
+def seed_pets(target_count, updates_per_pet=5):
+    """Top up the database to target_count pets, each with a few updates"""
+    current = Pet.query.count()
+    for i in range(current, target_count):
+        pet = Pet(name=f"Bench Pet {i}", species="Dog" if i % 2 else "Cat")
+        db.session.add(pet)
+        db.session.flush()
+        for j in range(updates_per_pet):
+            db.session.add(PetUpdate(
+                pet_id=pet.id,
+                update_text=f"Routine check {j}",
+                update_date=date(2025, 1, 1 + j),
+                update_time=dt_time(9, j)
+            ))
+    db.session.commit()
+
+
+def main(pet_counts):
+    client = app.test_client()
+    statements = []
+
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        print(f"{'pets':>8} {'queries':>8} {'ms':>10}")
+        for count in pet_counts:
+            seed_pets(count)
+            statements.clear()
+            started = time.perf_counter()
+            response = client.get('/pets')
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            assert response.status_code == 200
+            print(f"{count:>8} {len(statements):>8} {elapsed_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 2000]
+    main(counts)
@@ -0,0 +1,84 @@
+"""
+Benchmark: cold start of a web worker, from interpreter launch to the first response
+
+Usage:
+    python benchmarks/startup.py [runs]
+
+Initializes a throwaway SQLite database once, then starts a fresh interpreter
+per run that imports the app (as gunicorn does with main:app) and serves
+/pets. Reports the median of each phase and how many SQL statements ran
+while importing, which should be zero.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import time
+started = time.perf_counter()
+
+import json
+import logging
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+from main import app
+logging.disable(logging.CRITICAL)
+imported = time.perf_counter()
+import_statements = len(statements)
+
+response = app.test_client().get('/pets')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "import_statements": import_statements,
+}))
+"""
+
+
+def run_python(code, env):
+    """Run code in a fresh interpreter and return its wall time and last stdout line"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return elapsed_ms, result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ''
+
+
+def main(runs):
+    db_dir = tempfile.mkdtemp(prefix='pawpass-bench-')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'bench.db')}")
+    env.pop('PAWPASS_INIT_DB', None)
+
+    init_ms, _ = run_python("from app import init_database; init_database()", env)
+    print(f"One-shot init-db: {init_ms:.0f} ms")
+
+    samples = []
+    for _ in range(runs):
+        wall_ms, output = run_python(WORKER, env)
+        sample = json.loads(output)
+        sample['wall_ms'] = wall_ms
+        samples.append(sample)
+
+    print(f"{'phase':>22} {'median ms':>10} {'min ms':>10}")
+    for key, label in (('import_ms', 'import app'), ('first_request_ms', 'first /pets request'),
+                       ('wall_ms', 'process total')):
+        values = [sample[key] for sample in samples]
+        print(f"{label:>22} {statistics.median(values):>10.1f} {min(values):>10.1f}")
+    print(f"SQL statements during import: {max(sample['import_statements'] for sample in samples)}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,208 @@
+"""
+Benchmark: latency, SQL statements and memory of the key routes at shelter scale
+
+Usage:
+    python benchmarks/suite.py [pet counts...] [--repeat N] [--save FILE] [--baseline FILE] [--tolerance 0.5]
+
+    python benchmarks/suite.py                      # 100 and 10000 pets
+    python benchmarks/suite.py 100 10000 100000     # add a very large shelter (takes a few minutes)
+    python benchmarks/suite.py --save before.json
+    python benchmarks/suite.py --baseline before.json
+
+Each pet count runs in its own process against a fresh SQLite database
+filled by SyntheticShelter with a fixed seed, so runs are comparable. Every
+route below is sent through the Flask test client with the mock AI
+provider; the table shows median and p95 latency, SQL statements per
+request and the peak Python memory allocated while handling one request.
+Pages served from the page cache get two rows: the route's own row empties
+the cache before every request, so it measures rendering, and its "cached"
+row measures cache hits.
+With --baseline, exits with status 1 if a route got slower than the
+tolerance allows or sends more statements than it did in the baseline.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, method, path, JSON body, form body); {pet} is the pet with the longest history,
+# 'all' is replaced with every checklist item ID
+ROUTES = (
+    ('pets', 'GET', '/pets', None, None),
+    ('pets search', 'GET', '/pets?search=walk', None, None),
+    ('pet page', 'GET', '/pet/{pet}', None, None),
+    ('api pets', 'GET', '/api/pets', None, None),
+    ('api pets summary', 'GET', '/api/pets?view=summary', None, None),
+    ('api pet', 'GET', '/api/pets/{pet}', None, None),
+    ('chatbot', 'POST', '/chatbot', {'message': 'Which pets need medication this evening?'}, None),
+    ('checklist form', 'POST', '/pet/{pet}/checklist', None, {'items': 'all', 'volunteer_name': 'Bench'}),
+    ('checklist api', 'POST', '/api/pets/{pet}/checklist', {'completed_items': 'all', 'volunteer_name': 'Bench'},
+     None),
+)
+
+# Routes served from the page cache, measured both rendered and cached
+PAGE_CACHED_ROUTES = ('pets', 'pets search', 'pet page')
+
+# Timed runs per route stop early once a route has used this many seconds
+ROUTE_TIME_LIMIT = 10.0
+
+
+def run_worker(pet_count, repeat):
+    """Seed a scratch database with pet_count pets and measure every route; returns the results"""
+    db_dir = tempfile.mkdtemp(prefix='pawpass-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.pop('GOOGLE_API_KEY', None)
+    sys.path.insert(0, ROOT)
+
+    import logging
+
+    from app import app, init_database, pet_search, pet_activity, change_log, page_cache
+    from models import db, ChecklistItem, PetActivity, SHELTER_TIMEZONE
+    from pawpass.importer import SyntheticShelter
+    from pawpass.monitoring import count_queries
+
+    logging.disable(logging.CRITICAL)
+    init_database()
+    with app.app_context():
+        generated = SyntheticShelter(db, search_index=pet_search, activity=pet_activity, changes=change_log,
+                                     shelter_timezone=SHELTER_TIMEZONE).generate(pet_count)
+        pet_id = db.session.query(PetActivity.pet_id).order_by(PetActivity.update_count.desc()).limit(1).scalar()
+        item_ids = [item_id for item_id, in db.session.query(ChecklistItem.id)]
+
+    client = app.test_client()
+    results = {'pets': pet_count, 'generate_seconds': generated['seconds'], 'routes': {}}
+    measured = []
+    for name, method, path, json_body, form_body in ROUTES:
+        measured.append((name, method, path, json_body, form_body, name in PAGE_CACHED_ROUTES))
+        if name in PAGE_CACHED_ROUTES:
+            measured.append((f'{name} cached', method, path, json_body, form_body, False))
+
+    for name, method, path, json_body, form_body, render in measured:
+        path = path.format(pet=pet_id)
+        if json_body and json_body.get('completed_items') == 'all':
+            json_body = dict(json_body, completed_items=item_ids)
+        if form_body and form_body.get('items') == 'all':
+            form_body = dict(form_body, items=[str(item_id) for item_id in item_ids])
+
+        def send():
+            response = client.open(path, method=method, json=json_body, data=form_body)
+            assert response.status_code < 400, (path, response.status_code)
+
+        def empty_cache():
+            # Rows that measure rendering send every request to an empty page cache
+            if render:
+                page_cache.clear()
+
+        # The first request warms caches and counts statements; memory is
+        # measured on a separate request so tracing does not skew the timings
+        empty_cache()
+        with count_queries() as stats:
+            send()
+        empty_cache()
+        tracemalloc.start()
+        send()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < repeat and (not timings or time.perf_counter() - started < ROUTE_TIME_LIMIT):
+            empty_cache()
+            request_started = time.perf_counter()
+            send()
+            timings.append(time.perf_counter() - request_started)
+
+        timings.sort()
+        results['routes'][name] = {
+            'path': f"{method} {path}",
+            'runs': len(timings),
+            'p50_ms': statistics.median(timings) * 1000,
+            'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+            'statements': stats.count,
+            'peak_kb': peak_bytes / 1024,
+        }
+    # ru_maxrss is in kilobytes on Linux
+    results['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def measure(pet_count, repeat):
+    """Run one pet count in a fresh process, so each size starts with an empty database and heap"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', str(pet_count), '--repeat', str(repeat)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(results):
+    print(f"\n{results['pets']} pets (generated in {results['generate_seconds']:.1f}s, "
+          f"peak RSS {results['peak_rss_mb']:.0f} MB)")
+    print(f"{'route':>18} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'statements':>10} {'peak KB':>9}")
+    for name, route in results['routes'].items():
+        print(f"{name:>18} {route['runs']:>5} {route['p50_ms']:>9.1f} {route['p95_ms']:>9.1f} "
+              f"{route['statements']:>10} {route['peak_kb']:>9.0f}")
+
+
+def regressions(runs, baseline, tolerance):
+    """Routes slower than the baseline by more than the tolerance, or sending more statements"""
+    found = []
+    previous = {str(results['pets']): results for results in baseline}
+    for results in runs:
+        before = previous.get(str(results['pets']))
+        if before is None:
+            continue
+        for name, route in results['routes'].items():
+            old = before['routes'].get(name)
+            if old is None:
+                continue
+            if route['statements'] > old['statements']:
+                found.append(f"{results['pets']} pets, {name}: {old['statements']} -> {route['statements']} statements")
+            if route['p50_ms'] > old['p50_ms'] * (1 + tolerance):
+                found.append(f"{results['pets']} pets, {name}: p50 {old['p50_ms']:.1f} -> {route['p50_ms']:.1f} ms")
+    return found
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pets', nargs='*', type=int, default=[100, 10000], help='Shelter sizes to benchmark')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed requests per route')
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results saved with --save')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed p50 slowdown against the baseline')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        print(json.dumps(run_worker(args.worker, args.repeat)))
+        return 0
+
+    runs = []
+    for pet_count in args.pets:
+        results = measure(pet_count, args.repeat)
+        report(results)
+        runs.append(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(runs, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(runs, json.load(f), args.tolerance)
+        print(f"\n{len(found)} regressions against {args.baseline}")
+        for line in found:
+            print(f"    {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
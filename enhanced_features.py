@@ -25,7 +25,7 @@ def weight_tracker(pet_id):
     
     # Get weight records
     weight_records = WeightRecord.query.filter_by(pet_id=pet.id)\
-        .order_by(WeightRecord.record_date.desc(), WeightRecord.record_time.desc()).all()
+        .order_by(WeightRecord.occurred_at.desc(), WeightRecord.id.desc()).all()
     
     # Prepare data for chart
     weight_dates = [record.record_date.strftime('%Y-%m-%d') for record in weight_records]
@@ -209,8 +209,7 @@ def enhanced_checklist(pet_id):
             checklist = Checklist(
                 pet_id=pet.id,
                 volunteer_name=volunteer_name,
-                completion_date=now_pacific.date(),
-                completion_time=now_pacific.time(),
+                occurred_at=now_pacific,
                 notes=general_notes
             )
             db.session.add(checklist)
@@ -1,4 +1,8 @@
-from app import app  # noqa: F401
+from app import prepare_app, init_database
+
+# Set PAWPASS_INIT_DB=1 to create the schema on startup; otherwise run `flask --app main init-db` once per deploy
+app = prepare_app()
 
 if __name__ == "__main__":
+    init_database()
     app.run(host='0.0.0.0', port=5000, debug=True)
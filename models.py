@@ -1,10 +1,42 @@
-from datetime import datetime
-from sqlalchemy import ForeignKey
+from datetime import datetime, timezone
+import pytz
+from sqlalchemy import ForeignKey, event, inspect, text
 from sqlalchemy.orm import relationship
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# Dates and times shown to volunteers are wall-clock times at the shelter
+SHELTER_TIMEZONE = pytz.timezone('America/Los_Angeles')
+
+
+def shelter_moment(moment_date, moment_time):
+    """Timezone-aware UTC datetime for a date and time on the shelter's wall clock"""
+    return SHELTER_TIMEZONE.localize(datetime.combine(moment_date, moment_time)).astimezone(timezone.utc)
+
+
+class UTCDateTime(db.TypeDecorator):
+    """Timezone-aware datetime stored in UTC
+
+    PostgreSQL keeps the offset natively; SQLite stores naive UTC text, so the
+    UTC offset is re-attached when rows are loaded.
+    """
+    impl = db.DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            raise ValueError("occurred_at must be timezone-aware")
+        value = value.astimezone(timezone.utc)
+        return value.replace(tzinfo=None) if dialect.name == 'sqlite' else value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
 class Pet(db.Model):
     """Pet model for storing pet-related information"""
     __tablename__ = 'pets'
@@ -36,10 +68,16 @@ class Pet(db.Model):
 class PetUpdate(db.Model):
     """Model for storing pet care updates"""
     __tablename__ = 'pet_updates'
+    __table_args__ = (
+        # Serves the newest-first history scans and date-range queries for a pet
+        db.Index('ix_pet_updates_pet_occurred', 'pet_id', 'occurred_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     pet_id = db.Column(db.Integer, ForeignKey('pets.id', ondelete='CASCADE'), nullable=False)
     update_text = db.Column(db.Text, nullable=False)
+    occurred_at = db.Column(UTCDateTime(timezone=True), nullable=False)
+    # Shelter wall-clock date and time of occurred_at, kept in step for templates
     update_date = db.Column(db.Date, nullable=False)
     update_time = db.Column(db.Time, nullable=False)
     volunteer_name = db.Column(db.String(100), nullable=True)
@@ -71,10 +109,15 @@ class ChecklistItem(db.Model):
 class Checklist(db.Model):
     """Model for completed checklists"""
     __tablename__ = 'checklists'
+    __table_args__ = (
+        db.Index('ix_checklists_pet_occurred', 'pet_id', 'occurred_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     pet_id = db.Column(db.Integer, ForeignKey('pets.id', ondelete='CASCADE'), nullable=False)
     volunteer_name = db.Column(db.String(100), nullable=True)
+    occurred_at = db.Column(UTCDateTime(timezone=True), nullable=False)
+    # Shelter wall-clock date and time of occurred_at, kept in step for templates
     completion_date = db.Column(db.Date, nullable=False)
     completion_time = db.Column(db.Time, nullable=False)
     notes = db.Column(db.Text, nullable=True)
@@ -82,7 +125,8 @@ class Checklist(db.Model):
     
     # Relationships
     pet = relationship("Pet", back_populates="checklists")
-    completed_items = relationship("ChecklistCompletion", back_populates="checklist", cascade="all, delete-orphan")
+    completed_items = relationship("ChecklistCompletion", back_populates="checklist", cascade="all, delete-orphan",
+                                   order_by="ChecklistCompletion.id")
     
     def __repr__(self):
         return f"<Checklist {self.id} for Pet {self.pet_id}>"
@@ -91,6 +135,10 @@ class Checklist(db.Model):
 class ChecklistCompletion(db.Model):
     """Model for linking completed checklist items to a checklist"""
     __tablename__ = 'checklist_completions'
+    __table_args__ = (
+        # Completions are always fetched (and deleted) by their checklist
+        db.Index('ix_checklist_completions_checklist', 'checklist_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     checklist_id = db.Column(db.Integer, ForeignKey('checklists.id', ondelete='CASCADE'), nullable=False)
@@ -110,10 +158,15 @@ class ChecklistCompletion(db.Model):
 class WeightRecord(db.Model):
     """Model for tracking pet weight over time"""
     __tablename__ = 'weight_records'
+    __table_args__ = (
+        db.Index('ix_weight_records_pet_occurred', 'pet_id', 'occurred_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     pet_id = db.Column(db.Integer, ForeignKey('pets.id', ondelete='CASCADE'), nullable=False)
     weight = db.Column(db.Float, nullable=False)  # Weight in kilograms
+    occurred_at = db.Column(UTCDateTime(timezone=True), nullable=False)
+    # Shelter wall-clock date and time of occurred_at, kept in step for templates
     record_date = db.Column(db.Date, nullable=False)
     record_time = db.Column(db.Time, nullable=False)
     volunteer_name = db.Column(db.String(100), nullable=True)
@@ -145,5 +198,150 @@ class EnhancedChecklistItem(db.Model):
         return f"<EnhancedChecklistItem {self.description} ({self.item_type})>"
 
 
+class SearchDocument(db.Model):
+    """Searchable text for a pet or one of its updates, mirrored into the full-text index"""
+    __tablename__ = 'search_documents'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'ref_id', name='uq_search_documents_ref'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pet_id = db.Column(db.Integer, nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'pet' or 'update'
+    ref_id = db.Column(db.Integer, nullable=False)  # ID of the pet or update the text came from
+    body = db.Column(db.Text, nullable=False)
+    
+    def __repr__(self):
+        return f"<SearchDocument {self.kind} {self.ref_id} for Pet {self.pet_id}>"
+
+
+class PetActivity(db.Model):
+    """Per-pet history counts and latest entries, kept current on every write so listings read one row per pet"""
+    __tablename__ = 'pet_activity'
+    __table_args__ = (
+        db.Index('ix_pet_activity_version', 'version'),
+    )
+    
+    pet_id = db.Column(db.Integer, ForeignKey('pets.id', ondelete='CASCADE'), primary_key=True)
+    update_count = db.Column(db.Integer, nullable=False, default=0)
+    last_update_at = db.Column(UTCDateTime(timezone=True), nullable=True)
+    last_update_id = db.Column(db.Integer, nullable=True)
+    checklist_count = db.Column(db.Integer, nullable=False, default=0)
+    last_checklist_at = db.Column(UTCDateTime(timezone=True), nullable=True)
+    last_checklist_id = db.Column(db.Integer, nullable=True)
+    weight_count = db.Column(db.Integer, nullable=False, default=0)
+    last_weight_at = db.Column(UTCDateTime(timezone=True), nullable=True)
+    last_weight_id = db.Column(db.Integer, nullable=True)
+    latest_weight = db.Column(db.Float, nullable=True)  # Weight in kilograms from the latest record
+    # Raised past every other pet's version whenever the pet or its history is written; caches key on it
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    # The latest update itself, for listings that show its text and volunteer
+    last_update = relationship("PetUpdate", primaryjoin="foreign(PetActivity.last_update_id) == PetUpdate.id",
+                               viewonly=True)
+    
+    def __repr__(self):
+        return f"<PetActivity for Pet {self.pet_id}: {self.update_count} updates>"
+
+
+class SequenceCounter(db.Model):
+    """Named counter that only moves up, handing out cache versions and sync cursors (see pawpass.sequence)"""
+    __tablename__ = 'sequence_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)  # Last value handed out
+    
+    def __repr__(self):
+        return f"<SequenceCounter {self.name}: {self.value}>"
+
+
+class SyncChange(db.Model):
+    """Latest change to each pet and history record, in commit order, for clients syncing deltas"""
+    __tablename__ = 'sync_changes'
+    __table_args__ = (
+        db.Index('ix_sync_changes_seq', 'seq', unique=True),
+        db.Index('ix_sync_changes_pet', 'pet_id'),
+        # Only tombstones, for pruning old ones
+        db.Index('ix_sync_changes_tombstones', 'changed_at',
+                 sqlite_where=text('deleted = 1'), postgresql_where=text('deleted')),
+    )
+    
+    kind = db.Column(db.String(20), primary_key=True)  # 'pet', 'update', 'checklist' or 'weight'
+    ref_id = db.Column(db.Integer, primary_key=True)  # ID of the pet or history record
+    pet_id = db.Column(db.Integer, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)  # Change cursor: raised past every other change on each write
+    deleted = db.Column(db.Boolean, nullable=False, default=False)  # Tombstone for a deleted record
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SyncChange {self.seq}: {self.kind} {self.ref_id}{' deleted' if self.deleted else ''}>"
+
+
+class IngestKey(db.Model):
+    """Idempotency key of a client write already applied, with the result to repeat to retries"""
+    __tablename__ = 'ingest_keys'
+    __table_args__ = (
+        db.Index('ix_ingest_keys_created', 'created_at'),
+    )
+
+    key = db.Column(db.String(100), primary_key=True)  # Chosen by the client, e.g. a UUID per queued write
+    kind = db.Column(db.String(20), nullable=False)  # 'update', 'checklist' or 'weight'
+    ref_id = db.Column(db.Integer, nullable=False)  # ID of the record the write created
+    pet_id = db.Column(db.Integer, nullable=False)
+    result = db.Column(db.Text, nullable=False)  # JSON returned for the write
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<IngestKey {self.key}: {self.kind} {self.ref_id}>"
+
+
+class ImportCheckpoint(db.Model):
+    """Progress of a bulk import, committed with each chunk so an interrupted import can resume"""
+    __tablename__ = 'import_checkpoints'
+    
+    source = db.Column(db.String(500), primary_key=True)  # Absolute path of the imported file
+    source_size = db.Column(db.BigInteger, nullable=False)  # Detects a different file at the same path
+    records_done = db.Column(db.Integer, nullable=False, default=0)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ImportCheckpoint {self.source}: {self.records_done} records>"
+
+
 # Add the relationship after all classes are defined to avoid circular dependencies
-Pet.weight_records = relationship("WeightRecord", back_populates="pet", cascade="all, delete-orphan")
\ No newline at end of file
+Pet.weight_records = relationship("WeightRecord", back_populates="pet", cascade="all, delete-orphan")
+# Maintained by pawpass.activity.ActivityCounters, never written through the relationship
+Pet.activity = relationship("PetActivity", uselist=False, viewonly=True)
+
+
+# Wall-clock (date, time) attributes derived from each model's occurred_at
+MOMENT_ATTRIBUTES = {
+    PetUpdate: ('update_date', 'update_time'),
+    Checklist: ('completion_date', 'completion_time'),
+    WeightRecord: ('record_date', 'record_time'),
+}
+
+
+def _sync_moment(mapper, connection, target):
+    """Keep occurred_at and the wall-clock date and time columns describing the same moment
+
+    Writers set occurred_at; code that still sets the date and time gets
+    occurred_at computed from them instead.
+    """
+    date_attribute, time_attribute = MOMENT_ATTRIBUTES[mapper.class_]
+    attributes = inspect(target).attrs
+    wall_clock_changed = attributes[date_attribute].history.has_changes() \
+        or attributes[time_attribute].history.has_changes()
+
+    if target.occurred_at is None or (wall_clock_changed and not attributes.occurred_at.history.has_changes()):
+        target.occurred_at = shelter_moment(getattr(target, date_attribute), getattr(target, time_attribute))
+    else:
+        local = target.occurred_at.astimezone(SHELTER_TIMEZONE)
+        setattr(target, date_attribute, local.date())
+        setattr(target, time_attribute, local.time())
+
+
+for _model in MOMENT_ATTRIBUTES:
+    event.listen(_model, 'before_insert', _sync_moment)
+    event.listen(_model, 'before_update', _sync_moment)
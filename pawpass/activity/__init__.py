@@ -0,0 +1,8 @@
+"""
+Activity counters module for PawPass
+"""
+from pawpass.activity.counters import ActivityCounters
+
+__all__ = [
+    'ActivityCounters'
+]
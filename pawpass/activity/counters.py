@@ -0,0 +1,299 @@
+"""
+Per-pet activity counters maintained from ORM writes
+"""
+import logging
+
+from sqlalchemy import and_, case, event, func, inspect, literal, or_, select, text
+from sqlalchemy.orm import object_session
+
+from pawpass.sequence import CommitQueue, MonotonicCounter
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class ActivityCounters:
+    """Denormalized per-pet history counts and latest-entry pointers
+
+    One summary row per pet holds, for each watched history table, the
+    number of rows, when the newest one happened and its ID (plus any
+    extra columns copied from it, like the latest weight). Inserts bump the
+    counters in place; edits and deletes recompute the affected pet from
+    the (pet_id, occurred_at, id) indexes. Both run from ORM flushes on the
+    flush's connection, so the summary commits or rolls back with the write.
+
+    Every transaction that writes to pets or their history also gives the
+    pets it wrote a new `version` from a counter that deleting pets raises
+    too, so no version is handed out twice. A pet's version identifies the
+    state of its page, and the counter's value identifies the state of the
+    whole collection. The version is taken and stamped on the pets just
+    before the session commits, so the counter is locked only from then
+    to the COMMIT.
+    """
+
+    def __init__(self, db, summary_model, counter_model):
+        """
+        Initialize the counters
+
+        Args:
+            db: Flask-SQLAlchemy instance
+            summary_model: The PetActivity model holding one row per pet
+            counter_model: The SequenceCounter model, holding the version counter
+        """
+        self.db = db
+        self.summary_model = summary_model
+        summary = summary_model.__table__
+        self.versions = MonotonicCounter(db, counter_model, f'{summary.name}.version',
+                                         seed=select(func.max(summary.c.version)))
+        # IDs of the pets the transaction wrote, or None for a change to the collection only
+        self.pending = CommitQueue(db, f'{summary.name}.version', self._stamp_versions)
+        self.pet_model = None
+        # Counter prefix -> history table, and history model -> counter prefix
+        self.sources = {}
+        self._prefixes = {}
+        # Counter prefix -> {summary column: history column} copied from the newest row
+        self.latest_values = {}
+
+    def watch(self, pet_model, sources, latest_values=None):
+        """
+        Keep the counters in sync with inserts, updates and deletes of pets and their history
+
+        Args:
+            pet_model: The Pet model
+            sources: Mapping of counter prefix to history model, e.g. {'update': PetUpdate};
+                the summary model has <prefix>_count, last_<prefix>_at and last_<prefix>_id columns
+            latest_values: Mapping of summary column name to a history column copied from
+                the newest row, e.g. {'latest_weight': WeightRecord.weight}
+        """
+        self.pet_model = pet_model
+        event.listen(pet_model, 'after_insert', self._add_pet)
+        event.listen(pet_model, 'after_update', self._pet_changed)
+        event.listen(pet_model, 'after_delete', self._remove_pet)
+
+        for prefix, model in sources.items():
+            self.sources[prefix] = model.__table__
+            self._prefixes[model] = prefix
+            self.latest_values[prefix] = {}
+            event.listen(model, 'after_insert', self._record_added)
+            event.listen(model, 'after_update', self._record_changed)
+            event.listen(model, 'after_delete', self._record_removed)
+
+        for name, column in (latest_values or {}).items():
+            prefix = next(prefix for prefix, table in self.sources.items() if column.table is table)
+            self.latest_values[prefix][name] = column.name
+
+    def create_schema(self):
+        """Add the version column to summary tables created before it existed, and create the version counter"""
+        summary = self.summary_model.__table__
+        columns = {column['name'] for column in self.db.inspect(self.db.engine).get_columns(summary.name)}
+        if 'version' not in columns:
+            with self.db.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {summary.name} ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+            logger.info(f"Added version to {summary.name}")
+        self.versions.create()
+
+    def pet_version(self, pet_id):
+        """
+        Get the version of one pet's data
+
+        Returns:
+            int: The version, or None if the pet has no summary row
+        """
+        summary = self.summary_model.__table__
+        return self.db.session.execute(select(summary.c.version).where(summary.c.pet_id == pet_id)).scalar()
+
+    def collection_version(self):
+        """
+        Get the version of all pets' data
+
+        Every write and every pet deletion raises the version counter, and
+        it never goes back, so its value changes whenever any pet's data
+        does and never comes back to an earlier state's.
+
+        Returns:
+            int: The last version handed out
+        """
+        return self.versions.current()
+
+    def backfill(self):
+        """Build the counters for an existing database that has pets but no summary rows yet"""
+        if self.pet_model is not None and self.summary_model.query.first() is None \
+                and self.pet_model.query.first() is not None:
+            self.rebuild()
+
+    def rebuild(self):
+        """Recompute every pet's summary row from the history tables"""
+        summary = self.summary_model.__table__
+        with self.db.engine.begin() as connection:
+            version = self.versions.advance(connection)
+            connection.execute(summary.delete())
+            connection.execute(self._summary_insert(version=version))
+        logger.info("Rebuilt the pet activity counters")
+
+    def refresh_pets(self, pet_ids):
+        """
+        Recompute the summary rows of some pets
+
+        Bulk inserts and deletes bypass the ORM events, so bulk loaders and
+        repairs call this in the same session transaction as their writes.
+
+        Args:
+            pet_ids: IDs of the pets to recompute
+        """
+        if pet_ids:
+            self._refresh(self.db.session, pet_ids)
+            self._touch(self.db.session, pet_ids)
+
+    def record_pets_deleted(self, pet_ids):
+        """
+        Raise the collection version for pets removed with bulk deletes
+
+        Args:
+            pet_ids: IDs of the deleted pets
+        """
+        if pet_ids:
+            self._touch(self.db.session, [None])
+
+    def stale_pet_ids(self):
+        """
+        Find pets whose summary row is missing or disagrees with their history
+
+        Returns:
+            list: Pet IDs, in ascending order
+        """
+        summary = self.summary_model.__table__
+        expected = self._summary_select().subquery()
+        differs = [summary.c.pet_id.is_(None)] + [
+            summary.c[column.name].is_distinct_from(column)
+            for column in expected.c if column.name != 'pet_id'
+        ]
+        statement = select(expected.c.pet_id)\
+            .select_from(expected.outerjoin(summary, summary.c.pet_id == expected.c.pet_id))\
+            .where(or_(*differs))\
+            .order_by(expected.c.pet_id)
+        return list(self.db.session.execute(statement).scalars())
+
+    def remove_orphans(self):
+        """
+        Delete summary rows whose pet no longer exists
+
+        Returns:
+            int: Number of rows deleted
+        """
+        summary = self.summary_model.__table__
+        pets = self.pet_model.__table__
+        result = self.db.session.execute(summary.delete().where(summary.c.pet_id.not_in(select(pets.c.id))))
+        if result.rowcount:
+            self._touch(self.db.session, [None])
+        return result.rowcount
+
+    def _summary_columns(self, prefix, pet_id):
+        """Correlated subqueries computing one source's counters for the pet ID expression"""
+        table = self.sources[prefix]
+        newest = select(table.c.occurred_at)\
+            .where(table.c.pet_id == pet_id)\
+            .order_by(table.c.occurred_at.desc(), table.c.id.desc())\
+            .limit(1)
+
+        columns = {
+            f'{prefix}_count': select(func.count()).select_from(table).where(table.c.pet_id == pet_id).scalar_subquery(),
+            f'last_{prefix}_at': newest.scalar_subquery(),
+            f'last_{prefix}_id': newest.with_only_columns(table.c.id).scalar_subquery(),
+        }
+        for name, column_name in self.latest_values[prefix].items():
+            columns[name] = newest.with_only_columns(table.c[column_name]).scalar_subquery()
+        return columns
+
+    def _summary_select(self, pet_ids=None):
+        """SELECT of every pet's freshly computed summary row"""
+        pets = self.pet_model.__table__
+        columns = [pets.c.id.label('pet_id')]
+        for prefix in self.sources:
+            columns += [expression.label(name) for name, expression in self._summary_columns(prefix, pets.c.id).items()]
+        statement = select(*columns)
+        if pet_ids is not None:
+            statement = statement.where(pets.c.id.in_(pet_ids))
+        return statement
+
+    def _summary_insert(self, pet_ids=None, version=0):
+        """INSERT ... SELECT writing freshly computed summary rows with the given version"""
+        statement = self._summary_select(pet_ids).add_columns(literal(version).label('version'))
+        names = [column.name for column in statement.selected_columns]
+        return self.summary_model.__table__.insert().from_select(names, statement)
+
+    def _touch(self, session, pet_ids):
+        for pet_id in pet_ids:
+            self.pending.add(session, pet_id)
+
+    def _stamp_versions(self, connection, pet_ids):
+        """Take one version for the committing transaction and give it to the pets it wrote"""
+        version = self.versions.advance(connection)
+        pet_ids = sorted({pet_id for pet_id in pet_ids if pet_id is not None})
+        if pet_ids:
+            summary = self.summary_model.__table__
+            connection.execute(summary.update().where(summary.c.pet_id.in_(pet_ids)).values(version=version))
+
+    def _refresh(self, connection, pet_ids):
+        # Written with version 0; the transaction's version is stamped at commit
+        summary = self.summary_model.__table__
+        connection.execute(summary.delete().where(summary.c.pet_id.in_(pet_ids)))
+        connection.execute(self._summary_insert(pet_ids))
+
+    def _refresh_source(self, connection, prefix, pet_ids):
+        """Recompute one source's counters for pets whose history was edited or deleted"""
+        summary = self.summary_model.__table__
+        result = connection.execute(
+            summary.update()
+            .where(summary.c.pet_id.in_(pet_ids))
+            .values(**self._summary_columns(prefix, summary.c.pet_id))
+        )
+        if result.rowcount < len(pet_ids):
+            self._refresh(connection, pet_ids)
+
+    def _add_pet(self, mapper, connection, pet):
+        connection.execute(self.summary_model.__table__.insert().values(pet_id=pet.id))
+        self._touch(object_session(pet), [pet.id])
+
+    def _pet_changed(self, mapper, connection, pet):
+        self._touch(object_session(pet), [pet.id])
+
+    def _remove_pet(self, mapper, connection, pet):
+        summary = self.summary_model.__table__
+        connection.execute(summary.delete().where(summary.c.pet_id == pet.id))
+        self._touch(object_session(pet), [None])
+
+    def _record_added(self, mapper, connection, record):
+        prefix = self._prefixes[mapper.class_]
+        summary = self.summary_model.__table__
+        count, last_at, last_id = (summary.c[f'{prefix}_count'], summary.c[f'last_{prefix}_at'],
+                                   summary.c[f'last_{prefix}_id'])
+        # The new row becomes the latest unless a later one is already recorded
+        newest = or_(last_at.is_(None), last_at < record.occurred_at,
+                     and_(last_at == record.occurred_at, last_id < record.id))
+
+        values = {
+            count.name: count + 1,
+            last_at.name: case((newest, literal(record.occurred_at, last_at.type)), else_=last_at),
+            last_id.name: case((newest, record.id), else_=last_id),
+        }
+        table = self.sources[prefix]
+        for name, column_name in self.latest_values[prefix].items():
+            value = literal(getattr(record, column_name), table.c[column_name].type)
+            values[name] = case((newest, value), else_=summary.c[name])
+
+        result = connection.execute(summary.update().where(summary.c.pet_id == record.pet_id).values(**values))
+        if result.rowcount == 0:
+            # The pet was written without the ORM (or before the counters existed)
+            self._refresh(connection, [record.pet_id])
+        self._touch(object_session(record), [record.pet_id])
+
+    def _record_changed(self, mapper, connection, record):
+        # Edits can move a record in time or to another pet, so recompute both pets
+        pet_ids = {record.pet_id}
+        pet_ids.update(pet_id for pet_id in inspect(record).attrs.pet_id.history.deleted if pet_id is not None)
+        self._refresh_source(connection, self._prefixes[mapper.class_], sorted(pet_ids))
+        self._touch(object_session(record), pet_ids)
+
+    def _record_removed(self, mapper, connection, record):
+        self._refresh_source(connection, self._prefixes[mapper.class_], [record.pet_id])
+        self._touch(object_session(record), [record.pet_id])
@@ -1,21 +1,36 @@
 """
 AI integration module for PawPass
 """
+import os
+
 from pawpass.ai.pet_ai import AIService
+from pawpass.registry import services
+
+# The AI client is created on first use and shared by every request
+services.register('ai', AIService)
+
+def get_ai_service():
+    """Return the shared AI service, creating it on first use and again when GOOGLE_API_KEY changes"""
+    ai_service = services.get('ai')
+    if ai_service.api_key != os.environ.get("GOOGLE_API_KEY"):
+        # Build a new service for the new key rather than change the one other requests are using
+        services.reset('ai')
+        ai_service = services.get('ai')
+    return ai_service
 
 def get_recommendations(pet_id, recommendation_type, recent_days=30):
     """Get care recommendations for a pet"""
-    ai_service = AIService()
+    ai_service = get_ai_service()
     # Implementation would involve fetching pet data and using AIService
     return {"message": "Recommendations feature coming soon"}
 
 def analyze_behavior(pet_id, timeframe="past_month"):
     """Analyze behavior patterns from updates"""
-    ai_service = AIService()
+    ai_service = get_ai_service()
     # Implementation would involve fetching update data and using AIService
     return {"message": "Behavior analysis feature coming soon"}
 
 def process_text(update_text):
     """Process and analyze update text"""
-    ai_service = AIService()
-    return ai_service.process_text(update_text)
\ No newline at end of file
+    ai_service = get_ai_service()
+    return ai_service.process_text(update_text)
@@ -4,19 +4,31 @@ AI integration module for PawPass
 import os
 import json
 import logging
+import time
 from enum import Enum
-import google.generativeai as genai
+
+from pawpass.monitoring import metrics
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Provider round trips take seconds, so these buckets start where request buckets leave off
+AI_REQUEST_SECONDS = metrics.histogram('pawpass_ai_request_duration_seconds', 'Time spent waiting for the AI provider',
+                                       ['provider'], buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0))
+AI_ERRORS = metrics.counter('pawpass_ai_errors_total', 'AI calls that failed or returned no usable text',
+                            ['provider', 'reason'])
+
 class AIProvider(Enum):
     """AI service provider options"""
     GEMINI = "gemini"
     MOCK = "mock"  # For development/testing
 
 class AIService:
-    """AI service for pet care recommendations and analysis"""
+    """AI service for pet care recommendations and analysis
+
+    One instance is shared by every request thread, so its attributes are
+    set in __init__ and only read afterwards.
+    """
     
     def __init__(self):
         """Initialize the AI service with configuration from environment variables"""
@@ -33,6 +45,8 @@ class AIService:
         # Initialize Gemini client if API key is available
         if self.api_key:
             try:
+                # The Gemini SDK is heavy, so it is only imported when it will be used
+                import google.generativeai as genai
                 genai.configure(api_key=self.api_key)
                 # Using gemini-1.5-pro which is the currently supported model
                 self.model = genai.GenerativeModel('gemini-1.5-pro')
@@ -57,6 +71,7 @@ class AIService:
         Returns:
             dict: Analysis results
         """
+        started = time.perf_counter()
         try:
             if self.provider == AIProvider.MOCK:
                 logger.warning("Using mock provider instead of real AI service")
@@ -68,6 +83,7 @@ class AIService:
             # Check API key again
             if not self.api_key:
                 logger.error("API key is missing when trying to process text")
+                AI_ERRORS.inc(provider=self.provider.value, reason='missing_key')
                 return {
                     "error": "API key is missing",
                     "text": "The AI service is not properly configured. Please contact support.",
@@ -79,12 +95,8 @@ class AIService:
             config = ModelConfig.get_config(ModelType.RECOMMENDATION)
             
             # Make API call - add extra debug logging
-            logger.info(f"Making Gemini API call with API key starting with: {self.api_key[:5]}...")
-            logger.debug(f"Sending prompt (first 100 chars): {prompt[:100]}...")
-            
-            # Initialize model again in case of any issues
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-pro')
+            logger.info("Making Gemini API call")
+            logger.debug("Sending prompt (first 100 chars): %.100s...", prompt)
             
             response = self.model.generate_content(
                 prompt,
@@ -97,6 +109,7 @@ class AIService:
             # Check if response is valid
             if not response or not hasattr(response, 'text'):
                 logger.error(f"Invalid response from Gemini: {response}")
+                AI_ERRORS.inc(provider=self.provider.value, reason='invalid_response')
                 return {
                     "error": "Invalid response from AI service",
                     "text": "I received an incomplete response. Please try again.",
@@ -111,7 +124,7 @@ class AIService:
             }
             
             logger.info("Successfully processed AI request")
-            logger.debug(f"AI response (first 100 chars): {response.text[:100]}...")
+            logger.debug("AI response (first 100 chars): %.100s...", response.text)
             
             return result
             
@@ -119,12 +132,15 @@ class AIService:
             logger.error(f"Error processing text with AI: {e}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
+            AI_ERRORS.inc(provider=self.provider.value, reason=type(e).__name__)
             
             return {
                 "error": str(e),
                 "text": "I encountered an error while processing your question. Please try again with a different question.",
                 "is_mock": False
             }
+        finally:
+            AI_REQUEST_SECONDS.observe(time.perf_counter() - started, provider=self.provider.value)
     
     def get_care_instructions(self, species, care_type):
         """
@@ -0,0 +1,11 @@
+"""
+Page cache module for PawPass
+"""
+from pawpass.cache.pages import PageCache
+from pawpass.cache.conditional import conditional_response, version_etag
+
+__all__ = [
+    'PageCache',
+    'conditional_response',
+    'version_etag'
+]
@@ -0,0 +1,48 @@
+"""
+Conditional GET answered from data versions, before the response body is built
+"""
+import hashlib
+
+from flask import Response, current_app, request
+
+
+def version_etag(version, representation):
+    """
+    Compute a strong ETag for one representation of one version of some data
+
+    Args:
+        version: Value that changes whenever the data does, e.g. ActivityCounters.pet_version()
+        representation: What else shapes the body, e.g. the request path and query string
+
+    Returns:
+        str: The ETag, without quotes
+    """
+    return hashlib.sha256(f"{version!r}|{representation}".encode()).hexdigest()[:32]
+
+
+def conditional_response(version, build):
+    """
+    Answer If-None-Match with 304 Not Modified when the client has this version, otherwise build the response
+
+    The ETag comes from the version and the request's path and query
+    string, so an unchanged poll costs only the version lookup: the body
+    is neither queried nor serialized.
+
+    Args:
+        version: Value that changes whenever the data in the response does
+        build: Callable returning the full response (anything a view may return)
+
+    Returns:
+        Response: 304 with the ETag, or the built response (tagged if it is a 200)
+    """
+    etag = version_etag(version, request.full_path)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = current_app.make_response(build())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    # Clients may keep the response but must check it is current before reusing it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
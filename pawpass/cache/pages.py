@@ -0,0 +1,111 @@
+"""
+In-memory cache of rendered pages, invalidated by data versions
+"""
+import logging
+import sys
+import threading
+from collections import OrderedDict
+
+from flask import session
+
+from pawpass.monitoring.metrics import metrics
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    """LRU cache of rendered HTML, one entry per page, valid for one version of the page's data
+
+    Each entry is stored under the page's key (e.g. ('pet', 12)) together
+    with the version of the data it was rendered from. A lookup with any
+    other version renders the page again and replaces the entry, so old
+    renders never pile up. When the cached pages exceed the memory cap the
+    least recently used are dropped.
+
+    Versions come from the database, so every worker sees writes made by
+    the others; each worker keeps its own cache.
+
+    Pages are rendered without caching while flash messages are waiting
+    to be shown, since those belong to one visitor.
+
+    Configuration (app.config):
+        PAGE_CACHE_ENABLED: Serve pages from the cache (default True)
+        PAGE_CACHE_MAX_BYTES: Memory cap for cached pages (default 32 MB)
+    """
+
+    def __init__(self, app=None, registry=metrics):
+        self.enabled = True
+        self.max_bytes = 32 * 1024 * 1024
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (version, body, size)
+        self._lock = threading.Lock()
+        self.requests = registry.counter('pawpass_page_cache_requests_total',
+                                         'Cacheable page views, by page and result', ['page', 'result'])
+        self.evictions = registry.counter('pawpass_page_cache_evictions_total',
+                                          'Cached pages dropped to stay under the memory cap')
+        registry.gauge('pawpass_page_cache_bytes', 'Memory held by cached pages', callback=lambda: self.size)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the cache settings from the app config"""
+        app.config.setdefault('PAGE_CACHE_ENABLED', True)
+        app.config.setdefault('PAGE_CACHE_MAX_BYTES', self.max_bytes)
+        self.enabled = app.config['PAGE_CACHE_ENABLED']
+        self.max_bytes = app.config['PAGE_CACHE_MAX_BYTES']
+
+    def get_or_render(self, key, version, render):
+        """
+        Return the cached page for this version of its data, rendering and caching it on a miss
+
+        Args:
+            key: Hashable page identity; its first element labels the page in metrics
+            version: Value that changes whenever the data shown on the page does
+            render: Callable returning the page's HTML (or a response, which is not cached)
+
+        Returns:
+            str: The page
+        """
+        page = key[0]
+        if not self.enabled or session.get('_flashes'):
+            self.requests.inc(page=page, result='bypass')
+            return render()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.requests.inc(page=page, result='hit')
+                return entry[1]
+
+        self.requests.inc(page=page, result='miss')
+        body = render()
+        if isinstance(body, str):
+            # Redirects and other responses are passed through uncached
+            self._store(key, version, body)
+        return body
+
+    def _store(self, key, version, body):
+        size = sys.getsizeof(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            self._entries[key] = (version, body, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, dropped) = self._entries.popitem(last=False)
+                self.size -= dropped
+                self.evictions.inc()
+
+    def clear(self):
+        """Drop every cached page"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -6,22 +6,32 @@ from pawpass.email.email_service import (
     EmailTemplate, 
     EmailProvider
 )
+from pawpass.registry import services
 
-# Create a singleton instance of the email service
-email_service = EmailService()
+# The email service is created on first use
+services.register('email', EmailService)
+
+# Importing the submodule bound its name here; drop it so email_service resolves to the service
+del email_service
+
+def __getattr__(name):
+    # Keeps `from pawpass.email import email_service` working without building it at import
+    if name == 'email_service':
+        return services.get('email')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Export functions that use the singleton
 def send_notification(recipient, subject, template, context=None):
     """Send a notification email"""
-    return email_service.send_notification(recipient, subject, template, context)
+    return services.get('email').send_notification(recipient, subject, template, context)
 
 def create_reminder(recipient, schedule, pet_id, reminder_type):
     """Schedule a reminder email"""
-    return email_service.create_reminder(recipient, schedule, pet_id, reminder_type)
+    return services.get('email').create_reminder(recipient, schedule, pet_id, reminder_type)
 
 def get_template(template_name):
     """Get an email template by name"""
-    return email_service.get_template(template_name)
+    return services.get('email').get_template(template_name)
 
 __all__ = [
     'EmailService',
@@ -31,4 +41,4 @@ __all__ = [
     'send_notification',
     'create_reminder',
     'get_template'
-]
\ No newline at end of file
+]
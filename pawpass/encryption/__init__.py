@@ -1,24 +1,36 @@
 """
 Encryption module for PawPass
 """
-from pawpass.encryption.crypto import (
-    EncryptionService,
-    EncryptionProvider,
-    SecureStore,
-    secure_store
-)
+import importlib
 
-# Create a singleton instance of the encryption service
-encryption_service = EncryptionService()
+from pawpass.registry import services
+
+# crypto.py imports the cryptography package, so it is only loaded on first use
+_CRYPTO_EXPORTS = ('EncryptionService', 'EncryptionProvider', 'SecureStore')
+
+def _crypto():
+    return importlib.import_module('pawpass.encryption.crypto')
+
+services.register('encryption', lambda: _crypto().EncryptionService())
+services.register('secure_store', lambda: _crypto().SecureStore())
+
+def __getattr__(name):
+    if name in _CRYPTO_EXPORTS:
+        return getattr(_crypto(), name)
+    if name == 'encryption_service':
+        return services.get('encryption')
+    if name == 'secure_store':
+        return services.get('secure_store')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Export functions that use the singleton
 def encrypt_data(plaintext, context=None, user_id=None):
     """Encrypt sensitive data"""
-    return encryption_service.encrypt_data(plaintext, context, user_id)
+    return services.get('encryption').encrypt_data(plaintext, context, user_id)
 
 def decrypt_data(ciphertext, context=None, user_id=None):
     """Decrypt encrypted data"""
-    return encryption_service.decrypt_data(ciphertext, context, user_id)
+    return services.get('encryption').decrypt_data(ciphertext, context, user_id)
 
 __all__ = [
     'EncryptionService',
@@ -28,4 +40,4 @@ __all__ = [
     'secure_store',
     'encrypt_data',
     'decrypt_data'
-]
\ No newline at end of file
+]
@@ -118,6 +118,3 @@ class SecureStore:
         value = self._store.get(key)
         logger.debug(f"Retrieved value for key: {key}")
         return value
-
-# Create a shared instance of the secure store
-secure_store = SecureStore()
\ No newline at end of file
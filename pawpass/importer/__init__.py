@@ -0,0 +1,12 @@
+"""
+Bulk import module for PawPass
+"""
+from pawpass.importer.stream import iter_json_array
+from pawpass.importer.pets import PetImporter
+from pawpass.importer.synthetic import SyntheticShelter
+
+__all__ = [
+    'iter_json_array',
+    'PetImporter',
+    'SyntheticShelter'
+]
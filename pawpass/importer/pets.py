@@ -0,0 +1,283 @@
+"""
+Streaming bulk import of shelter pet exports
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import pytz
+
+from pawpass.importer.stream import iter_json_array
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Default checklist items are ticked from these export flags, first match wins
+CHECKLIST_FLAGS = (
+    ('fed', 'fed'),
+    ('medication', 'meds'),
+    ('water', 'water'),
+    ('play', 'playtime'),
+)
+
+
+class PetImporter:
+    """Load a pets.json-style export in chunks of set-based inserts
+
+    Pets are streamed from the file, so memory use does not grow with the
+    export. Each chunk is inserted with one multi-row INSERT per table and
+    committed together with the import checkpoint, so an interrupted import
+    picks up after the last committed chunk.
+    """
+
+    def __init__(self, db, search_index=None, activity=None, changes=None, chunk_size=500,
+                 shelter_timezone='America/Los_Angeles'):
+        """
+        Initialize the importer
+
+        Args:
+            db: Flask-SQLAlchemy instance
+            search_index: Optional FullTextIndex to add the imported pets to
+            activity: Optional ActivityCounters to compute the imported pets' counters in
+            changes: Optional ChangeLog to log the imported pets and their history in, for syncing clients
+            chunk_size: Pets inserted and committed per chunk
+            shelter_timezone: Time zone of the dates and times in the export
+        """
+        self.db = db
+        self.search_index = search_index
+        self.activity = activity
+        self.changes = changes
+        self.chunk_size = chunk_size
+        self.shelter_timezone = pytz.timezone(shelter_timezone) if isinstance(shelter_timezone, str) \
+            else shelter_timezone
+
+        tables = db.metadata.tables
+        self.pets = tables['pets']
+        self.updates = tables['pet_updates']
+        self.checklists = tables['checklists']
+        self.checklist_items = tables['checklist_items']
+        self.completions = tables['checklist_completions']
+        self.checkpoints = tables['import_checkpoints']
+
+    def run(self, path, restart=False):
+        """
+        Import every pet in the file, resuming from the last checkpoint
+
+        Args:
+            path: Path of the JSON export (a top-level array of pets)
+            restart: Ignore any checkpoint and import from the first record
+
+        Returns:
+            dict: Pets skipped, rows inserted per table and elapsed seconds
+
+        Raises:
+            ValueError: If the file changed since the checkpoint was written, or a record is malformed
+        """
+        source = os.path.abspath(path)
+        source_size = os.path.getsize(source)
+        records_done = self._start(source, source_size, restart)
+
+        # Looked up once rather than per checklist
+        default_items = self._default_items()
+
+        stats = {'skipped': records_done, 'pets': 0, 'updates': 0, 'checklists': 0, 'completions': 0}
+        started = time.perf_counter()
+        chunk = []
+        with open(source, 'r', encoding='utf-8') as f:
+            for index, record in enumerate(iter_json_array(f)):
+                if index < records_done:
+                    continue
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    records_done = self._import_chunk(source, chunk, records_done, default_items, stats)
+                    chunk = []
+                    logger.info(f"Imported {stats['pets']} pets from {source} "
+                                f"({stats['pets'] / (time.perf_counter() - started):.0f} pets/s)")
+
+        self._import_chunk(source, chunk, records_done, default_items, stats, finished=True)
+        stats['seconds'] = time.perf_counter() - started
+        logger.info(f"Finished importing {source}: {stats}")
+        return stats
+
+    def _start(self, source, source_size, restart):
+        """Create or reset the checkpoint and return how many records are already imported"""
+        checkpoints = self.checkpoints
+        session = self.db.session
+        checkpoint = session.execute(
+            self.db.select(checkpoints).where(checkpoints.c.source == source)
+        ).first()
+
+        if checkpoint is not None and not restart:
+            if checkpoint.source_size != source_size:
+                raise ValueError(f"{source} changed since it was last imported; use restart to import it again")
+            if checkpoint.records_done:
+                logger.info(f"Resuming import of {source} after {checkpoint.records_done} records")
+            return checkpoint.records_done
+
+        if checkpoint is None:
+            session.execute(checkpoints.insert().values(source=source, source_size=source_size, records_done=0))
+        else:
+            session.execute(checkpoints.update().where(checkpoints.c.source == source)
+                            .values(source_size=source_size, records_done=0, finished_at=None))
+        session.commit()
+        return 0
+
+    def _default_items(self):
+        """(item ID, export flag) pairs for the default checklist items"""
+        items = self.checklist_items
+        rows = self.db.session.execute(
+            self.db.select(items.c.id, items.c.description)
+            .where(items.c.is_default.is_(True))
+            .order_by(items.c.id)
+        )
+        default_items = []
+        for item_id, description in rows:
+            description = description.lower()
+            flag = next((flag for keyword, flag in CHECKLIST_FLAGS if keyword in description), None)
+            default_items.append((item_id, flag))
+        return default_items
+
+    def _import_chunk(self, source, records, records_done, default_items, stats, finished=False):
+        """Insert one chunk of pets with their updates and checklists, then advance the checkpoint"""
+        session = self.db.session
+        try:
+            if records:
+                # Checked before anything is inserted, so a bad record names itself
+                converted = [self._convert(number, record)
+                             for number, record in enumerate(records, records_done + 1)]
+                pet_ids = self._insert_returning_ids(self.pets, [pet_row for pet_row, _, _ in converted])
+
+                update_rows = []
+                checklist_rows = []
+                checklist_data = []
+                for pet_id, (_, updates, checklists) in zip(pet_ids, converted):
+                    for row in updates:
+                        row['pet_id'] = pet_id
+                        update_rows.append(row)
+                    for row, checklist in checklists:
+                        row['pet_id'] = pet_id
+                        checklist_rows.append(row)
+                        checklist_data.append(checklist)
+
+                if update_rows:
+                    session.execute(self.updates.insert(), update_rows)
+
+                completion_rows = []
+                if checklist_rows:
+                    checklist_ids = self._insert_returning_ids(self.checklists, checklist_rows)
+                    for checklist_id, checklist in zip(checklist_ids, checklist_data):
+                        for item_id, flag in default_items:
+                            completion_rows.append({
+                                'checklist_id': checklist_id,
+                                'checklist_item_id': item_id,
+                                'completed': bool(flag and checklist.get(flag)),
+                            })
+                if completion_rows:
+                    session.execute(self.completions.insert(), completion_rows)
+
+                if self.search_index is not None:
+                    self.search_index.index_pets(pet_ids)
+                if self.activity is not None:
+                    self.activity.refresh_pets(pet_ids)
+                if self.changes is not None:
+                    self.changes.record_pets(pet_ids)
+
+                stats['pets'] += len(pet_ids)
+                stats['updates'] += len(update_rows)
+                stats['checklists'] += len(checklist_rows)
+                stats['completions'] += len(completion_rows)
+
+            records_done += len(records)
+            values = {'records_done': records_done, 'updated_at': datetime.utcnow()}
+            if finished:
+                values['finished_at'] = datetime.utcnow()
+            session.execute(self.checkpoints.update().where(self.checkpoints.c.source == source).values(**values))
+            session.commit()
+        except ValueError as e:
+            session.rollback()
+            raise ValueError(f"Could not import records {records_done + 1}-{records_done + len(records)} "
+                             f"of {source}: {e}") from e
+        except Exception:
+            session.rollback()
+            raise
+        return records_done
+
+    def _convert(self, number, record):
+        """
+        Column values for one exported pet and its history, without the pet ID
+
+        Args:
+            number: Position of the record in the export, from 1
+            record: The exported pet
+
+        Returns:
+            tuple: (pet row, update rows, (checklist row, exported checklist) pairs)
+
+        Raises:
+            ValueError: If a required field is missing or malformed, naming the record
+        """
+        try:
+            updates = []
+            for update in record.get('updates', []):
+                update_date, update_time = parse_date(update['date']), parse_time(update['time'])
+                updates.append({
+                    'update_text': update['note'],
+                    'occurred_at': self._occurred_at(update_date, update_time),
+                    'update_date': update_date,
+                    'update_time': update_time,
+                    'volunteer_name': update.get('volunteer'),
+                })
+            checklists = []
+            for checklist in record.get('checklists', []):
+                completion_date, completion_time = parse_date(checklist['date']), parse_time(checklist['time'])
+                checklists.append(({
+                    'occurred_at': self._occurred_at(completion_date, completion_time),
+                    'completion_date': completion_date,
+                    'completion_time': completion_time,
+                    'notes': checklist.get('notes', ''),
+                    'volunteer_name': checklist.get('volunteer'),
+                }, checklist))
+            return self._pet_row(record), updates, checklists
+        except KeyError as e:
+            raise ValueError(f"record {number} is missing {e}") from e
+        except (AttributeError, TypeError, ValueError) as e:
+            raise ValueError(f"record {number} is malformed: {e}") from e
+
+    def _insert_returning_ids(self, table, rows):
+        """Insert rows in one batched statement and return their new IDs in row order"""
+        result = self.db.session.execute(
+            table.insert().returning(table.c.id, sort_by_parameter_order=True), rows
+        )
+        return result.scalars().all()
+
+    def _occurred_at(self, moment_date, moment_time):
+        """UTC moment of an export date and time on the shelter's wall clock"""
+        local = self.shelter_timezone.localize(datetime.combine(moment_date, moment_time))
+        return local.astimezone(timezone.utc)
+
+    @staticmethod
+    def _pet_row(record):
+        """Column values for one exported pet"""
+        return {
+            'name': record['name'],
+            'species': record['species'],
+            'breed': record.get('breed'),
+            'age': record.get('age'),
+            'gender': record.get('gender'),
+            'description': record.get('behavior_notes', ''),
+            'feeding_instructions': record.get('feeding_instructions'),
+            'medical_notes': record.get('medical_notes'),
+            'image_url': record.get('image', ''),
+            'is_emergency': bool(record.get('is_emergency', False)),
+        }
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD export date"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_time(value):
+    """Parse an HH:MM export time"""
+    return datetime.strptime(value, '%H:%M').time()
@@ -0,0 +1,83 @@
+"""
+Incremental parsing of large JSON exports
+"""
+import json
+
+WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(fileobj, read_size=1 << 16):
+    """
+    Yield the elements of a top-level JSON array one at a time
+
+    Only the element being decoded (plus one read buffer) is held in memory,
+    so exports far larger than RAM can be streamed.
+
+    Args:
+        fileobj: Text file object positioned at the start of the array
+        read_size: Characters read from the file at a time
+
+    Yields:
+        The decoded elements, in order
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = fileobj.read(read_size)
+        if not chunk:
+            eof = True
+        # Drop what has already been consumed before growing the buffer
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if position >= len(buffer) or buffer[position] != '[':
+        raise ValueError("Expected a JSON array")
+    position += 1
+
+    skip_whitespace()
+    if position < len(buffer) and buffer[position] == ']':
+        return
+
+    while True:
+        skip_whitespace()
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(f"Malformed JSON array element near character {position}")
+            fill()
+            continue
+
+        # A value that runs to the end of the buffer (e.g. a number) may continue in the next read
+        if end == len(buffer) and not eof:
+            fill()
+            continue
+
+        position = end
+        yield element
+
+        skip_whitespace()
+        if position >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[position] == ']':
+            return
+        if buffer[position] != ',':
+            raise ValueError(f"Expected ',' or ']' near character {position}")
+        position += 1
@@ -0,0 +1,296 @@
+"""
+Deterministic synthetic shelter data for benchmarks and local testing at production scale
+"""
+import json
+import logging
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+
+import pytz
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# (species, share of intake, breeds, (min kg, max kg) adult weight)
+SPECIES = (
+    ('Dog', 0.45, ('Labrador Retriever', 'German Shepherd', 'Pit Bull Mix', 'Chihuahua', 'Beagle',
+                   'Border Collie', 'Husky', 'Terrier Mix', 'Boxer', 'Dachshund'), (3.0, 40.0)),
+    ('Cat', 0.40, ('Domestic Shorthair', 'Domestic Longhair', 'Siamese', 'Maine Coon', 'Tabby',
+                   'Tuxedo', 'Calico'), (2.5, 7.0)),
+    ('Rabbit', 0.06, ('Holland Lop', 'Rex', 'Lionhead', 'Mixed'), (1.0, 4.5)),
+    ('Bird', 0.04, ('Budgerigar', 'Cockatiel', 'Conure'), (0.03, 0.5)),
+    ('Guinea Pig', 0.03, ('American', 'Abyssinian', 'Peruvian'), (0.7, 1.2)),
+    ('Hamster', 0.02, ('Syrian', 'Dwarf'), (0.03, 0.2)),
+)
+
+NAMES = ('Bella', 'Max', 'Luna', 'Charlie', 'Lucy', 'Cooper', 'Daisy', 'Milo', 'Bailey', 'Rocky', 'Sadie',
+         'Buddy', 'Molly', 'Bear', 'Stella', 'Tucker', 'Nala', 'Oliver', 'Zoe', 'Leo', 'Penny', 'Jack',
+         'Chloe', 'Duke', 'Lily', 'Toby', 'Rosie', 'Oreo', 'Ginger', 'Shadow', 'Pepper', 'Simba',
+         'Mochi', 'Biscuit', 'Pumpkin', 'Willow', 'Ziggy', 'Hazel', 'Ollie', 'Juniper')
+
+VOLUNTEERS = ('Jane Smith', 'Carlos Diaz', 'Priya Patel', 'Sam Lee', 'Morgan Chen', 'Alex Kim', 'Jordan Brooks',
+              'Taylor Nguyen', 'Riley Cooper', 'Casey Morgan', 'Jamie Ortiz', 'Avery Hall', 'Quinn Wright',
+              'Drew Walker', 'Robin Young', 'Sky Allen', 'Reese King', 'Devon Scott', 'Parker Green',
+              'Emerson Baker')
+
+UPDATE_NOTES = (
+    "{name} ate all of breakfast and seemed happy.",
+    "{name} went for a 20 minute walk and did well on the leash.",
+    "{name} was a bit shy today but warmed up after some treats.",
+    "Gave {name} a bath; coat looks much better.",
+    "{name} played with toys for a while and then napped.",
+    "{name} is limping slightly on the left front leg, keeping an eye on it.",
+    "{name} did not finish dinner, will check again in the morning.",
+    "Vet check for {name} went well, no concerns.",
+    "{name} met a potential adopter today and was very friendly.",
+    "Cleaned {name}'s enclosure and refreshed bedding.",
+    "{name} took medication with food without any trouble.",
+    "{name} was very vocal this evening, may need more enrichment.",
+)
+
+MEDICAL_NOTES = ('No current medications.', 'Daily thyroid medication with breakfast.',
+                 'Recovering from spay surgery; limit activity.', 'Insulin twice daily after meals.',
+                 'Mild skin allergy; hypoallergenic food only.', 'Ear infection, drops twice daily for a week.')
+
+# Check-in times of the morning, midday and evening shifts
+SHIFTS = (dt_time(8, 0), dt_time(13, 0), dt_time(18, 30))
+
+
+class SyntheticShelter:
+    """Generate a shelter's pets and care history with realistic, seeded distributions
+
+    The same seed and pet count always produce the same rows. Lengths of
+    stay are exponential, so most pets have a few weeks of history and a
+    few long-stay pets have many months. Volunteer activity is skewed
+    towards a handful of regulars. Rows are written with one multi-row
+    INSERT per table per chunk, like PetImporter.
+    """
+
+    def __init__(self, db, seed=42, search_index=None, activity=None, changes=None, chunk_size=1000,
+                 end_date=date(2025, 6, 1), mean_stay_days=21, max_stay_days=365,
+                 updates_per_day=0.4, checklists_per_day=0.8, weighings_per_week=1.0,
+                 enhanced_share=0.3, shelter_timezone='America/Los_Angeles'):
+        """
+        Initialize the generator
+
+        Args:
+            db: Flask-SQLAlchemy instance
+            seed: Random seed; the same seed gives the same data
+            search_index: Optional FullTextIndex to add the generated pets to
+            activity: Optional ActivityCounters to compute the generated pets' counters in
+            changes: Optional ChangeLog to log the generated pets and their history in, for syncing clients
+            chunk_size: Pets inserted and committed per chunk
+            end_date: Last day of generated history
+            mean_stay_days: Mean length of stay, i.e. of each pet's history
+            max_stay_days: Longest length of stay
+            updates_per_day: Mean care updates per pet per day
+            checklists_per_day: Mean checklists per pet per day
+            weighings_per_week: Mean weight records per pet per week
+            enhanced_share: Share of checklists filled in with the enhanced checklist items
+            shelter_timezone: Time zone of the generated wall-clock times
+        """
+        self.db = db
+        self.seed = seed
+        self.search_index = search_index
+        self.activity = activity
+        self.changes = changes
+        self.chunk_size = chunk_size
+        self.end_date = end_date
+        self.mean_stay_days = mean_stay_days
+        self.max_stay_days = max_stay_days
+        self.updates_per_day = updates_per_day
+        self.checklists_per_day = checklists_per_day
+        self.weighings_per_week = weighings_per_week
+        self.enhanced_share = enhanced_share
+        self.shelter_timezone = pytz.timezone(shelter_timezone) if isinstance(shelter_timezone, str) \
+            else shelter_timezone
+
+        tables = db.metadata.tables
+        self.pets = tables['pets']
+        self.updates = tables['pet_updates']
+        self.checklists = tables['checklists']
+        self.checklist_items = tables['checklist_items']
+        self.enhanced_items = tables['enhanced_checklist_items']
+        self.completions = tables['checklist_completions']
+        self.weights = tables['weight_records']
+
+    def generate(self, pet_count):
+        """
+        Insert pet_count pets with their updates, checklists and weight records
+
+        Args:
+            pet_count: Number of pets to create
+
+        Returns:
+            dict: Rows inserted per table and elapsed seconds
+        """
+        rng = random.Random(self.seed)
+        default_items, enhanced_items = self._checklist_items()
+        species_weights = [share for _, share, _, _ in SPECIES]
+        # Zipf-like volunteer activity: a few regulars do most of the shifts
+        volunteer_weights = [1 / (rank + 1) for rank in range(len(VOLUNTEERS))]
+
+        stats = {'pets': 0, 'updates': 0, 'checklists': 0, 'completions': 0, 'weights': 0}
+        started = time.perf_counter()
+        for first in range(0, pet_count, self.chunk_size):
+            pets = [self._pet(rng, index, species_weights) for index in range(first, min(first + self.chunk_size,
+                                                                                       pet_count))]
+            self._insert_chunk(rng, pets, default_items, enhanced_items, volunteer_weights, stats)
+            logger.info(f"Generated {stats['pets']} of {pet_count} pets")
+
+        stats['seconds'] = time.perf_counter() - started
+        logger.info(f"Generated synthetic shelter data: {stats}")
+        return stats
+
+    def _checklist_items(self):
+        """Default checklist item IDs and (ID, species, options, unit) of the enhanced items"""
+        select = self.db.select
+        default_items = self.db.session.execute(
+            select(self.checklist_items.c.id).where(self.checklist_items.c.is_default.is_(True))
+            .order_by(self.checklist_items.c.id)
+        ).scalars().all()
+        enhanced = self.enhanced_items
+        enhanced_items = [
+            (item_id, species, json.loads(options) if options else None, unit)
+            for item_id, species, options, unit in self.db.session.execute(
+                select(enhanced.c.id, enhanced.c.species_applicable, enhanced.c.options, enhanced.c.unit)
+                .order_by(enhanced.c.id)
+            )
+        ]
+        return default_items, enhanced_items
+
+    def _pet(self, rng, index, species_weights):
+        """One pet's columns, plus the species' weight range and its length of stay"""
+        species, _, breeds, weight_range = rng.choices(SPECIES, weights=species_weights)[0]
+        # Young animals are the most common intake
+        age = min(int(rng.expovariate(1 / 3.5)), 18)
+        stay_days = min(int(rng.expovariate(1 / self.mean_stay_days)) + 1, self.max_stay_days)
+        pet = {
+            'name': f"{rng.choice(NAMES)} {index + 1}",
+            'species': species,
+            'breed': rng.choice(breeds) if rng.random() < 0.9 else None,
+            'age': age if rng.random() < 0.92 else None,
+            'gender': rng.choices(('Male', 'Female', ''), weights=(48, 48, 4))[0],
+            'description': f"Friendly {species.lower()} who came in {stay_days} days ago.",
+            'image_url': '',
+            'is_emergency': rng.random() < 0.03,
+            'feeding_instructions': rng.choice(('Feed twice a day.', 'Small meals three times a day.',
+                                                'Free feed dry food; wet food in the evening.')),
+            'medical_notes': rng.choices(MEDICAL_NOTES, weights=(70, 8, 6, 4, 7, 5))[0],
+        }
+        return pet, weight_range, stay_days
+
+    def _moment(self, day, moment_time, rng):
+        """UTC occurred_at and wall-clock date and time, a few minutes either side of moment_time"""
+        local = datetime.combine(day, moment_time) + timedelta(minutes=rng.randint(-20, 40))
+        occurred_at = self.shelter_timezone.localize(local).astimezone(timezone.utc)
+        return occurred_at, local.date(), local.time()
+
+    @staticmethod
+    def _count(rng, rate):
+        """Events on one day for a mean rate, e.g. 0.4 gives 1 event on 40% of days"""
+        whole = int(rate)
+        return whole + (1 if rng.random() < rate - whole else 0)
+
+    def _insert_chunk(self, rng, pets, default_items, enhanced_items, volunteer_weights, stats):
+        session = self.db.session
+        pet_ids = self._insert_returning_ids(self.pets, [pet for pet, _, _ in pets])
+
+        update_rows, checklist_rows, checklist_completions, weight_rows = [], [], [], []
+        for pet_id, (pet, weight_range, stay_days) in zip(pet_ids, pets):
+            first_day = self.end_date - timedelta(days=stay_days - 1)
+            name = pet['name'].split(' ')[0]
+            species = pet['species'].lower()
+            weight = rng.uniform(*weight_range)
+            applicable = [item for item in enhanced_items if item[1] in (None, species)]
+
+            for offset in range(stay_days):
+                day = first_day + timedelta(days=offset)
+                for _ in range(self._count(rng, self.updates_per_day)):
+                    occurred_at, local_date, local_time = self._moment(day, rng.choice(SHIFTS), rng)
+                    update_rows.append({
+                        'pet_id': pet_id,
+                        'update_text': rng.choice(UPDATE_NOTES).format(name=name),
+                        'occurred_at': occurred_at,
+                        'update_date': local_date,
+                        'update_time': local_time,
+                        'volunteer_name': rng.choices(VOLUNTEERS, weights=volunteer_weights)[0],
+                    })
+
+                for _ in range(self._count(rng, self.checklists_per_day)):
+                    occurred_at, local_date, local_time = self._moment(day, rng.choice(SHIFTS), rng)
+                    checklist_rows.append({
+                        'pet_id': pet_id,
+                        'occurred_at': occurred_at,
+                        'completion_date': local_date,
+                        'completion_time': local_time,
+                        'notes': '',
+                        'volunteer_name': rng.choices(VOLUNTEERS, weights=volunteer_weights)[0],
+                    })
+                    checklist_completions.append(self._completions(rng, default_items, applicable))
+
+                if rng.random() < self.weighings_per_week / 7:
+                    # Small day-to-day drift around the pet's own weight
+                    weight *= rng.uniform(0.98, 1.02)
+                    occurred_at, local_date, local_time = self._moment(day, SHIFTS[0], rng)
+                    weight_rows.append({
+                        'pet_id': pet_id,
+                        'weight': round(weight, 2),
+                        'occurred_at': occurred_at,
+                        'record_date': local_date,
+                        'record_time': local_time,
+                        'volunteer_name': rng.choices(VOLUNTEERS, weights=volunteer_weights)[0],
+                        'notes': '',
+                    })
+
+        if update_rows:
+            session.execute(self.updates.insert(), update_rows)
+        completion_rows = []
+        if checklist_rows:
+            checklist_ids = self._insert_returning_ids(self.checklists, checklist_rows)
+            for checklist_id, completions in zip(checklist_ids, checklist_completions):
+                for completion in completions:
+                    completion['checklist_id'] = checklist_id
+                    completion_rows.append(completion)
+        if completion_rows:
+            session.execute(self.completions.insert(), completion_rows)
+        if weight_rows:
+            session.execute(self.weights.insert(), weight_rows)
+
+        if self.search_index is not None:
+            self.search_index.index_pets(pet_ids)
+        if self.activity is not None:
+            self.activity.refresh_pets(pet_ids)
+        if self.changes is not None:
+            self.changes.record_pets(pet_ids)
+        session.commit()
+
+        stats['pets'] += len(pet_ids)
+        stats['updates'] += len(update_rows)
+        stats['checklists'] += len(checklist_rows)
+        stats['completions'] += len(completion_rows)
+        stats['weights'] += len(weight_rows)
+
+    def _completions(self, rng, default_items, enhanced_items):
+        """Completion rows (without checklist_id) for one checklist, standard or enhanced"""
+        if enhanced_items and rng.random() < self.enhanced_share:
+            chosen = rng.sample(enhanced_items, min(len(enhanced_items), rng.randint(3, 6)))
+            completions = []
+            for item_id, _, options, unit in chosen:
+                value = rng.choice(options) if options else 'Done'
+                if unit:
+                    value = f"{value} - {rng.choice((0.5, 1, 1.5, 2))} {unit}"
+                completions.append({'checklist_item_id': item_id, 'completed': True, 'value': value, 'notes': ''})
+            return completions
+
+        # Standard checklists record every default item, ticked or not
+        return [{'checklist_item_id': item_id, 'completed': rng.random() < 0.8, 'value': None, 'notes': None}
+                for item_id in default_items]
+
+    def _insert_returning_ids(self, table, rows):
+        """Insert rows in one batched statement and return their new IDs in row order"""
+        result = self.db.session.execute(
+            table.insert().returning(table.c.id, sort_by_parameter_order=True), rows
+        )
+        return result.scalars().all()
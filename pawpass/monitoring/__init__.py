@@ -0,0 +1,28 @@
+"""
+Monitoring module for PawPass
+"""
+from pawpass.monitoring.sql import SQLInstrumentation, QueryStats, count_queries, assert_max_queries, statement_shape
+from pawpass.monitoring.metrics import MetricsRegistry, RequestMetrics, Counter, Gauge, Histogram, metrics
+from pawpass.monitoring.profiling import RequestProfiler, StackSampler, sign_profile_token, verify_profile_token
+from pawpass.monitoring.logs import configure_logging, JSONFormatter, SamplingFilter
+
+__all__ = [
+    'SQLInstrumentation',
+    'QueryStats',
+    'count_queries',
+    'assert_max_queries',
+    'statement_shape',
+    'MetricsRegistry',
+    'RequestMetrics',
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'metrics',
+    'RequestProfiler',
+    'StackSampler',
+    'sign_profile_token',
+    'verify_profile_token',
+    'configure_logging',
+    'JSONFormatter',
+    'SamplingFilter'
+]
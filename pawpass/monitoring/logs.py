@@ -0,0 +1,198 @@
+"""
+Asynchronous, sampled, structured logging
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+from pawpass.monitoring.metrics import metrics
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Listener of the current configuration, stopped when logging is configured again
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request fields and any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Add the method, path and endpoint of the request being handled to each record
+
+    Runs in the logging thread's producer (the request thread), since the
+    listener thread that formats records has no request context.
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            record.endpoint = request.endpoint
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Thin out high-frequency log lines per call site
+
+    Each call site (file and line) may log `burst` records per `interval`
+    seconds; beyond that only every `keep_every`-th record passes. The
+    first record of the next interval carries `sampled_out`, the number of
+    records dropped. Records above `max_level` (warnings and errors by
+    default) are never dropped.
+    """
+
+    def __init__(self, burst=20, interval=1.0, keep_every=100, max_level=logging.INFO):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.keep_every = keep_every
+        self.max_level = max_level
+        # Call site -> [window start, records in window, records dropped]
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            if window is not None and window[2]:
+                record.sampled_out = window[2]
+            self._windows[key] = [now, 1, 0]
+            return True
+
+        window[1] += 1
+        if window[1] <= self.burst or window[1] % self.keep_every == 0:
+            return True
+        window[2] += 1
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller and leaves formatting to the listener thread
+
+    The stock QueueHandler formats each record before queueing it; records
+    stay in this process, so only the message arguments are merged here.
+    When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # Tracebacks are rendered now, while the frames they point to are intact
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(levels):
+    """
+    Read per-logger levels from a dict or a "root=INFO,pawpass.ai=DEBUG" string
+
+    Returns:
+        dict: Logger name ('root' for the root logger) to level name
+    """
+    if isinstance(levels, dict):
+        return {name: str(level).upper() for name, level in levels.items()}
+    parsed = {}
+    for item in (levels or '').split(','):
+        name, separator, level = item.partition('=')
+        if separator:
+            parsed[name.strip()] = level.strip().upper()
+        elif name.strip():
+            parsed['root'] = name.strip().upper()
+    return parsed
+
+
+def configure_logging(levels='root=INFO', json_output=True, sampling=True, queue_size=10000, stream=None):
+    """
+    Send all logging through a queue to a background thread that formats and writes it
+
+    Replaces the root logger's handlers. Calling it again reconfigures
+    logging and stops the previous listener.
+
+    Args:
+        levels: Per-logger levels, as a dict or a "root=INFO,sqlalchemy.engine=WARNING" string
+        json_output: Write one JSON object per line instead of plain text
+        sampling: Thin out INFO and DEBUG lines logged many times a second from one call site
+        queue_size: Records held while the writer catches up; further records are dropped
+        stream: Where to write (default: stderr)
+
+    Returns:
+        QueueListener: The running listener
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JSONFormatter() if json_output
+                        else logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    # Sampling runs first, so dropped records cost nothing more
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    if sampling:
+        handler.addFilter(SamplingFilter())
+    handler.addFilter(RequestContextFilter())
+    metrics.gauge('pawpass_log_records_dropped', 'Log records dropped because the log queue was full').callback = \
+        lambda: handler.dropped
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+    for name, level in parse_levels(levels).items():
+        logging.getLogger(None if name == 'root' else name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, writer, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def _flush_on_exit():
+    # Writes out whatever is still queued when the process exits
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
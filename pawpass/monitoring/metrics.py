@@ -0,0 +1,313 @@
+"""
+In-process metrics in the Prometheus text format
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import Response, abort, current_app, g, request
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Request latency buckets in seconds, from cached pages to slow AI-backed requests
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base for metrics whose values are kept in per-thread shards
+
+    Each thread writes only to its own dict, so recording a value takes no
+    lock. A scrape adds the shards together; shards of threads that have
+    exited are folded into a retired total so they do not pile up.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []  # (thread, values) pairs
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _values(self):
+        """This thread's values, keyed by label values"""
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _collect(self):
+        """Copies of every live shard plus the retired total"""
+        with self._lock:
+            live = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    self._merge(self._retired, dict(values))
+            self._shards = live
+            return [dict(self._retired)] + [dict(values) for _, values in live]
+
+    @staticmethod
+    def _merge(total, values):
+        for key, value in values.items():
+            total[key] = total.get(key, 0) + value
+
+    def samples(self):
+        """(suffix, label values, extra labels, value) tuples for the exposition format"""
+        total = {}
+        for values in self._collect():
+            self._merge(total, values)
+        return [('', key, (), value) for key, value in sorted(total.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_number(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests served or errors raised"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        values = self._values()
+        key = self._key(labels)
+        values[key] = values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, either tracked with inc/dec or read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        """
+        Args:
+            callback: Optional function returning the current value, or a dict of
+                label value tuples to values, read on every scrape
+        """
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def inc(self, amount=1, **labels):
+        values = self._values()
+        key = self._key(labels)
+        values[key] = values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback is None:
+            return super().samples()
+        try:
+            current = self.callback()
+        except Exception as e:
+            logger.error(f"Could not read gauge {self.name}: {e}")
+            return []
+        if not isinstance(current, dict):
+            current = {(): current}
+        return [('', key, (), value) for key, value in sorted(current.items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (usually durations in seconds) in cumulative buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        values = self._values()
+        key = self._key(labels)
+        state = values.get(key)
+        if state is None:
+            # Per-bucket counts (the last one is +Inf), then the sum
+            state = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes, in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    @staticmethod
+    def _merge(total, values):
+        for key, state in values.items():
+            state = list(state)
+            if key in total:
+                total[key] = [a + b for a, b in zip(total[key], state)]
+            else:
+                total[key] = state
+
+    def samples(self):
+        total = {}
+        for values in self._collect():
+            self._merge(total, values)
+
+        samples = []
+        bounds = self.buckets + (float('inf'),)
+        for key, state in sorted(total.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                samples.append(('_bucket', key, (('le', _format_number(float(bound))),), cumulative))
+            samples.append(('_sum', key, (), state[-1]))
+            samples.append(('_count', key, (), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Named metrics rendered together for a scrape"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Get or create a counter"""
+        return self._add(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        """Get or create a gauge"""
+        return self._add(Gauge, name, documentation, labelnames, callback=callback)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram"""
+        return self._add(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# Registry shared by the whole process
+metrics = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Per-endpoint request latency, counts and in-flight requests, plus a /metrics endpoint
+
+    Endpoints are labelled with their Flask endpoint name (blueprint routes
+    included), so the label set stays small however many pets there are.
+
+    Configuration (app.config):
+        METRICS_TOKEN: If set, /metrics requires an `Authorization: Bearer <token>` header
+    """
+
+    def __init__(self, app=None, db=None, registry=metrics):
+        self.registry = registry
+        self.request_seconds = registry.histogram(
+            'pawpass_http_request_duration_seconds', 'Time to handle a request', ['endpoint', 'method'])
+        self.requests = registry.counter(
+            'pawpass_http_requests_total', 'Requests handled, by response status', ['endpoint', 'method', 'status'])
+        self.in_flight = registry.gauge('pawpass_http_requests_in_flight', 'Requests being handled right now')
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        """
+        Wrap the app's requests and add the /metrics endpoint
+
+        Args:
+            app: Flask application
+            db: Optional Flask-SQLAlchemy instance whose connection pool is reported
+        """
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._end_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+        if db is not None:
+            with app.app_context():
+                engine = db.engine
+            self.registry.gauge('pawpass_db_pool_connections', 'Database connections in the pool, by state',
+                                ['state'], callback=lambda: _pool_connections(engine.pool))
+            self.registry.gauge('pawpass_db_pool_size', 'Configured size of the database connection pool',
+                                callback=lambda: _pool_size(engine.pool))
+
+    def _start_request(self):
+        if request.endpoint == 'metrics':
+            return
+        g.metrics_started = time.perf_counter()
+        g.metrics_in_flight = True
+        self.in_flight.inc()
+
+    def _finish_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            self.request_seconds.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+            self.requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        return response
+
+    def _end_request(self, exc):
+        if g.pop('metrics_in_flight', False):
+            self.in_flight.dec()
+
+    def _metrics_view(self):
+        token = current_app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            abort(401)
+        return Response(self.registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _pool_connections(pool):
+    """Connections by state, for pools that track them (SQLite's and Postgres's default QueuePool)"""
+    states = {}
+    for state, method in (('checked_in', 'checkedin'), ('checked_out', 'checkedout'), ('overflow', 'overflow')):
+        if hasattr(pool, method):
+            # QueuePool counts overflow from -pool_size; only connections beyond the pool matter here
+            states[(state,)] = max(getattr(pool, method)(), 0)
+    return states
+
+
+def _pool_size(pool):
+    return pool.size() if hasattr(pool, 'size') else 0
@@ -0,0 +1,245 @@
+"""
+On-demand profiling of single requests, gated by signed tokens
+"""
+import cProfile
+import hashlib
+import hmac
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import Response, current_app, g, request
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Frames that mark time spent in SQL, template rendering and AI calls, matched
+# against "function (path)" frame labels
+CATEGORY_MARKERS = {
+    'sql': ('do_execute (sqlalchemy/engine/default.py', 'do_executemany (sqlalchemy/engine/default.py'),
+    'template': ('render (jinja2/environment.py',),
+    'ai': ('process_text (pawpass/ai/pet_ai.py',),
+}
+
+
+def sign_profile_token(secret, path, expires_in=600):
+    """
+    Create a token that lets its holder profile requests to one path until it expires
+
+    Args:
+        secret: The PROFILING_SECRET shared with the app
+        path: Request path the token is valid for, e.g. '/pet/12'
+        expires_in: Seconds until the token expires
+
+    Returns:
+        str: '<expiry timestamp>.<hex HMAC-SHA256 signature>'
+    """
+    expires = int(time.time()) + expires_in
+    signature = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_profile_token(secret, path, token):
+    """
+    Check a token made by sign_profile_token for this path
+
+    Returns:
+        bool: True if the signature matches and the token has not expired
+    """
+    expires, _, signature = (token or '').partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _frame_label(code):
+    """'function (package/module.py:line)', with site-packages and project prefixes dropped"""
+    filename = code.co_filename.replace(os.sep, '/')
+    for marker in ('/site-packages/', '/dist-packages/', '/lib/python'):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    else:
+        filename = os.path.relpath(code.co_filename).replace(os.sep, '/')
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's call stack at a fixed interval from a background thread
+
+    The samples are kept as folded stacks ("outer;inner;leaf count" lines),
+    the input format of flamegraph.pl, speedscope and most flame graph viewers.
+    """
+
+    def __init__(self, interval=0.002):
+        """
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        """Start sampling a thread (by default the calling thread)"""
+        target = thread_id or threading.get_ident()
+        self._thread = threading.Thread(target=self._run, args=(target,), name='pawpass-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, target):
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        """The samples as folded stack lines"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def breakdown(self):
+        """Share of samples spent in SQL, template rendering and AI calls"""
+        total = sum(self.stacks.values()) or 1
+        shares = {}
+        for category, markers in CATEGORY_MARKERS.items():
+            hits = sum(count for stack, count in self.stacks.items() if any(marker in stack for marker in markers))
+            shares[category] = hits / total
+        return shares
+
+
+class RequestProfiler:
+    """Profile individual requests on demand
+
+    A request is profiled when it carries a valid token from
+    sign_profile_token() for its path, in the X-Profile header or the
+    _profile query parameter. Nothing is profiled (and the hooks return
+    immediately) unless PROFILING_SECRET is set.
+
+    The profile is written to PROFILE_DIR and named in the X-Profile-File
+    response header; send X-Profile-Output: response (or _profile_output=response)
+    to get the profile back instead of the page. X-Profile-Mode: cprofile
+    (or _profile_mode=cprofile) uses cProfile and writes a .prof file instead
+    of sampled folded stacks.
+
+    Configuration (app.config):
+        PROFILING_SECRET: Key for signing profile tokens; profiling is off without it
+        PROFILE_DIR: Where profiles are written (default: <instance path>/profiles)
+        PROFILE_SAMPLE_INTERVAL: Seconds between stack samples (default 0.002)
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the request hooks"""
+        app.config.setdefault('PROFILING_SECRET', None)
+        app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        app.config.setdefault('PROFILE_SAMPLE_INTERVAL', 0.002)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._end_request)
+
+    @staticmethod
+    def _option(header, parameter):
+        return request.headers.get(header) or request.args.get(parameter)
+
+    def _start_request(self):
+        secret = current_app.config['PROFILING_SECRET']
+        token = self._option('X-Profile', '_profile')
+        if not secret or not token:
+            return
+        if not verify_profile_token(secret, request.path, token):
+            logger.warning(f"Rejected profiling token for {request.path}")
+            return
+
+        profiler = None
+        if (self._option('X-Profile-Mode', '_profile_mode') or '').lower() == 'cprofile':
+            try:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            except ValueError as e:
+                # Only one cProfile can run per process; sample this request instead
+                logger.warning(f"Could not start cProfile, sampling instead: {e}")
+                profiler = None
+        if profiler is None:
+            profiler = StackSampler(current_app.config['PROFILE_SAMPLE_INTERVAL'])
+            profiler.start()
+        g.profiler = profiler
+        g.profile_started = time.perf_counter()
+
+    def _stop(self):
+        profiler = g.pop('profiler', None)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        elif profiler is not None:
+            profiler.stop()
+        return profiler
+
+    def _finish_request(self, response):
+        profiler = self._stop()
+        if profiler is None:
+            return response
+
+        seconds = time.perf_counter() - g.pop('profile_started')
+        path = self._save(profiler)
+        logger.info(f"Profiled {request.method} {request.path} ({seconds * 1000:.0f} ms) to {path}")
+
+        if (self._option('X-Profile-Output', '_profile_output') or '').lower() == 'response':
+            response = Response(self._report(profiler), mimetype='text/plain')
+        response.headers['X-Profile-File'] = os.path.basename(path)
+        response.headers['X-Profile-Time-ms'] = f"{seconds * 1000:.1f}"
+        if isinstance(profiler, StackSampler):
+            response.headers['X-Profile-Breakdown'] = ', '.join(
+                f"{category}={share:.0%}" for category, share in profiler.breakdown().items())
+        return response
+
+    def _end_request(self, exc):
+        # Stops a profiler left running when the request failed before after_request
+        self._stop()
+
+    def _save(self, profiler):
+        """Write the profile to PROFILE_DIR and return its path"""
+        directory = current_app.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.endpoint or 'unmatched'}"
+        if isinstance(profiler, cProfile.Profile):
+            path = os.path.join(directory, f"{name}.prof")
+            profiler.dump_stats(path)
+        else:
+            path = os.path.join(directory, f"{name}.folded")
+            with open(path, 'w') as f:
+                f.write(profiler.folded())
+        return path
+
+    @staticmethod
+    def _report(profiler):
+        """The profile as text: folded stacks, or the top cProfile entries by cumulative time"""
+        if isinstance(profiler, StackSampler):
+            return profiler.folded()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(60)
+        return output.getvalue()
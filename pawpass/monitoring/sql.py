@@ -0,0 +1,211 @@
+"""
+Per-request SQL instrumentation and N+1 query detection
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Literals and expanded IN lists vary between executions of the same query
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETER = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_PARAMETER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)' % (_PARAMETER, _PARAMETER))
+_WHITESPACE = re.compile(r'\s+')
+
+# QueryStats of the request being handled; a context variable rather than
+# flask.g because views push their own app contexts
+_request_stats = ContextVar('pawpass_sql_stats', default=None)
+
+
+def statement_shape(statement):
+    """
+    Reduce a SQL statement to its shape, so the same query run in a loop compares equal
+
+    Args:
+        statement: SQL text as sent to the database driver
+
+    Returns:
+        str: The statement with literals, parameter lists and whitespace normalized
+    """
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PARAMETER_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryStats:
+    """SQL statements issued while handling one request or running one block of code"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, seconds):
+        """Add one executed statement and the time it took"""
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold=2):
+        """
+        Statement shapes run at least threshold times, most repeated first
+
+        Args:
+            threshold: Minimum number of executions
+
+        Returns:
+            list: (shape, count) pairs
+        """
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def summary(self, limit=3):
+        """One line per repeated statement shape, for log and assertion messages"""
+        return '\n'.join(f"  {count}x {shape[:200]}" for shape, count in self.repeated()[:limit])
+
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own execution context rather than the connection: a
+    # statement that raises never reaches after_cursor_execute, and its context is
+    # dropped with it instead of leaving a start time behind on a pooled connection
+    if context is not None:
+        context.pawpass_sql_started = time.perf_counter()
+
+
+def _stop_timer(context):
+    started = getattr(context, 'pawpass_sql_started', None)
+    return time.perf_counter() - started if started is not None else 0.0
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the SQL statements run on any engine inside the block
+
+    Yields:
+        QueryStats: Filled in as statements run
+    """
+    stats = QueryStats()
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        _start_timer(conn, cursor, statement, parameters, context, executemany)
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        stats.record(statement, _stop_timer(context))
+
+    event.listen(Engine, 'before_cursor_execute', before)
+    event.listen(Engine, 'after_cursor_execute', after)
+    try:
+        yield stats
+    finally:
+        event.remove(Engine, 'after_cursor_execute', after)
+        event.remove(Engine, 'before_cursor_execute', before)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail if the block runs more than limit SQL statements
+
+    Args:
+        limit: Maximum number of statements allowed
+
+    Raises:
+        AssertionError: Naming the count and the most repeated statements
+    """
+    with count_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        raise AssertionError(f"Expected at most {limit} SQL statements, ran {stats.count}"
+                             + (f"; repeated:\n{stats.summary()}" if stats.repeated() else ""))
+
+
+class SQLInstrumentation:
+    """Count and time the SQL each request sends, and flag likely N+1 loops
+
+    Per-request totals are added as X-SQL-* response headers when enabled
+    (by default only in debug mode). Requests that run more statements,
+    spend longer in SQL, or repeat one statement shape more often than the
+    configured thresholds are logged as warnings with the repeated shapes.
+
+    Configuration (app.config):
+        SQL_INSTRUMENTATION_HEADERS: Add the response headers (default None: only in debug mode)
+        SQL_SLOW_REQUEST_QUERIES: Log requests running more statements than this (default 30)
+        SQL_SLOW_REQUEST_MS: Log requests spending longer than this in SQL (default 250)
+        SQL_REPEATED_STATEMENT_THRESHOLD: Log statement shapes repeated this often (default 10)
+    """
+
+    def __init__(self, app=None, db=None):
+        if app is not None and db is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        """
+        Time the statements on the app's engine and wrap its requests
+
+        Args:
+            app: Flask application
+            db: Flask-SQLAlchemy instance bound to the app
+        """
+        app.config.setdefault('SQL_INSTRUMENTATION_HEADERS', None)
+        app.config.setdefault('SQL_SLOW_REQUEST_QUERIES', 30)
+        app.config.setdefault('SQL_SLOW_REQUEST_MS', 250)
+        app.config.setdefault('SQL_REPEATED_STATEMENT_THRESHOLD', 10)
+
+        # Creating the engine does not connect, so this is safe at import time
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', _start_timer)
+        event.listen(engine, 'after_cursor_execute', self._record)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._end_request)
+
+    @staticmethod
+    def current():
+        """The QueryStats of the request being handled, or None outside a request"""
+        return _request_stats.get()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = _stop_timer(context)
+        stats = self.current()
+        if stats is not None:
+            stats.record(statement, seconds)
+
+    def _start_request(self):
+        _request_stats.set(QueryStats())
+
+    def _end_request(self, exc):
+        _request_stats.set(None)
+
+    def _finish_request(self, response):
+        stats = _request_stats.get()
+        if stats is None:
+            return response
+
+        config = current_app.config
+        repeated = stats.repeated(config['SQL_REPEATED_STATEMENT_THRESHOLD'])
+        headers = config['SQL_INSTRUMENTATION_HEADERS']
+        if headers or (headers is None and current_app.debug):
+            response.headers['X-SQL-Queries'] = str(stats.count)
+            response.headers['X-SQL-Time-ms'] = f"{stats.seconds * 1000:.1f}"
+            response.headers['X-SQL-Repeated'] = str(len(repeated))
+
+        if repeated or stats.count > config['SQL_SLOW_REQUEST_QUERIES'] \
+                or stats.seconds * 1000 > config['SQL_SLOW_REQUEST_MS']:
+            logger.warning(f"{request.method} {request.path} ({request.endpoint}) ran {stats.count} SQL statements "
+                           f"in {stats.seconds * 1000:.1f} ms")
+            for shape, count in repeated[:3]:
+                logger.warning(f"  repeated {count}x: {shape[:200]}")
+        return response
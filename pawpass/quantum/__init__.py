@@ -5,22 +5,32 @@ from pawpass.quantum.quantum_service import (
     QuantumService,
     QuantumProvider
 )
+from pawpass.registry import services
 
-# Create a singleton instance of the quantum service
-quantum_service = QuantumService()
+# The quantum service is created on first use
+services.register('quantum', QuantumService)
+
+# Importing the submodule bound its name here; drop it so quantum_service resolves to the service
+del quantum_service
+
+def __getattr__(name):
+    # Keeps `from pawpass.quantum import quantum_service` working without building it at import
+    if name == 'quantum_service':
+        return services.get('quantum')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Export functions that use the singleton
 def quantum_optimize(resource_type, constraints=None):
     """Optimize resource allocation using quantum algorithms"""
-    return quantum_service.quantum_optimize(resource_type, constraints)
+    return services.get('quantum').quantum_optimize(resource_type, constraints)
 
 def quantum_encrypt(data, security_level="standard"):
     """Encrypt data using quantum-resistant methods"""
-    return quantum_service.quantum_encrypt(data, security_level)
+    return services.get('quantum').quantum_encrypt(data, security_level)
 
 def quantum_simulate(simulation_type, **kwargs):
     """Simulate complex systems using quantum algorithms"""
-    return quantum_service.quantum_simulate(simulation_type, **kwargs)
+    return services.get('quantum').quantum_simulate(simulation_type, **kwargs)
 
 __all__ = [
     'QuantumService',
@@ -29,4 +39,4 @@ __all__ = [
     'quantum_optimize',
     'quantum_encrypt',
     'quantum_simulate'
-]
\ No newline at end of file
+]
@@ -0,0 +1,73 @@
+"""
+Lazily constructed shared services for PawPass
+"""
+import logging
+import threading
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Named singletons built on first use
+
+    Subsystems register a factory when their package is imported; the
+    factory (and whatever heavy libraries it imports) only runs the first
+    time a request actually asks for the service.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        """
+        Register a factory for a service
+
+        Args:
+            name: Service name, e.g. 'ai' or 'encryption'
+            factory: Callable taking no arguments that builds the service
+        """
+        self._factories[name] = factory
+
+    def get(self, name):
+        """
+        Return the service, building it on first use
+
+        Args:
+            name: Registered service name
+
+        Returns:
+            The shared service instance
+
+        Raises:
+            KeyError: If no factory is registered under the name
+        """
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name not in self._instances:
+                factory = self._factories[name]
+                self._instances[name] = factory()
+                logger.info(f"Loaded service: {name}")
+            return self._instances[name]
+
+    def loaded(self):
+        """Names of the services built so far"""
+        return sorted(self._instances)
+
+    def reset(self, name=None):
+        """Drop one built service (or all of them) so the next get() rebuilds it"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+# Registry shared by the whole process
+services = ServiceRegistry()
@@ -0,0 +1,10 @@
+"""
+Search module for PawPass
+"""
+from pawpass.search.fulltext import FullTextIndex
+from pawpass.search.autocomplete import PetNameAutocomplete
+
+__all__ = [
+    'FullTextIndex',
+    'PetNameAutocomplete'
+]
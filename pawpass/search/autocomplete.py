@@ -0,0 +1,273 @@
+"""
+Typo-tolerant autocomplete for pet names and breeds
+"""
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import Counter
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+def normalize(text):
+    """Lowercase text for matching"""
+    return (text or '').strip().casefold()
+
+
+def trigrams(term):
+    """Trigrams of a term, padded so that its first letters carry extra weight"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    """A node of the prefix trie; terms ending here are stored on the node"""
+    __slots__ = ('children', 'term')
+
+    def __init__(self):
+        self.children = {}
+        self.term = None
+
+
+class PetNameAutocomplete:
+    """In-memory prefix trie plus trigram index over pet names and breeds
+
+    Every word of a pet's name and breed (and the full name) is a term in
+    the trie. Prefix matches answer most keystrokes; when they run short the
+    trigram index finds near misses such as "bela" for "Bella".
+    """
+
+    def __init__(self, loader, version=None, refresh_interval=60, min_similarity=0.3):
+        """
+        Initialize the autocomplete index
+
+        Args:
+            loader: Callable returning (id, name, breed, species) rows for every pet
+            version: Optional callable returning a value that changes whenever pets change;
+                checked every refresh_interval seconds to pick up writes from other workers
+            refresh_interval: Seconds between version checks
+            min_similarity: Minimum trigram similarity for a fuzzy match
+        """
+        self.loader = loader
+        self.version = version
+        self.refresh_interval = refresh_interval
+        self.min_similarity = min_similarity
+
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = None
+        self._checked_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        self._root = _TrieNode()
+        self._pets = {}  # pet_id -> (name, breed, species)
+        self._pet_terms = {}  # pet_id -> terms indexed for the pet
+        self._terms = {}  # term -> pet IDs, as an insertion-ordered dict
+        self._term_trigrams = {}  # term -> trigram set
+        self._postings = {}  # trigram -> set of terms
+
+    def rebuild(self):
+        """Load every pet and rebuild the index from scratch"""
+        rows = self.loader()
+        with self._lock:
+            self._reset()
+            for pet_id, name, breed, species in rows:
+                self._add(pet_id, name, breed, species)
+            self._built = True
+            self._version = self.version() if self.version else None
+            self._checked_at = time.monotonic()
+        logger.info(f"Built autocomplete index for {len(self._pets)} pets")
+
+    def add(self, pet):
+        """Index a newly added pet"""
+        with self._lock:
+            if self._built:
+                self._add(pet.id, pet.name, pet.breed, pet.species)
+
+    def update(self, pet):
+        """Re-index a pet after its name or breed changed"""
+        with self._lock:
+            if self._built:
+                self._remove(pet.id)
+                self._add(pet.id, pet.name, pet.breed, pet.species)
+
+    def remove(self, pet_id):
+        """Drop a deleted pet from the index"""
+        with self._lock:
+            if self._built:
+                self._remove(pet_id)
+
+    def suggest(self, query, limit=10):
+        """
+        Suggest pets for a partially typed name or breed
+
+        Args:
+            query: Text typed so far
+            limit: Maximum number of suggestions
+
+        Returns:
+            list: Dictionaries with id, name, breed and species, best match first
+        """
+        self._ensure_fresh()
+        words = normalize(query).split()
+        if not words:
+            return []
+
+        with self._lock:
+            ranked = self._prefix_matches(words, limit)
+            if len(ranked) < limit and len(words) == 1 and len(words[0]) >= 3:
+                for pet_id in self._fuzzy_matches(words[0], limit):
+                    if pet_id not in ranked:
+                        ranked.append(pet_id)
+                    if len(ranked) >= limit:
+                        break
+
+            suggestions = []
+            for pet_id in ranked[:limit]:
+                name, breed, species = self._pets[pet_id]
+                suggestions.append({"id": pet_id, "name": name, "breed": breed, "species": species})
+            return suggestions
+
+    def _ensure_fresh(self):
+        """Build on first use, then rebuild if another worker changed the pets"""
+        if not self._built:
+            self.rebuild()
+            return
+
+        if self.version and time.monotonic() - self._checked_at >= self.refresh_interval:
+            self._checked_at = time.monotonic()
+            if self.version() != self._version:
+                self.rebuild()
+
+    def _terms_for(self, name, breed):
+        terms = set(normalize(name).split()) | set(normalize(breed).split())
+        if normalize(name):
+            terms.add(normalize(name))
+        return terms
+
+    def _add(self, pet_id, name, breed, species):
+        terms = self._terms_for(name, breed)
+        self._pets[pet_id] = (name, breed, species)
+        self._pet_terms[pet_id] = terms
+        for term in terms:
+            pet_ids = self._terms.get(term)
+            if pet_ids is None:
+                pet_ids = self._terms[term] = {}
+                self._insert_term(term)
+            pet_ids[pet_id] = None
+
+    def _remove(self, pet_id):
+        if self._pets.pop(pet_id, None) is None:
+            return
+
+        for term in self._pet_terms.pop(pet_id):
+            pet_ids = self._terms.get(term)
+            if pet_ids is None:
+                continue
+            pet_ids.pop(pet_id, None)
+            if not pet_ids:
+                del self._terms[term]
+                self._delete_term(term)
+
+    def _insert_term(self, term):
+        node = self._root
+        for char in term:
+            node = node.children.setdefault(char, _TrieNode())
+        node.term = term
+
+        term_trigrams = trigrams(term)
+        self._term_trigrams[term] = term_trigrams
+        for trigram in term_trigrams:
+            self._postings.setdefault(trigram, set()).add(term)
+
+    def _delete_term(self, term):
+        # Walk down recording the path, then prune nodes left empty
+        path = [self._root]
+        for char in term:
+            node = path[-1].children.get(char)
+            if node is None:
+                break
+            path.append(node)
+        else:
+            path[-1].term = None
+            for depth in range(len(term), 0, -1):
+                node = path[depth]
+                if node.term is not None or node.children:
+                    break
+                del path[depth - 1].children[term[depth - 1]]
+
+        for trigram in self._term_trigrams.pop(term, ()):
+            terms = self._postings.get(trigram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._postings[trigram]
+
+    def _prefix_matches(self, words, limit):
+        """Pets with a term starting with the last word, filtered by the earlier words"""
+        prefix = words[-1]
+        if len(words) > 1:
+            # Walk the pets matching the earlier words, smallest set first
+            required = sorted((self._terms.get(word, {}) for word in words[:-1]), key=len)
+            ranked = []
+            for pet_id in required[0]:
+                if all(pet_id in pet_ids for pet_ids in required[1:]) \
+                        and any(term.startswith(prefix) for term in self._pet_terms[pet_id]):
+                    ranked.append(pet_id)
+                    if len(ranked) >= limit:
+                        break
+            return ranked
+
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        ranked = {}
+        # Breadth-first walk, so shorter (closer) completions come first
+        level = [node]
+        while level:
+            next_level = []
+            for current in level:
+                if current.term is not None:
+                    for pet_id in self._terms[current.term]:
+                        ranked.setdefault(pet_id, None)
+                        if len(ranked) >= limit:
+                            return list(ranked)
+                for char in sorted(current.children):
+                    next_level.append(current.children[char])
+            level = next_level
+        return list(ranked)
+
+    def _fuzzy_matches(self, word, limit):
+        """Pets whose terms share enough trigrams with a possibly misspelled word"""
+        query_trigrams = trigrams(word)
+
+        # A term reaching min_similarity shares at least min_shared trigrams
+        # with the query, which rules out most terms before scoring them
+        min_shared = max(1, math.ceil(self.min_similarity * len(query_trigrams)))
+        overlap = Counter()
+        for trigram in query_trigrams:
+            overlap.update(self._postings.get(trigram, ()))
+
+        scored = []
+        for term, shared in overlap.items():
+            if shared < min_shared:
+                continue
+            similarity = shared / (len(query_trigrams) + len(self._term_trigrams[term]) - shared)
+            if similarity >= self.min_similarity:
+                scored.append((similarity, term))
+
+        # Every term carries at least one pet, so the best `limit` terms are enough
+        ranked = {}
+        for _, term in heapq.nsmallest(limit, scored, key=lambda match: (-match[0], match[1])):
+            for pet_id in self._terms[term]:
+                ranked.setdefault(pet_id, None)
+                if len(ranked) >= limit:
+                    return list(ranked)
+        return list(ranked)
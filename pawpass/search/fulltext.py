@@ -0,0 +1,237 @@
+"""
+Full-text search over pets and their care updates
+"""
+import logging
+import re
+
+from sqlalchemy import event, text, literal, Integer, Float
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Words (including partial words at the end of a query) that make up a search
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_SCHEMA = [
+    # External-content FTS5 table: the text lives in search_documents and the
+    # triggers below keep the index in step with it
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5(
+        body, content='search_documents', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, body) VALUES ('delete', old.id, old.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, body) VALUES ('delete', old.id, old.body);
+        INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+]
+
+POSTGRES_SCHEMA = [
+    """ALTER TABLE search_documents ADD COLUMN IF NOT EXISTS body_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', body)) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_body_tsv ON search_documents USING GIN (body_tsv)",
+]
+
+# Matching documents with a score where lower is better
+SQLITE_MATCHES = """
+    SELECT rowid AS document_id, rank AS score
+    FROM search_documents_fts
+    WHERE search_documents_fts MATCH :query
+    ORDER BY rank
+"""
+
+POSTGRES_MATCHES = """
+    SELECT id AS document_id, -ts_rank(body_tsv, to_tsquery('english', :query)) AS score
+    FROM search_documents
+    WHERE body_tsv @@ to_tsquery('english', :query)
+"""
+
+
+class FullTextIndex:
+    """Full-text index of pet profiles and care updates
+
+    Uses SQLite FTS5 or a PostgreSQL tsvector/GIN index depending on the
+    database, and falls back to a LIKE scan on anything else. The index is
+    kept in sync from ORM flushes, inside the same transaction as the write.
+    """
+    
+    def __init__(self, db, document_model):
+        """
+        Initialize the index
+        
+        Args:
+            db: Flask-SQLAlchemy instance
+            document_model: The SearchDocument model holding indexed text
+        """
+        self.db = db
+        self.document_model = document_model
+        self.pet_model = None
+        self.update_model = None
+    
+    def watch(self, pet_model, update_model):
+        """Keep the index in sync with inserts, updates and deletes of pets and their updates"""
+        self.pet_model = pet_model
+        self.update_model = update_model
+        
+        event.listen(pet_model, 'after_insert', self._index_pet)
+        event.listen(pet_model, 'after_update', self._index_pet)
+        event.listen(pet_model, 'after_delete', self._remove_pet)
+        event.listen(update_model, 'after_insert', self._index_update)
+        event.listen(update_model, 'after_update', self._index_update)
+        event.listen(update_model, 'after_delete', self._remove_update)
+    
+    def create_schema(self):
+        """Create the dialect-specific index structures and backfill them if needed"""
+        engine = self.db.engine
+        statements = {'sqlite': SQLITE_SCHEMA, 'postgresql': POSTGRES_SCHEMA}.get(engine.dialect.name, [])
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+        
+        if self.pet_model is not None and self.document_model.query.first() is None \
+                and self.pet_model.query.first() is not None:
+            self.rebuild()
+    
+    def rebuild(self):
+        """Rebuild every search document from the pets and updates tables"""
+        documents = self.document_model.__table__
+        with self.db.engine.begin() as connection:
+            connection.execute(documents.delete())
+            for statement in self._document_inserts():
+                connection.execute(statement)
+        logger.info("Rebuilt the full-text search index")
+    
+    def index_pets(self, pet_ids):
+        """
+        Add search documents for pets (and their updates) written with bulk inserts
+        
+        Bulk inserts bypass the ORM events, so bulk loaders call this in the
+        same session transaction as the rows it indexes.
+        
+        Args:
+            pet_ids: IDs of newly inserted pets
+        """
+        if pet_ids:
+            for statement in self._document_inserts(pet_ids):
+                self.db.session.execute(statement)
+    
+    def _document_inserts(self, pet_ids=None):
+        """INSERT ... SELECT statements copying pet and update text into search documents"""
+        documents = self.document_model.__table__
+        pets = self.pet_model.__table__
+        updates = self.update_model.__table__
+        
+        pet_body = pets.c.name
+        for column in (pets.c.species, pets.c.breed, pets.c.description, pets.c.medical_notes):
+            pet_body = pet_body + ' ' + self.db.func.coalesce(column, '')
+        
+        pet_documents = self.db.select(pets.c.id, literal('pet'), pets.c.id, pet_body)
+        update_documents = self.db.select(updates.c.pet_id, literal('update'), updates.c.id, updates.c.update_text)
+        if pet_ids is not None:
+            pet_documents = pet_documents.where(pets.c.id.in_(pet_ids))
+            update_documents = update_documents.where(updates.c.pet_id.in_(pet_ids))
+        
+        columns = ['pet_id', 'kind', 'ref_id', 'body']
+        return [
+            documents.insert().from_select(columns, pet_documents),
+            documents.insert().from_select(columns, update_documents),
+        ]
+    
+    def matches(self, query):
+        """
+        Build a subquery of the documents matching a search
+        
+        Args:
+            query: Free text typed by the user
+            
+        Returns:
+            Subquery with document_id and score (lower is better) columns,
+            or None if the query has no searchable words
+        """
+        tokens = TOKEN_PATTERN.findall(query.lower())
+        if not tokens:
+            return None
+        
+        dialect = self.db.engine.dialect.name
+        if dialect == 'sqlite':
+            # Quote each word so user input is never parsed as FTS syntax,
+            # and let the last one match as a prefix
+            fts_query = ' '.join(f'"{token}"' for token in tokens) + '*'
+            statement = text(SQLITE_MATCHES).bindparams(query=fts_query)
+        elif dialect == 'postgresql':
+            statement = text(POSTGRES_MATCHES).bindparams(query=' & '.join(tokens) + ':*')
+        else:
+            documents = self.document_model.__table__
+            return self.db.select(documents.c.id.label('document_id'), literal(0).label('score'))\
+                .where(*[documents.c.body.ilike(f'%{token}%') for token in tokens]).subquery('matches')
+        return statement.columns(document_id=Integer, score=Float).subquery('matches')
+    
+    def matching_pet_ids(self, query):
+        """Select the IDs of every pet matching a search, for use in IN filters"""
+        matches = self.matches(query)
+        if matches is None:
+            return None
+        documents = self.document_model.__table__
+        return self.db.select(documents.c.pet_id)\
+            .join(matches, matches.c.document_id == documents.c.id)\
+            .distinct()
+    
+    def search(self, query, limit=50, offset=0, restrict_to=None):
+        """
+        Search pets by profile and update text
+        
+        Args:
+            query: Free text typed by the user
+            limit: Maximum number of pets to return
+            offset: Number of ranked results to skip
+            restrict_to: Optional select of pet IDs the results must come from
+            
+        Returns:
+            list: Matching pet IDs, best match first
+        """
+        matches = self.matches(query)
+        if matches is None:
+            return []
+        
+        documents = self.document_model.__table__
+        score = self.db.func.min(matches.c.score).label('score')
+        statement = self.db.select(documents.c.pet_id, score)\
+            .join(matches, matches.c.document_id == documents.c.id)
+        if restrict_to is not None:
+            statement = statement.where(documents.c.pet_id.in_(restrict_to))
+        statement = statement.group_by(documents.c.pet_id)\
+            .order_by(score, documents.c.pet_id)\
+            .limit(limit).offset(offset)
+        return [row[0] for row in self.db.session.execute(statement)]
+    
+    @staticmethod
+    def _pet_body(pet):
+        """Text indexed for a pet's profile"""
+        fields = (pet.name, pet.species, pet.breed, pet.description, pet.medical_notes)
+        return ' '.join(field for field in fields if field)
+    
+    def _upsert(self, connection, pet_id, kind, ref_id, body):
+        """Replace the search document for one pet or update"""
+        documents = self.document_model.__table__
+        connection.execute(documents.delete().where(documents.c.kind == kind, documents.c.ref_id == ref_id))
+        connection.execute(documents.insert().values(pet_id=pet_id, kind=kind, ref_id=ref_id, body=body))
+    
+    def _index_pet(self, mapper, connection, pet):
+        self._upsert(connection, pet.id, 'pet', pet.id, self._pet_body(pet))
+    
+    def _remove_pet(self, mapper, connection, pet):
+        # Drops the profile and every update of the pet, including updates
+        # removed with bulk query deletes that bypass the ORM events
+        documents = self.document_model.__table__
+        connection.execute(documents.delete().where(documents.c.pet_id == pet.id))
+    
+    def _index_update(self, mapper, connection, update):
+        self._upsert(connection, update.pet_id, 'update', update.id, update.update_text)
+    
+    def _remove_update(self, mapper, connection, update):
+        documents = self.document_model.__table__
+        connection.execute(documents.delete().where(documents.c.kind == 'update', documents.c.ref_id == update.id))
@@ -0,0 +1,147 @@
+"""
+Named counters that never hand out the same value twice
+"""
+import logging
+
+from sqlalchemy import case, event, select
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class MonotonicCounter:
+    """A counter kept in one row of the SequenceCounter table
+
+    Values are taken by raising the row's value inside the writing
+    transaction, so they commit or roll back with the write. Deletes never
+    lower it, unlike max(column) + 1 over rows that can be deleted. The
+    UPDATE locks the row until the transaction ends, so on a database with
+    concurrent writers (PostgreSQL) a second writer waits for the first to
+    commit: values are never handed out twice and are handed out in commit
+    order, which a database sequence does not guarantee. On SQLite writes
+    are serialized anyway.
+
+    Every writer of the app waits on the same row, so writers take values
+    through a CommitQueue: the lock is then held only for the statements
+    that use them and the COMMIT, not for the whole transaction.
+    """
+
+    def __init__(self, db, counter_model, name, seed=None):
+        """
+        Initialize the counter
+
+        Args:
+            db: Flask-SQLAlchemy instance
+            counter_model: The SequenceCounter model
+            name: Name of this counter's row
+            seed: Optional scalar SELECT of the highest value already in use, read
+                when the row is created so a database that predates it carries on
+        """
+        self.db = db
+        self.table = counter_model.__table__
+        self.name = name
+        self.seed = seed
+
+    def advance(self, connection, count=1):
+        """
+        Raise the counter and lock it until the transaction ends
+
+        Args:
+            connection: Connection or session of the writing transaction
+            count: Number of values to take; 0 only locks the counter and reads it
+
+        Returns:
+            int: The new value; the values taken are value - count + 1 .. value
+        """
+        table = self.table
+        statement = table.update().where(table.c.name == self.name)\
+            .values(value=table.c.value + count).returning(table.c.value)
+        value = connection.execute(statement).scalar()
+        if value is None:
+            self._create(connection)
+            value = connection.execute(statement).scalar()
+        return value
+
+    def raise_to(self, connection, value):
+        """
+        Raise the counter to a value, leaving it alone if it is already there or above
+
+        Args:
+            connection: Connection or session of the writing transaction
+            value: Lowest value the counter should hold
+
+        Returns:
+            int: The counter's value
+        """
+        table = self.table
+        statement = table.update().where(table.c.name == self.name)\
+            .values(value=case((table.c.value < value, value), else_=table.c.value)).returning(table.c.value)
+        result = connection.execute(statement).scalar()
+        if result is None:
+            self._create(connection)
+            result = connection.execute(statement).scalar()
+        return result
+
+    def current(self, connection=None):
+        """
+        Get the last value handed out
+
+        Returns:
+            int: The value, or 0 if none has been
+        """
+        table = self.table
+        value = (connection or self.db.session).execute(
+            select(table.c.value).where(table.c.name == self.name)).scalar()
+        return value or 0
+
+    def create(self):
+        """Create the counter's row if it is missing, starting from the seed"""
+        with self.db.engine.begin() as connection:
+            if connection.execute(select(self.table.c.name).where(self.table.c.name == self.name)).first() is None:
+                self._create(connection)
+
+    def _create(self, connection):
+        start = (connection.execute(self.seed).scalar() or 0) if self.seed is not None else 0
+        connection.execute(self.table.insert().values(name=self.name, value=start))
+        logger.info(f"Created counter {self.name} at {start}")
+
+
+class CommitQueue:
+    """Work that ORM writes leave for the end of their session transaction
+
+    Writers add items while the session flushes; just before the session
+    commits, it flushes what is still pending and hands the transaction's
+    items to the runner on the session's connection. Taking a
+    MonotonicCounter's values there keeps its row locked only from then to
+    the COMMIT. Items of a transaction that rolls back, or is closed
+    without committing, are dropped with it.
+    """
+
+    def __init__(self, db, name, run):
+        """
+        Initialize the queue and hook it into the app's sessions
+
+        Args:
+            db: Flask-SQLAlchemy instance
+            name: Name of the queue, unique in the app
+            run: Callable taking the connection and the transaction's items, in the order added
+        """
+        self.key = f'pawpass.commit_queue.{name}'
+        self.run = run
+        event.listen(db.session, 'before_commit', self._before_commit)
+        event.listen(db.session, 'after_transaction_end', self._after_transaction_end)
+
+    def add(self, session, item):
+        """Queue an item for the session's transaction to run at commit"""
+        session.info.setdefault(self.key, []).append(item)
+
+    def _before_commit(self, session):
+        # Writes left to the commit's own flush would add their items after this has run
+        session.flush()
+        items = session.info.pop(self.key, None)
+        if items:
+            self.run(session.connection(), items)
+
+    def _after_transaction_end(self, session, transaction):
+        if transaction.parent is None:
+            session.info.pop(self.key, None)
@@ -0,0 +1,10 @@
+"""
+Sync module for PawPass
+"""
+from pawpass.sync.changes import ChangeLog
+from pawpass.sync.idempotency import IdempotencyKeys
+
+__all__ = [
+    'ChangeLog',
+    'IdempotencyKeys'
+]
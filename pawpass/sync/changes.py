@@ -0,0 +1,275 @@
+"""
+Change log of pets and their history, for clients syncing deltas
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, exists, false, func, literal, select, true
+from sqlalchemy.orm import object_session
+
+from pawpass.sequence import CommitQueue, MonotonicCounter
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class ChangeLog:
+    """Compacted log of the latest change to every pet and history record
+
+    Each pet, update, checklist and weight record has one row holding a
+    sequence number, which is the sync cursor. Every insert, update or
+    delete of the record raises the number past every other row's. A client
+    that has synced up to cursor N asks for the rows above N. They name the
+    records to fetch again and carry tombstones for the deleted ones.
+    Earlier changes to a record are overwritten, so the log holds one row
+    per record however often it is edited.
+
+    ORM flushes and bulk writers queue their changes, and the rows are
+    written just before the session commits, in the same transaction, so
+    they commit or roll back with the write. Deleting a pet replaces the
+    rows of its history with the pet's tombstone. Sequence numbers come
+    from a MonotonicCounter rather than the rows, so deleting the rows with
+    the highest numbers never lets a later change reuse a number a client
+    has synced past, and concurrent writers get them in commit order.
+    Taking them at commit keeps the counter locked only while the log rows
+    are written.
+
+    Tombstones are kept until pruned. A second counter remembers the
+    highest sequence number pruned, and a cursor below it can have missed
+    a deletion, so those clients start over.
+    """
+
+    def __init__(self, db, change_model, counter_model):
+        """
+        Initialize the change log
+
+        Args:
+            db: Flask-SQLAlchemy instance
+            change_model: The SyncChange model holding one row per record
+            counter_model: The SequenceCounter model, holding the sequence number counter
+        """
+        self.db = db
+        self.change_model = change_model
+        self.table = change_model.__table__
+        self.sequence = MonotonicCounter(db, counter_model, f'{self.table.name}.seq',
+                                         seed=select(func.max(self.table.c.seq)))
+        self.pruned = MonotonicCounter(db, counter_model, f'{self.table.name}.pruned')
+        # (write method, arguments) run at commit, in the order the changes were made
+        self.pending = CommitQueue(db, self.table.name, self._write_pending)
+        self.pet_model = None
+        # Change kind -> history table, and history model -> change kind
+        self.sources = {}
+        self._kinds = {}
+
+    def watch(self, pet_model, sources):
+        """
+        Log inserts, updates and deletes of pets and their history
+
+        Args:
+            pet_model: The Pet model, logged as kind 'pet'
+            sources: Mapping of change kind to history model, e.g. {'update': PetUpdate}
+        """
+        self.pet_model = pet_model
+        event.listen(pet_model, 'after_insert', self._pet_added)
+        event.listen(pet_model, 'after_update', self._pet_written)
+        event.listen(pet_model, 'after_delete', self._pet_removed)
+
+        for kind, model in sources.items():
+            self.sources[kind] = model.__table__
+            self._kinds[model] = kind
+            event.listen(model, 'after_insert', self._record_added)
+            event.listen(model, 'after_update', self._record_written)
+            event.listen(model, 'after_delete', self._record_removed)
+
+    def create_schema(self):
+        """Create the sequence number counter, starting after any change already logged, and the pruning one"""
+        self.sequence.create()
+        self.pruned.create()
+
+    def backfill(self):
+        """Log every existing pet and record for a database that has pets but no change log yet"""
+        if self.pet_model is not None and self.change_model.query.first() is None \
+                and self.pet_model.query.first() is not None:
+            self._log_pets(self.db.session)
+            self.db.session.commit()
+            logger.info(f"Built the sync change log up to cursor {self.latest()}")
+
+    def record_pets(self, pet_ids):
+        """
+        Log some pets and all of their history as changed
+
+        Core inserts bypass the ORM events, so bulk loaders call this in the
+        same session transaction as their writes; the rows are written when
+        it commits.
+
+        Args:
+            pet_ids: IDs of the pets to log
+        """
+        if pet_ids:
+            self.pending.add(self.db.session, (self._log_pets, (list(pet_ids),)))
+
+    def record_pets_deleted(self, pet_ids):
+        """
+        Log tombstones for pets removed with bulk deletes, dropping their history's rows
+
+        Args:
+            pet_ids: IDs of the deleted pets
+        """
+        for pet_id in pet_ids:
+            self.pending.add(self.db.session, (self._log_pet_removed, (pet_id,)))
+
+    def latest(self):
+        """
+        Get the newest cursor
+
+        Returns:
+            int: The last sequence number handed out, or 0 for an empty log
+        """
+        return self.sequence.current()
+
+    def expired(self, cursor):
+        """
+        Check whether the log can no longer bring a client at a cursor up to date
+
+        Args:
+            cursor: Sequence number the client has synced up to
+
+        Returns:
+            bool: True if the cursor is past the newest change (e.g. issued by a database since
+                restored) or before the newest pruned tombstone, whose deletion it may have missed
+        """
+        counters = self.sequence.table
+        values = dict(self.db.session.execute(
+            select(counters.c.name, counters.c.value)
+            .where(counters.c.name.in_((self.sequence.name, self.pruned.name)))
+        ).all())
+        return cursor > values.get(self.sequence.name, 0) or cursor < values.get(self.pruned.name, 0)
+
+    def prune(self, days):
+        """
+        Delete tombstones older than some days and commit
+
+        Args:
+            days: Age in days after which a deletion is no longer sent to clients that
+                sync incrementally; older cursors start over instead
+
+        Returns:
+            int: Number of tombstones deleted
+        """
+        table = self.table
+        session = self.db.session
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        pruned = session.execute(table.delete().where(table.c.deleted == true(), table.c.changed_at < cutoff)
+                                 .returning(table.c.seq)).scalars().all()
+        if pruned:
+            # Raised in the same transaction, so no client sees the tombstones gone before it moves
+            self.pruned.raise_to(session, max(pruned))
+        session.commit()
+        logger.info(f"Pruned {len(pruned)} sync tombstones older than {days} days")
+        return len(pruned)
+
+    def changes_since(self, cursor, limit):
+        """
+        Get the changes after a cursor, oldest first
+
+        Args:
+            cursor: Sequence number the client has synced up to (0 for everything)
+            limit: Maximum number of changes to return
+
+        Returns:
+            tuple: (rows with seq, kind, ref_id, pet_id and deleted; the cursor after the
+                last row; whether more changes follow)
+        """
+        table = self.table
+        rows = self.db.session.execute(
+            select(table.c.seq, table.c.kind, table.c.ref_id, table.c.pet_id, table.c.deleted)
+            .where(table.c.seq > cursor)
+            .order_by(table.c.seq)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return rows, (rows[-1].seq if rows else cursor), has_more
+
+    def _log(self, connection, kind, ref_id, pet_id, deleted=False, new=False):
+        """Move one record's row to the next sequence number, creating it if needed
+
+        New records try the insert first and edits the update, so the usual
+        case is one statement after taking the number. A new record can still
+        have a row when SQLite reuses the ID of a deleted one.
+        """
+        table = self.table
+        existing = (table.c.kind == kind, table.c.ref_id == ref_id)
+        seq = self.sequence.advance(connection)
+        changed_at = datetime.utcnow()
+        if new:
+            inserted = connection.execute(table.insert().from_select(
+                ['kind', 'ref_id', 'pet_id', 'seq', 'deleted', 'changed_at'],
+                select(literal(kind), literal(ref_id), literal(pet_id), literal(seq), literal(deleted),
+                       literal(changed_at)).where(~exists().where(*existing))
+            ))
+            if inserted.rowcount:
+                return
+
+        values = {'pet_id': pet_id, 'seq': seq, 'deleted': deleted, 'changed_at': changed_at}
+        result = connection.execute(table.update().where(*existing).values(**values))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(kind=kind, ref_id=ref_id, **values))
+
+    def _log_pet_removed(self, connection, pet_id):
+        # Clients drop a deleted pet's history with the pet, so one tombstone covers it all
+        table = self.table
+        connection.execute(table.delete().where(table.c.pet_id == pet_id, table.c.kind != 'pet'))
+        self._log(connection, 'pet', pet_id, pet_id, deleted=True)
+
+    def _log_pets(self, connection, pet_ids=None):
+        """Log pets and their history with INSERT ... SELECT, one statement per table"""
+        table = self.table
+        pets = self.pet_model.__table__
+        sources = [('pet', pets, pets.c.id, pets.c.id)]
+        sources += [(kind, source, source.c.id, source.c.pet_id) for kind, source in self.sources.items()]
+
+        for kind, source, ref_id, pet_id in sources:
+            selected = select(ref_id).where(pet_id.in_(pet_ids)) if pet_ids is not None else select(ref_id)
+            connection.execute(table.delete().where(table.c.kind == kind, table.c.ref_id.in_(selected)))
+            # Lock the counter and number the new rows after it, then move it past them
+            offset = self.sequence.advance(connection, 0)
+            statement = select(
+                literal(kind).label('kind'),
+                ref_id.label('ref_id'),
+                pet_id.label('pet_id'),
+                (offset + func.row_number().over(order_by=ref_id)).label('seq'),
+                false().label('deleted'),
+                literal(datetime.utcnow()).label('changed_at'),
+            )
+            if pet_ids is not None:
+                statement = statement.where(pet_id.in_(pet_ids))
+            inserted = connection.execute(table.insert().from_select(
+                ['kind', 'ref_id', 'pet_id', 'seq', 'deleted', 'changed_at'], statement))
+            if inserted.rowcount:
+                self.sequence.advance(connection, inserted.rowcount)
+
+    def _write_pending(self, connection, changes):
+        for write, args in changes:
+            write(connection, *args)
+
+    def _queue(self, instance, kind, ref_id, pet_id, deleted=False, new=False):
+        self.pending.add(object_session(instance), (self._log, (kind, ref_id, pet_id, deleted, new)))
+
+    def _pet_added(self, mapper, connection, pet):
+        self._queue(pet, 'pet', pet.id, pet.id, new=True)
+
+    def _pet_written(self, mapper, connection, pet):
+        self._queue(pet, 'pet', pet.id, pet.id)
+
+    def _pet_removed(self, mapper, connection, pet):
+        self.pending.add(object_session(pet), (self._log_pet_removed, (pet.id,)))
+
+    def _record_added(self, mapper, connection, record):
+        self._queue(record, self._kinds[mapper.class_], record.id, record.pet_id, new=True)
+
+    def _record_written(self, mapper, connection, record):
+        self._queue(record, self._kinds[mapper.class_], record.id, record.pet_id)
+
+    def _record_removed(self, mapper, connection, record):
+        self._queue(record, self._kinds[mapper.class_], record.id, record.pet_id, deleted=True)
@@ -0,0 +1,113 @@
+"""
+Idempotency keys, so retried client writes are applied once
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Longest key accepted from clients
+MAX_KEY_LENGTH = 100
+
+
+class IdempotencyKeys:
+    """Keys of client writes already applied, each with the result the client was sent
+
+    A client names every write it may have to retry with a key of its own
+    (a UUID per queued write). The first request carrying a key applies the
+    write and stores the key in the same transaction, so the key exists
+    exactly when the write does. A retry with the key gets the stored
+    result back instead of a second record. Keys are kept for a while
+    after the write, long enough for a device to come back online, and
+    then pruned.
+    """
+
+    def __init__(self, db, key_model):
+        """
+        Initialize the key store
+
+        Args:
+            db: Flask-SQLAlchemy instance
+            key_model: The IngestKey model holding one row per key
+        """
+        self.db = db
+        self.key_model = key_model
+        self.table = key_model.__table__
+
+    @staticmethod
+    def valid(key):
+        """
+        Check that a client-supplied key can be stored
+
+        Args:
+            key: Value sent by the client
+
+        Returns:
+            bool: Whether the key is a non-empty string of at most MAX_KEY_LENGTH characters
+        """
+        return isinstance(key, str) and 0 < len(key) <= MAX_KEY_LENGTH
+
+    def lookup(self, keys):
+        """
+        Get the writes already applied under some keys, with one query
+
+        Args:
+            keys: Keys to look up
+
+        Returns:
+            dict: Key -> {'type', 'id', 'pet_id', 'record'} of the write, for the keys found
+        """
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        table = self.table
+        rows = self.db.session.execute(
+            select(table.c.key, table.c.kind, table.c.ref_id, table.c.pet_id, table.c.result)
+            .where(table.c.key.in_(keys))
+        ).all()
+        return {key: {'type': kind, 'id': ref_id, 'pet_id': pet_id, 'record': json.loads(result)}
+                for key, kind, ref_id, pet_id, result in rows}
+
+    def remember(self, entries):
+        """
+        Store keys in the current session transaction, to commit with the writes they name
+
+        Concurrent requests with the same key make the commit fail with an
+        IntegrityError on the primary key; the caller rolls back and looks
+        the key up again.
+
+        Args:
+            entries: (key, kind, ref_id, pet_id, record) tuples, where record is the
+                JSON-serializable record the client was sent
+        """
+        if not entries:
+            return
+        created_at = datetime.utcnow()
+        self.db.session.execute(self.table.insert(), [{
+            'key': key,
+            'kind': kind,
+            'ref_id': ref_id,
+            'pet_id': pet_id,
+            'result': json.dumps(record),
+            'created_at': created_at,
+        } for key, kind, ref_id, pet_id, record in entries])
+
+    def prune(self, days):
+        """
+        Delete keys older than some days and commit
+
+        Args:
+            days: Age in days after which a retry is no longer recognised
+
+        Returns:
+            int: Number of keys deleted
+        """
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        deleted = self.db.session.execute(self.table.delete().where(self.table.c.created_at < cutoff)).rowcount
+        self.db.session.commit()
+        logger.info(f"Pruned {deleted} idempotency keys older than {days} days")
+        return deleted
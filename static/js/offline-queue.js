@@ -0,0 +1,79 @@
+// PawPass - Queue of writes made while offline, shared by the pages and the service worker
+
+// Service workers cannot read localStorage, so the queue lives in IndexedDB
+const OFFLINE_DB_NAME = 'pawpass-offline';
+const OFFLINE_STORE = 'queue';
+// Writes the server failed on too often, set aside so they stop holding back the queue
+const OFFLINE_REJECTED_STORE = 'rejected';
+
+function openOfflineQueue() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(OFFLINE_DB_NAME, 2);
+        request.onupgradeneeded = event => {
+            // Each write is stored under its idempotency key
+            if (event.oldVersion < 1) {
+                request.result.createObjectStore(OFFLINE_STORE, { keyPath: 'key' });
+            }
+            if (event.oldVersion < 2) {
+                request.result.createObjectStore(OFFLINE_REJECTED_STORE, { keyPath: 'key' });
+            }
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function offlineQueueTransaction(mode, work, storeNames = [OFFLINE_STORE]) {
+    return openOfflineQueue().then(db => new Promise((resolve, reject) => {
+        const transaction = db.transaction(storeNames, mode);
+        const result = work(transaction.objectStore(OFFLINE_STORE), transaction);
+        transaction.oncomplete = () => {
+            db.close();
+            resolve(result && 'result' in result ? result.result : undefined);
+        };
+        transaction.onerror = () => {
+            db.close();
+            reject(transaction.error);
+        };
+    }));
+}
+
+// Queue a write for /api/ingest: {key, type, pet_id, occurred_at, ...fields}
+function queueOfflineWrite(item) {
+    return offlineQueueTransaction('readwrite', store => store.put(item));
+}
+
+// Every queued write, in the order they were made
+function getOfflineWrites() {
+    return offlineQueueTransaction('readonly', store => store.getAll())
+        .then(items => items.sort((a, b) => a.occurred_at.localeCompare(b.occurred_at)));
+}
+
+// Drop the writes the server has answered for
+function removeOfflineWrites(keys) {
+    return offlineQueueTransaction('readwrite', store => {
+        keys.forEach(key => store.delete(key));
+    });
+}
+
+// Count a failed attempt to send a write; after maxAttempts it moves to the
+// rejected store, kept for inspection but no longer sent
+function recordOfflineWriteFailure(key, maxAttempts) {
+    return offlineQueueTransaction('readwrite', (store, transaction) => {
+        const request = store.get(key);
+        request.onsuccess = () => {
+            const item = request.result;
+            if (!item) {
+                return;
+            }
+            item.attempts = (item.attempts || 0) + 1;
+            if (item.attempts < maxAttempts) {
+                store.put(item);
+                return;
+            }
+            console.error('Offline write set aside after', item.attempts, 'failed attempts:', key);
+            store.delete(key);
+            transaction.objectStore(OFFLINE_REJECTED_STORE).put(item);
+        };
+    }, [OFFLINE_STORE, OFFLINE_REJECTED_STORE]);
+}
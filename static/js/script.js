@@ -244,24 +244,29 @@ function createPawPrint(container) {
     container.appendChild(pawPrint);
 }
 
-// Offline data handling
+// Offline data handling: writes to /api/pets/<id>/update or /checklist made
+// while offline are queued and sent to /api/ingest in one request on reconnect
 function saveOfflineData(url, method, data) {
-    let offlineUpdates = JSON.parse(localStorage.getItem('offlineUpdates') || '[]');
+    const match = new URL(url, window.location.origin).pathname.match(/^\/api\/pets\/(\d+)\/(update|checklist)$/);
+    if (!match || method.toUpperCase() !== 'POST') {
+        console.error('Cannot queue offline write to', url);
+        return Promise.resolve();
+    }
     
-    offlineUpdates.push({
-        url, 
-        method, 
-        data,
-        timestamp: new Date().getTime()
+    // The key lets the server apply the write once, however often it is retried
+    const item = Object.assign({}, data, {
+        key: data.key || crypto.randomUUID(),
+        type: match[2],
+        pet_id: parseInt(match[1], 10),
+        occurred_at: new Date().toISOString()
     });
     
-    localStorage.setItem('offlineUpdates', JSON.stringify(offlineUpdates));
-    
-    // Try to register a sync
-    if ('serviceWorker' in navigator && 'SyncManager' in window) {
-        navigator.serviceWorker.ready.then(registration => {
-            registration.sync.register('sync-updates')
-                .catch(err => console.error('Sync registration failed:', err));
-        });
-    }
+    return queueOfflineWrite(item).then(() => {
+        // Try to register a sync
+        if ('serviceWorker' in navigator && 'SyncManager' in window) {
+            return navigator.serviceWorker.ready.then(registration => {
+                return registration.sync.register('sync-updates');
+            }).catch(err => console.error('Sync registration failed:', err));
+        }
+    });
 }
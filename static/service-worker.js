@@ -1,10 +1,13 @@
 // Service Worker for PawPass PWA
 
-const CACHE_NAME = 'pawpass-v1';
+importScripts('/static/js/offline-queue.js');
+
+const CACHE_NAME = 'pawpass-v3';
 const ASSETS_TO_CACHE = [
   '/',
   '/static/css/style.css',
   '/static/css/color-blind.css',
+  '/static/js/offline-queue.js',
   '/static/js/script.js',
   '/static/images/pawpass-logo.png',
   '/static/icons/icon-192x192.png',
@@ -43,6 +46,11 @@ self.addEventListener('activate', event => {
 
 // Fetch event - Serve cached content when offline
 self.addEventListener('fetch', event => {
+  // Sync deltas are only meaningful fresh; never answer them from the cache
+  if (new URL(event.request.url).pathname === '/api/sync') {
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then(response => {
@@ -84,30 +92,61 @@ self.addEventListener('sync', event => {
   }
 });
 
-// Function to sync offline data when connection is restored
+// Writes per /api/ingest request (the server's MAX_INGEST_ITEMS)
+const INGEST_BATCH_SIZE = 500;
+// Failed sends after which a write is set aside instead of retried
+const MAX_INGEST_ATTEMPTS = 5;
+
+// Send some queued writes in one /api/ingest request and drop the ones the
+// server answered for; returns false if it refused the request as a whole
+async function sendOfflineWrites(items) {
+  // A failed request rejects, so the browser retries the sync later
+  const response = await fetch('/api/ingest', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    // The attempt count is the queue's bookkeeping, not part of the write
+    body: JSON.stringify({ items: items.map(({ attempts, ...item }) => item) })
+  });
+  if (!response.ok) {
+    console.error('Ingest failed with status', response.status);
+    return false;
+  }
+
+  // Created and duplicate writes are stored; errors would fail again, so drop them too
+  const { results } = await response.json();
+  results.filter(result => result.status === 'error')
+    .forEach(result => console.error('Offline write rejected:', result.key, result.error));
+  await removeOfflineWrites(results.map(result => result.key).filter(key => key));
+  return true;
+}
+
+// Send the queued offline writes to the server, a batch per request; the
+// idempotency keys make a retry after a lost response harmless
 async function syncData() {
-  // Get saved data from indexedDB or localStorage
-  // and send it to the server
-  const offlineData = localStorage.getItem('offlineUpdates');
-  
-  if (offlineData) {
-    try {
-      const items = JSON.parse(offlineData);
-      
-      for (const item of items) {
-        await fetch(item.url, {
-          method: item.method,
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify(item.data)
-        });
+  const items = await getOfflineWrites();
+  let failed = false;
+
+  for (let start = 0; start < items.length; start += INGEST_BATCH_SIZE) {
+    const batch = items.slice(start, start + INGEST_BATCH_SIZE);
+    if (await sendOfflineWrites(batch)) {
+      continue;
+    }
+    // Send the refused batch a write at a time, so one write the server
+    // cannot take only holds back itself, and set it aside once it has
+    // failed MAX_INGEST_ATTEMPTS times
+    for (const item of batch) {
+      if (batch.length > 1 && await sendOfflineWrites([item])) {
+        continue;
       }
-      
-      // Clear synced data
-      localStorage.removeItem('offlineUpdates');
-    } catch (error) {
-      console.error('Error syncing offline data:', error);
+      failed = true;
+      await recordOfflineWriteFailure(item.key, MAX_INGEST_ATTEMPTS);
     }
   }
-}
\ No newline at end of file
+
+  if (failed) {
+    // Ask the browser to retry the writes still queued later
+    throw new Error('Some offline writes were not stored');
+  }
+}
@@ -0,0 +1,72 @@
+"""
+Shared fixtures: the app on a throwaway SQLite database and pets with history
+"""
+import os
+import tempfile
+from datetime import date, time as dt_time, timedelta
+
+# Point the app at a scratch database before it is imported
+_db_dir = tempfile.mkdtemp(prefix='pawpass-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+import pytest
+
+from app import app as flask_app, init_database
+from models import db, Pet, PetUpdate, WeightRecord
+from pawpass.monitoring import assert_max_queries, count_queries
+
+
+@pytest.fixture(scope='session')
+def app():
+    """The application, with the schema and default data created once per run"""
+    init_database()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='module')
+def pet_id(app):
+    """ID of a new pet with more history than any page shows, one per test module"""
+    with app.app_context():
+        pet = Pet(name='Fixture', species='Dog', breed='Mixed')
+        db.session.add(pet)
+        db.session.flush()
+        start = date(2025, 1, 1)
+        for day in range(60):
+            db.session.add(PetUpdate(pet_id=pet.id, update_text=f"Routine check {day}",
+                                     update_date=start + timedelta(days=day), update_time=dt_time(9, 0)))
+            db.session.add(WeightRecord(pet_id=pet.id, weight=10 + day / 10,
+                                        record_date=start + timedelta(days=day), record_time=dt_time(8, 0)))
+        db.session.commit()
+        return pet.id
+
+
+@pytest.fixture
+def max_queries():
+    """
+    Context manager failing the test when a block runs more SQL statements than allowed
+
+    Usage:
+        def test_pet_list(client, max_queries):
+            with max_queries(3):
+                client.get('/pets')
+    """
+    return assert_max_queries
+
+
+@pytest.fixture
+def query_counter():
+    """
+    Context manager yielding the QueryStats of a block, for custom assertions
+
+    Usage:
+        def test_no_repeated_queries(client, query_counter):
+            with query_counter() as stats:
+                client.get('/api/pets')
+            assert not stats.repeated()
+    """
+    return count_queries
@@ -0,0 +1,103 @@
+"""
+Each hot route stays within its SQL statement budget
+
+The pet fixture has more history than any page shows, so a route that
+starts querying per row goes over its budget or repeats a statement shape.
+"""
+import pytest
+
+from app import change_log, page_cache
+from models import db, ChecklistItem
+
+# (method, path, JSON body, maximum statements) of rendered pages, with the page cache empty;
+# {pet} is the fixture pet's ID and 'all' the IDs of every checklist item
+ROUTE_BUDGETS = (
+    ('GET', '/pets', None, 3),
+    ('GET', '/pets?search=routine', None, 4),
+    ('GET', '/pet/{pet}', None, 6),
+    ('GET', '/pet/{pet}/weight', None, 3),
+    ('GET', '/pet/{pet}/checklist', None, 2),
+    ('GET', '/api/pets', None, 5),
+    ('GET', '/api/pets?view=summary', None, 2),
+    ('GET', '/api/pets/{pet}', None, 5),
+    ('GET', '/api/pets/{pet}/timeline', None, 5),
+    ('GET', '/api/pets/facets', None, 1),
+    ('GET', '/api/search?q=routine', None, 2),
+    ('GET', '/api/sync', None, 6),
+    ('GET', '/api/sync?since={cursor}', None, 2),
+    ('POST', '/chatbot', {'message': 'Who needs medication tonight?'}, 4),
+    ('POST', '/api/pets/{pet}/update', {'update': 'Budget check', 'volunteer_name': 'Budget'}, 9),
+    ('POST', '/api/pets/{pet}/checklist', {'completed_items': 'all', 'volunteer_name': 'Budget'}, 9),
+)
+
+# Cached pages cost only the version lookup when repeated
+CACHED_ROUTES = ('/pets', '/pet/{pet}')
+
+# Routes tagged with version ETags; a repeat request with If-None-Match must be a 304 costing one statement
+CONDITIONAL_ROUTES = ('/api/pets', '/api/pets?view=summary', '/api/pets/{pet}')
+
+# Writes take a pet version and sync sequence numbers at commit (two counter UPDATEs and a version stamp
+# per transaction, plus a counter UPDATE per logged row), so this UPDATE repeats with the rows a request
+# writes rather than the rows it reads
+PER_WRITE_SHAPES = ('UPDATE sequence_counters',)
+
+
+@pytest.fixture(scope='module')
+def item_ids(app):
+    with app.app_context():
+        return [item_id for item_id, in db.session.query(ChecklistItem.id)]
+
+
+def looped(stats):
+    """Statement shapes repeated often enough to be a query per row"""
+    return [(shape, count) for shape, count in stats.repeated(threshold=3) if not shape.startswith(PER_WRITE_SHAPES)]
+
+
+@pytest.mark.parametrize('method, path, body, budget', ROUTE_BUDGETS, ids=[f'{m} {p}' for m, p, _, _ in ROUTE_BUDGETS])
+def test_route_budget(app, client, pet_id, item_ids, max_queries, method, path, body, budget):
+    if '{cursor}' in path:
+        with app.app_context():
+            path = path.format(cursor=change_log.latest())
+    path = path.format(pet=pet_id)
+    if body and body.get('completed_items') == 'all':
+        body = dict(body, completed_items=item_ids)
+    page_cache.clear()
+
+    with max_queries(budget) as stats:
+        response = client.open(path, method=method, json=body)
+    assert response.status_code < 400
+    assert not looped(stats)
+
+
+@pytest.mark.parametrize('path', CACHED_ROUTES)
+def test_cached_page_budget(client, pet_id, max_queries, path):
+    path = path.format(pet=pet_id)
+    client.get(path)
+    with max_queries(1):
+        assert client.get(path).status_code == 200
+
+
+@pytest.mark.parametrize('path', CONDITIONAL_ROUTES)
+def test_conditional_get_budget(client, pet_id, max_queries, path):
+    path = path.format(pet=pet_id)
+    etag = client.get(path).headers['ETag']
+    with max_queries(1):
+        assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_ingest_budget(client, pet_id, item_ids, max_queries):
+    # Queued offline writes, then the same batch again as a retry answered from the idempotency keys
+    items = [
+        {'key': 'budget-update', 'type': 'update', 'update': 'Budget check', 'volunteer_name': 'Budget'},
+        {'key': 'budget-checklist', 'type': 'checklist', 'completed_items': item_ids, 'volunteer_name': 'Budget'},
+    ]
+    items = [dict(item, pet_id=pet_id) for item in items]
+
+    with max_queries(17) as stats:
+        response = client.post('/api/ingest', json={'items': items})
+    assert [result['status'] for result in response.get_json()['results']] == ['created', 'created']
+    assert not looped(stats)
+
+    with max_queries(1):
+        response = client.post('/api/ingest', json={'items': items})
+    assert [result['status'] for result in response.get_json()['results']] == ['duplicate', 'duplicate']
@@ -0,0 +1,64 @@
+"""
+The hot history queries use their indexes instead of scanning tables
+
+Drives the pet list, profile, API, timeline and weight tracker pages, a
+checklist and a pet deletion, captures every SQL statement they send, and
+runs EXPLAIN QUERY PLAN on each one that reads or writes a history table.
+"""
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app import delete_pet_records
+from models import db, ChecklistItem
+
+HISTORY_TABLES = ('pet_updates', 'checklists', 'weight_records', 'checklist_completions')
+# "SCAN pet_updates" or "SCAN pet_updates_1" (an alias) is a full pass over the table
+TABLE_SCAN = '^SCAN {table}(_\\d+)?\\b'
+
+
+@pytest.fixture(scope='module')
+def history_plans(app, pet_id):
+    """(statement, plan steps) of every distinct statement the hot paths send"""
+    client = app.test_client()
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            captured.append((statement, parameters))
+
+    with app.app_context():
+        item_ids = [item_id for item_id, in db.session.query(ChecklistItem.id).limit(3)]
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            assert client.post(f'/api/pets/{pet_id}/checklist', json={'completed_items': item_ids}).status_code == 200
+            for path in ('/pets', '/pets?search=check', f'/pet/{pet_id}', '/api/pets', f'/api/pets/{pet_id}',
+                         f'/pet/{pet_id}/weight'):
+                assert client.get(path).status_code == 200, path
+
+            page = client.get(f'/api/pets/{pet_id}/timeline?limit=10').get_json()
+            assert client.get(f"/api/pets/{pet_id}/timeline?limit=10&before={page['next_cursor']}").status_code == 200
+
+            delete_pet_records(pet_id)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        # Explained before the deletion is rolled back, so the plans see the same schema and data
+        connection = db.session.connection()
+        plans = []
+        for statement, parameters in dict(captured).items():
+            if statement.lstrip().upper().startswith(('SELECT', 'DELETE', 'UPDATE', 'WITH')):
+                plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                plans.append((statement, plan))
+        db.session.rollback()
+    return plans
+
+
+@pytest.mark.parametrize('table', HISTORY_TABLES)
+def test_history_queries_do_not_scan(history_plans, table):
+    plans = [(statement, plan) for statement, plan in history_plans if re.search(rf'\b{table}\b', statement)]
+    assert plans, f"no captured query reads {table}"
+    scans = [f"{' '.join(statement.split())[:200]}\n    " + '\n    '.join(plan)
+             for statement, plan in plans if any(re.match(TABLE_SCAN.format(table=table), step) for step in plan)]
+    assert not scans, f"full scans of {table}:\n" + '\n'.join(scans)
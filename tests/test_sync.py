@@ -0,0 +1,34 @@
+"""
+Clients that synced before pruned tombstones start over instead of missing deletions
+"""
+from datetime import datetime, timedelta
+
+from app import change_log
+from models import db, Pet, SyncChange
+
+
+def test_pruned_tombstones_reset_older_cursors(app, client):
+    with app.app_context():
+        pet = Pet(name='Pruned', species='Cat')
+        db.session.add(pet)
+        db.session.commit()
+        pet_id = pet.id
+        before_delete = change_log.latest()
+
+        db.session.delete(pet)
+        db.session.commit()
+        tombstone = db.session.get(SyncChange, ('pet', pet_id))
+        assert tombstone.deleted
+        tombstone.changed_at = datetime.utcnow() - timedelta(days=100)
+        db.session.commit()
+        after_delete = change_log.latest()
+
+        assert change_log.prune(90) >= 1
+        assert db.session.get(SyncChange, ('pet', pet_id)) is None
+
+    # The client that never saw the deletion starts over; one that did carries on
+    stale = client.get(f'/api/sync?since={before_delete}').get_json()
+    assert stale['reset']
+    current = client.get(f'/api/sync?since={after_delete}').get_json()
+    assert not current['reset']
+    assert pet_id not in current['deleted']['pets']